@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import argparse
+import urllib.request
+import urllib.error
+
+# Thin client for `main.py --serve`: stdlib only, so submitting a job costs
+# an HTTP request instead of a full AutoDork startup.
+DEFAULT_URL = os.environ.get("AUTODORK_SERVICE", "http://127.0.0.1:8765")
+
+
+def request(url, method="GET", payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(
+        url, data=data, method=method, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        try:
+            msg = json.loads(body).get("error", body.decode())
+        except Exception:
+            msg = body.decode(errors="replace")
+        sys.exit(f"Error {e.code}: {msg}")
+    except urllib.error.URLError as e:
+        sys.exit(f"Could not reach AutoDork service at {url}: {e.reason}")
+
+
+def stream(base_url, job_id):
+    try:
+        with urllib.request.urlopen(f"{base_url}/jobs/{job_id}/stream") as resp:
+            for line in resp:
+                if line.strip():
+                    event = json.loads(line)
+                    if "url" in event:
+                        print(f"[{event['status'].upper()}] {event['url']}", flush=True)
+                    else:
+                        print(json.dumps(event, indent=2))
+                        return event
+    except urllib.error.URLError as e:
+        sys.exit(f"Could not reach AutoDork service at {base_url}: {e.reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoDork service client")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Service base URL")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_submit = sub.add_parser("submit", help="Submit a dork job")
+    p_submit.add_argument("--script", required=True)
+    p_submit.add_argument("--inputs", nargs="*", default=[], help="key=value pairs")
+    p_submit.add_argument("--wordlist", help="Submit one job per line")
+    p_submit.add_argument("--output", help="Comma-separated: json,csv,html,log")
+    p_submit.add_argument(
+        "--stream", action="store_true", help="Stream results until the job finishes"
+    )
+    p_status = sub.add_parser("status", help="Show job status")
+    p_status.add_argument("job_id")
+    p_stream = sub.add_parser("stream", help="Stream a job's results")
+    p_stream.add_argument("job_id")
+    sub.add_parser("list", help="List jobs")
+    args = parser.parse_args()
+    base_url = args.url.rstrip("/")
+
+    if args.cmd == "submit":
+        inputs = dict(i.split("=", 1) for i in args.inputs if "=" in i)
+        targets = [None]
+        if args.wordlist:
+            with open(args.wordlist) as f:
+                targets = [line.strip() for line in f if line.strip()]
+        for target in targets:
+            payload = {"script": args.script, "inputs": inputs}
+            if target is not None:
+                payload["target"] = target
+            if args.output:
+                payload["output"] = args.output
+            resp = request(f"{base_url}/jobs", "POST", payload)
+            print(resp["id"], flush=True)
+            if args.stream:
+                stream(base_url, resp["id"])
+    elif args.cmd == "status":
+        print(json.dumps(request(f"{base_url}/jobs/{args.job_id}"), indent=2))
+    elif args.cmd == "stream":
+        stream(base_url, args.job_id)
+    elif args.cmd == "list":
+        for job in request(f"{base_url}/jobs")["jobs"]:
+            print(f"{job['id']}  {job['status']:<8} {job['script']}  {job['inputs']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,12 +12,28 @@ from rich.console import Console
 from rich.table import Table
 from rich.progress import track
 from InquirerPy import inquirer  # type: ignore
-from googlesearch import search  # type: ignore
 from jinja2 import Environment, FileSystemLoader
 
 # --- Helper imports ---
 from utils.helpers.cache import load_url_cache, save_url_cache
+from utils.helpers.backends import load_backends, federated_search
+from utils.helpers.depth import (
+    canonical_url,
+    dork_key,
+    load_depths,
+    save_depths,
+    planned_pages,
+    record_depth,
+)
+from utils.helpers.prioritize import (
+    load_dork_stats,
+    save_dork_stats,
+    plan_dorks,
+    record_dork_run,
+    report_skipped,
+)
 from utils.helpers.tag import tag_urls
+from utils.helpers.review import paginated_review
 from utils.helpers.docgen import generate_docs
 from utils.helpers.backup import (
     backup_configs_and_scripts,
@@ -32,6 +48,7 @@ from utils.helpers.bulk_tag import bulk_tag_urls
 from utils.helpers.schedule import save_schedule_script
 from utils.helpers.profile import save_profile, load_profile
 from utils.helpers.self_helper import print_self_help, open_usage_guide
+from utils.helpers.service import serve, DEFAULT_HOST, DEFAULT_PORT
 
 console = Console()
 BASE = os.path.dirname(os.path.abspath(__file__))
@@ -48,6 +65,8 @@ os.makedirs(BACKUPS, exist_ok=True)
 os.makedirs(EXPORTS, exist_ok=True)
 
 CACHE_FILE = os.path.join(RESULTS, "url_cache.json")
+DEPTHS_FILE = os.path.join(RESULTS, "dork_depths.json")
+DORK_STATS_FILE = os.path.join(RESULTS, "dork_stats.json")
 
 
 def load_config():
@@ -112,45 +131,155 @@ def prompt_inputs(inputs_meta, cli_inputs=None, quiet=False):
 
 
 def run_dorks(
-    dorks, num_results, delay_min, delay_max, blacklist, progress=True, url_cache=None
+    dorks,
+    num_results,
+    delay_min,
+    delay_max,
+    blacklist,
+    progress=True,
+    url_cache=None,
+    backends=None,
+    deadline=None,
+    hedge_percentile=90,
+    depths=None,
+    dork_keys=None,
+    max_pages=1,
+    yield_threshold=0.5,
+    seen_canonical=None,
+    dork_stats=None,
+    max_calls=None,
+    skipped=None,
+    on_result=None,
 ):
     results = {}
     url_map = {}
+    sources = {}
     errors = []
     seen_urls = url_cache or set()
+    if seen_canonical is None:
+        seen_canonical = {canonical_url(u) for u in seen_urls}
+    run_canonical = set()
     new_urls_this_run = set()
+    backend_calls = 0
+    if backends is None:
+        backends = load_backends({}, BASE, console)
+    if depths is None:
+        depths = {}
+    dork_keys = dork_keys or {}
+    if dork_stats is None:
+        dork_stats = {}
+    if skipped is None:
+        skipped = []
+    show_backend = len(backends) > 1
     dorks_iter = track(dorks, description="Running dorks...") if progress else dorks
     for dork in dorks_iter:
+        if max_calls is not None and backend_calls >= max_calls:
+            skipped.append((dork, "query budget exhausted during run"))
+            console.print(f"[yellow][SKIP][/yellow] {dork} (query budget exhausted)")
+            continue
         urls = []
         console.print(f"[bold blue][DORK][/bold blue] {dork}")
+        key = dork_keys.get(dork)
+        planned = planned_pages(depths, key, max_pages)
+        page = 0
+        useful_pages = 0
+        new_count = 0
+        latency = 0.0
         try:
-            for url in search(dork, num_results=num_results, lang="en"):
-                if any(domain in url for domain in blacklist):
-                    continue
-                if url not in url_map:
-                    if url not in seen_urls:
-                        console.print(f"  [green][NEW][/green] {url}")
-                        new_urls_this_run.add(url)
+            # Page through results until a page stops paying for itself:
+            # always stop on a page with no new canonical URLs, and only go
+            # past the learned depth while the page yield stays high.
+            while page < max_pages:
+                if page:
+                    if max_calls is not None and backend_calls >= max_calls:
+                        break
+                    time.sleep(random.uniform(delay_min, delay_max))
+                t0 = time.monotonic()
+                hits, attribution, backend_errors = federated_search(
+                    backends,
+                    dork,
+                    num_results,
+                    start=page * num_results,
+                    deadline=deadline,
+                    hedge_percentile=hedge_percentile,
+                )
+                latency += time.monotonic() - t0
+                page += 1
+                backend_calls += 1
+                for msg in backend_errors:
+                    log_error(errors, f"{dork}: {msg}")
+                    console.print(f"  [red][!][/red] Backend error: {msg}")
+                fresh = 0
+                for url in hits:
+                    if any(domain in url for domain in blacklist):
+                        continue
+                    via = (
+                        f" [grey58]({', '.join(attribution[url])})[/grey58]"
+                        if show_backend
+                        else ""
+                    )
+                    canon = canonical_url(url)
+                    if canon not in run_canonical and canon not in seen_canonical:
+                        fresh += 1
+                    run_canonical.add(canon)
+                    if url not in url_map:
+                        if url not in seen_urls:
+                            status = "new"
+                            console.print(f"  [green][NEW][/green] {url}{via}")
+                            new_urls_this_run.add(url)
+                        else:
+                            status = "seen"
+                            console.print(f"  [yellow][SEEN][/yellow] {url}{via}")
                     else:
-                        console.print(f"  [yellow][SEEN][/yellow] {url}")
-                else:
-                    console.print(f"  [grey58][DUP][/grey58] {url}")
-                urls.append(url)
-                url_map.setdefault(url, []).append(dork)
+                        status = "dup"
+                        console.print(f"  [grey58][DUP][/grey58] {url}{via}")
+                    if on_result:
+                        on_result(
+                            {
+                                "dork": dork,
+                                "url": url,
+                                "status": status,
+                                "backends": attribution[url],
+                            }
+                        )
+                    urls.append(url)
+                    url_map.setdefault(url, []).append(dork)
+                    for name in attribution[url]:
+                        if name not in sources.setdefault(url, []):
+                            sources[url].append(name)
+                new_count += fresh
+                if fresh:
+                    useful_pages = page
+                if not fresh or len(hits) < num_results:
+                    break
+                if page >= planned and fresh / num_results < yield_threshold:
+                    break
             if not urls:
                 console.print("   [yellow]No results found[/yellow]")
         except Exception as e:
-            err_msg = f"{dork}: {e}"
-            errors.append(err_msg)
-            with open(os.path.join(LOGS, "errors.log"), "a") as errlog:
-                errlog.write(f"{datetime.now()} - {err_msg}\n")
+            log_error(errors, f"{dork}: {e}")
             console.print(f"  [red][!][/red] Error: {e}")
+        if page:
+            record_depth(depths, key, page, useful_pages, max_pages)
+            dork_stats[dork] = {
+                "requests": page,
+                "new_urls": new_count,
+                "latency": latency,
+            }
         results[dork] = urls
         time.sleep(random.uniform(delay_min, delay_max))
-    return results, url_map, errors, new_urls_this_run
+    console.print(f"[bold cyan]Backend calls:[/bold cyan] {backend_calls}")
+    return results, url_map, errors, new_urls_this_run, sources
+
 
+def log_error(errors, err_msg):
+    errors.append(err_msg)
+    with open(os.path.join(LOGS, "errors.log"), "a") as errlog:
+        errlog.write(f"{datetime.now()} - {err_msg}\n")
 
-def write_outputs(base_name, results, url_map, output_formats):
+
+def write_outputs(base_name, results, url_map, output_formats, sources=None):
+    sources = sources or {}
     if "log" in output_formats:
         log_path = os.path.join(LOGS, f"{base_name}.log")
         with open(log_path, "w", encoding="utf-8") as f:
@@ -163,13 +292,19 @@ def write_outputs(base_name, results, url_map, output_formats):
         json_path = os.path.join(RESULTS, f"{base_name}.json")
         with open(json_path, "w", encoding="utf-8") as jf:
             json.dump(url_map, jf, indent=2)
+        if sources:
+            sources_path = os.path.join(RESULTS, f"{base_name}_sources.json")
+            with open(sources_path, "w", encoding="utf-8") as sf:
+                json.dump(sources, sf, indent=2)
     if "csv" in output_formats:
         csv_path = os.path.join(RESULTS, f"{base_name}.csv")
         with open(csv_path, "w", encoding="utf-8", newline="") as f:
             writer = csv.writer(f)
-            writer.writerow(["URL", "Found By Dork(s)"])
+            writer.writerow(["URL", "Found By Dork(s)", "Backend(s)"])
             for url, dorks in url_map.items():
-                writer.writerow([url, "; ".join(dorks)])
+                writer.writerow(
+                    [url, "; ".join(dorks), "; ".join(sources.get(url, []))]
+                )
     if "html" in output_formats:
         html_template_path = os.path.join(
             BASE, "utils", "templates", "results_template.html"
@@ -216,11 +351,21 @@ def show_summary(results, url_map):
     console.print(f"[bold cyan]Total hits (incl. duplicates):[/bold cyan] {total_hits}")
 
 
-def interactive_review(url_map):
+def interactive_review(url_map, new_urls=None, page_size=50):
     urls = list(url_map.keys())
     if not urls:
         console.print("[yellow]No URLs found for review.[/yellow]")
         return []
+    if len(urls) > page_size:
+        return paginated_review(
+            url_map,
+            new_urls or set(),
+            RESULTS,
+            tag_urls,
+            inquirer,
+            console,
+            page_size=page_size,
+        )
     chosen = inquirer.checkbox(
         message="Mark URLs for follow-up (space = select):", choices=urls
     ).execute()
@@ -348,6 +493,18 @@ def main():
     parser.add_argument(
         "--more-help", action="store_true", help="Show advanced usage guide"
     )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a long-lived local job service (submit jobs with client.py)",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_HOST,
+        help="Service bind address (loopback by default; the API is unauthenticated)",
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Service port")
 
     args = parser.parse_args()
 
@@ -437,10 +594,7 @@ def main():
         )
         sys.exit(0)
 
-    num_results = config.get("num_results", 8)
-    delay_min = config.get("delay_min", 2)
-    delay_max = config.get("delay_max", 5)
-    blacklist = config.get("blacklist", [])
+    state = load_run_state(config)
     output_formats = [
         x.strip()
         for x in (args.output or ",".join(config.get("output_formats", ["log"]))).split(
@@ -448,17 +602,25 @@ def main():
         )
     ]
 
+    if args.serve:
+        serve(
+            args.host,
+            args.port,
+            lambda selected, user_inputs, formats, on_result: run_target(
+                selected, user_inputs, state, formats, quiet=True, on_result=on_result
+            ),
+            lambda name: find_script(dork_scripts, name),
+            output_formats,
+            console,
+        )
+        sys.exit(0)
+
     selected = None
     if args.script:
-        found = [
-            s
-            for s in dork_scripts
-            if s["filename"] == args.script or s["name"] == args.script
-        ]
-        if not found:
+        selected = find_script(dork_scripts, args.script)
+        if not selected:
             console.print(f"[red]Script {args.script} not found![/red]")
             sys.exit(1)
-        selected = found[0]
     elif args.quiet:
         console.print("[red]You must specify --script in quiet mode![/red]")
         sys.exit(1)
@@ -472,7 +634,6 @@ def main():
     else:
         bulk_targets = [None]
 
-    url_cache = load_url_cache(CACHE_FILE)
     for idx, target in enumerate(bulk_targets):
         this_inputs = cli_inputs.copy()
         if target is not None:
@@ -487,32 +648,116 @@ def main():
         except Exception as e:
             console.print(f"[red]Input error: {e}[/red]")
             continue
-        dorks = selected["module"].generate_dorks(user_inputs)
-        base_name = f"{selected['filename'].replace('.py','')}_{user_inputs.get(selected['inputs'][0]['name'],'run')}_{int(time.time())}"
-        results, url_map, errors, new_urls_this_run = run_dorks(
-            dorks,
-            num_results,
-            delay_min,
-            delay_max,
-            blacklist,
-            progress=(not args.quiet),
-            url_cache=url_cache,
+        run_target(selected, user_inputs, state, output_formats, quiet=args.quiet)
+
+
+def find_script(dork_scripts, name):
+    for s in dork_scripts:
+        if s["filename"] == name or s["name"] == name:
+            return s
+    return None
+
+
+def load_run_state(config):
+    # Everything a run needs that is worth keeping warm between runs
+    # (bulk targets, or jobs in --serve mode).
+    backends = load_backends(config, BASE, console)
+    if not backends:
+        console.print("[red]No search backends available! Check settings.yaml.[/red]")
+        sys.exit(1)
+    url_cache = load_url_cache(CACHE_FILE)
+    return {
+        "num_results": config.get("num_results", 8),
+        "delay_min": config.get("delay_min", 2),
+        "delay_max": config.get("delay_max", 5),
+        "blacklist": config.get("blacklist", []),
+        "backends": backends,
+        "deadline": config.get("request_deadline", 30),
+        "hedge_percentile": config.get("hedge_percentile", 90),
+        "max_pages": config.get("max_pages", 1),
+        "yield_threshold": config.get("depth_yield_threshold", 0.5),
+        "query_budget": config.get("query_budget") or {},
+        "min_dork_yield": config.get("min_dork_yield", 0.0),
+        "explore_rate": config.get("explore_rate", 0.1),
+        "review_page_size": config.get("review_page_size", 50),
+        "url_cache": url_cache,
+        "seen_canonical": {canonical_url(u) for u in url_cache},
+        "depths": load_depths(DEPTHS_FILE),
+        "stats": load_dork_stats(DORK_STATS_FILE),
+    }
+
+
+def run_target(
+    selected, user_inputs, state, output_formats, quiet=False, on_result=None
+):
+    dorks = selected["module"].generate_dorks(user_inputs)
+    base_name = f"{selected['filename'].replace('.py','')}_{user_inputs.get(selected['inputs'][0]['name'],'run')}_{int(time.time())}"
+    dork_keys = {d: dork_key(selected["filename"], d, user_inputs) for d in dorks}
+    stats = state["stats"]
+    url_cache = state["url_cache"]
+    query_budget = state["query_budget"]
+    dorks, skipped, budget = plan_dorks(
+        dorks,
+        dork_keys,
+        stats,
+        run_budget=query_budget.get("per_run"),
+        day_budget=query_budget.get("per_day"),
+        min_yield=state["min_dork_yield"],
+        explore_rate=state["explore_rate"],
+    )
+    dork_stats = {}
+    results, url_map, errors, new_urls_this_run, sources = run_dorks(
+        dorks,
+        state["num_results"],
+        state["delay_min"],
+        state["delay_max"],
+        state["blacklist"],
+        progress=(not quiet),
+        url_cache=url_cache,
+        backends=state["backends"],
+        deadline=state["deadline"],
+        hedge_percentile=state["hedge_percentile"],
+        depths=state["depths"],
+        dork_keys=dork_keys,
+        max_pages=state["max_pages"],
+        yield_threshold=state["yield_threshold"],
+        seen_canonical=state["seen_canonical"],
+        dork_stats=dork_stats,
+        max_calls=budget,
+        skipped=skipped,
+        on_result=on_result,
+    )
+    save_depths(state["depths"], DEPTHS_FILE)
+    for dork, st in dork_stats.items():
+        record_dork_run(
+            stats, dork_keys[dork], st["requests"], st["new_urls"], st["latency"]
         )
-        write_outputs(base_name, results, url_map, output_formats)
-        show_summary(results, url_map)
-        if not args.quiet:
-            interactive_review(url_map)
-        if new_urls_this_run:
-            save_url_cache(list(url_cache | new_urls_this_run), CACHE_FILE)
-            url_cache |= new_urls_this_run
-            console.print(
-                f"[bold green]Added {len(new_urls_this_run)} new URLs to cache.[/bold green]"
-            )
-        else:
-            console.print(f"[cyan]No new URLs found in this run.[/cyan]")
+    save_dork_stats(stats, DORK_STATS_FILE)
+    report_skipped(skipped, base_name, LOGS, console)
+    write_outputs(base_name, results, url_map, output_formats, sources)
+    show_summary(results, url_map)
+    if not quiet:
+        interactive_review(url_map, new_urls_this_run, state["review_page_size"])
+    if new_urls_this_run:
+        save_url_cache(list(url_cache | new_urls_this_run), CACHE_FILE)
+        url_cache |= new_urls_this_run
+        state["seen_canonical"] |= {canonical_url(u) for u in new_urls_this_run}
         console.print(
-            f"[green]Results for '{base_name}' saved to results/ and logs/[/green]\n"
+            f"[bold green]Added {len(new_urls_this_run)} new URLs to cache.[/bold green]"
         )
+    else:
+        console.print(f"[cyan]No new URLs found in this run.[/cyan]")
+    console.print(
+        f"[green]Results for '{base_name}' saved to results/ and logs/[/green]\n"
+    )
+    return {
+        "base_name": base_name,
+        "dorks_run": len(results),
+        "dorks_skipped": len(skipped),
+        "total_urls": len(url_map),
+        "new_urls": len(new_urls_this_run),
+        "errors": errors,
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    from googlesearch import search as google_search  # type: ignore
+except ImportError:
+    google_search = None
+
+try:
+    from duckduckgo_search import DDGS  # type: ignore
+except ImportError:
+    DDGS = None
+
+# Used when settings.yaml has no `backends:` section (same behaviour as before).
+DEFAULT_BACKENDS = {"google": {"policy": "primary"}}
+POLICIES = ("primary", "hedge", "fallback")
+LATENCY_WINDOW = 50
+DEFAULT_HEDGE_DELAY = 5.0
+# Calls a backend may have running at once. Each backend has its own pool, so
+# calls abandoned at a deadline only tie up that backend's threads; once it
+# is saturated it is skipped instead of queueing behind its own stragglers.
+DEFAULT_MAX_INFLIGHT = 4
+
+
+def google_backend(dork, num_results, start=0):
+    if start:
+        hits = google_search(dork, num_results=num_results, lang="en", start_num=start)
+    else:
+        hits = google_search(dork, num_results=num_results, lang="en")
+    return list(hits)
+
+
+def duckduckgo_backend(dork, num_results, start=0):
+    with DDGS() as ddgs:
+        hits = ddgs.text(dork, max_results=start + num_results) or []
+    return [h["href"] for h in hits if h.get("href")][start:]
+
+
+def make_local_backend(index_path):
+    # Offline index: {"<dork>": ["url", ...]} — handy for tests and dry runs.
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    def local_backend(dork, num_results, start=0):
+        return index.get(dork, [])[start : start + num_results]
+
+    return local_backend
+
+
+def load_backends(config, base, console):
+    backends = []
+    for name, opts in (config.get("backends") or DEFAULT_BACKENDS).items():
+        opts = opts or {}
+        if not opts.get("enabled", True):
+            continue
+        kind = opts.get("type", name)
+        policy = opts.get("policy", "primary")
+        if policy not in POLICIES:
+            console.print(
+                f"[yellow]Backend '{name}': unknown policy '{policy}', "
+                "using 'primary'.[/yellow]"
+            )
+            policy = "primary"
+        if kind == "google":
+            if google_search is None:
+                console.print(
+                    f"[yellow]Backend '{name}' skipped: "
+                    "googlesearch-python not installed.[/yellow]"
+                )
+                continue
+            search_fn = google_backend
+        elif kind == "duckduckgo":
+            if DDGS is None:
+                console.print(
+                    f"[yellow]Backend '{name}' skipped: "
+                    "duckduckgo-search not installed.[/yellow]"
+                )
+                continue
+            search_fn = duckduckgo_backend
+        elif kind == "local":
+            index_path = os.path.join(
+                base, opts.get("index", os.path.join("results", "offline_index.json"))
+            )
+            if not os.path.exists(index_path):
+                console.print(
+                    f"[yellow]Backend '{name}' skipped: "
+                    f"index {index_path} not found.[/yellow]"
+                )
+                continue
+            search_fn = make_local_backend(index_path)
+        else:
+            console.print(
+                f"[yellow]Backend '{name}' skipped: unknown type '{kind}'.[/yellow]"
+            )
+            continue
+        max_inflight = max(1, int(opts.get("max_inflight", DEFAULT_MAX_INFLIGHT)))
+        backends.append(
+            {
+                "name": name,
+                "policy": policy,
+                "search": search_fn,
+                "hedge_after": opts.get("hedge_after"),
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+                "max_inflight": max_inflight,
+                "inflight": 0,
+                "executor": ThreadPoolExecutor(
+                    max_workers=max_inflight, thread_name_prefix=f"backend-{name}"
+                ),
+            }
+        )
+    return backends
+
+
+def latency_percentile(latencies, pct):
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def hedge_threshold(backends, pct):
+    # Issue hedges once the slowest primary has outlived its usual latency.
+    thresholds = []
+    for b in backends:
+        if b["policy"] != "primary":
+            continue
+        if b["hedge_after"] is not None:
+            thresholds.append(float(b["hedge_after"]))
+        else:
+            p = latency_percentile(b["latencies"], pct)
+            thresholds.append(p if p is not None else DEFAULT_HEDGE_DELAY)
+    return max(thresholds) if thresholds else DEFAULT_HEDGE_DELAY
+
+
+_inflight_lock = threading.Lock()
+
+
+def submit(backend, dork, num_results, start):
+    """Queue a call on the backend's own pool; None if it is saturated."""
+    with _inflight_lock:
+        if backend["inflight"] >= backend["max_inflight"]:
+            return None
+        backend["inflight"] += 1
+    future = backend["executor"].submit(_timed_call, backend, dork, num_results, start)
+    future.add_done_callback(lambda _: _release(backend))
+    return future
+
+
+def _release(backend):
+    with _inflight_lock:
+        backend["inflight"] -= 1
+
+
+def abandon(pending):
+    """Cancel what hasn't started; running calls finish on their own pool."""
+    for future in pending:
+        future.cancel()
+
+
+def _timed_call(backend, dork, num_results, start):
+    t0 = time.monotonic()
+    try:
+        return backend["search"](dork, num_results, start)
+    finally:
+        # Recorded even if the caller has given up on us, so slow backends
+        # keep pushing their own hedge threshold up.
+        backend["latencies"].append(time.monotonic() - t0)
+
+
+def federated_search(
+    backends, dork, num_results, start=0, deadline=None, hedge_percentile=90
+):
+    """Fan one dork out to all backends and merge the answers.
+
+    Returns (urls, attribution, errors): urls in first-seen order,
+    attribution maps url -> [backend names], errors is a list of strings.
+    """
+    started = time.monotonic()
+    pending = {}
+    errors = []
+
+    def launch(group):
+        for b in group:
+            future = submit(b, dork, num_results, start)
+            if future is None:
+                errors.append(
+                    f"{b['name']}: skipped, "
+                    f"{b['max_inflight']} earlier call(s) still running"
+                )
+            else:
+                pending[future] = b
+
+    launch(b for b in backends if b["policy"] == "primary")
+    hedges = [b for b in backends if b["policy"] == "hedge"]
+    fallbacks = [b for b in backends if b["policy"] == "fallback"]
+    hedge_at = hedge_threshold(backends, hedge_percentile)
+    hedged = not hedges
+
+    urls = []
+    attribution = {}
+    got_results = False
+
+    def collect(future):
+        nonlocal got_results
+        backend = pending.pop(future)
+        try:
+            hits = future.result()
+        except Exception as e:
+            errors.append(f"{backend['name']}: {e}")
+            return
+        if hits:
+            got_results = True
+        for url in hits:
+            if url not in attribution:
+                urls.append(url)
+                attribution[url] = []
+            if backend["name"] not in attribution[url]:
+                attribution[url].append(backend["name"])
+
+    timed_out = False
+    while pending:
+        elapsed = time.monotonic() - started
+        if deadline is not None and elapsed >= deadline:
+            timed_out = True
+            break
+        timeout = None
+        if not hedged:
+            timeout = max(0.0, hedge_at - elapsed)
+        if deadline is not None:
+            remaining = deadline - elapsed
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            collect(future)
+        if hedged and done and got_results and hedges:
+            # A hedge or straggler answered; don't wait for the slow tail.
+            break
+        if not hedged and pending and time.monotonic() - started >= hedge_at:
+            launch(hedges)
+            hedged = True
+    if timed_out:
+        names = ", ".join(sorted({b["name"] for b in pending.values()}))
+        errors.append(f"deadline: abandoned slow backend(s) {names}")
+    abandon(pending)
+    pending.clear()
+
+    if not got_results and fallbacks:
+        remaining = None
+        if deadline is not None:
+            remaining = max(0.0, deadline - (time.monotonic() - started))
+        launch(fallbacks)
+        done, _ = wait(list(pending), timeout=remaining)
+        for future in done:
+            collect(future)
+        if pending:
+            names = ", ".join(sorted({b["name"] for b in pending.values()}))
+            errors.append(f"deadline: abandoned fallback backend(s) {names}")
+            abandon(pending)
+    return urls, attribution, errors
@@ -0,0 +1,78 @@
+import os
+import json
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref_src", "mc_cid", "mc_eid")
+
+
+def canonical_url(url):
+    # Collapse the trivial variants search engines hand back for one page.
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("", host, path, urlencode(sorted(query)), ""))
+
+
+def dork_template(dork, inputs):
+    # Turn a concrete dork back into its template so depth/yield history is
+    # shared across targets: 'site:x.com "jdoe"' -> 'site:x.com "{username}"'.
+    template = dork
+    for name, value in sorted(
+        (inputs or {}).items(), key=lambda kv: len(str(kv[1] or "")), reverse=True
+    ):
+        if value:
+            template = template.replace(str(value), "{" + name + "}")
+    return template
+
+
+def dork_key(script_filename, dork, inputs):
+    return f"{script_filename}::{dork_template(dork, inputs)}"
+
+
+def load_depths(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except Exception:
+            return {}
+
+
+def save_depths(depths, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(depths, f, indent=2, sort_keys=True)
+
+
+def planned_pages(depths, key, max_pages):
+    entry = depths.get(key) if key else None
+    if not entry:
+        return 1
+    return max(1, min(max_pages, int(round(entry["depth"]))))
+
+
+def record_depth(depths, key, pages_fetched, useful_pages, max_pages):
+    # Exponential moving average of the deepest page that still paid off.
+    if not key:
+        return
+    entry = depths.get(key)
+    useful = max(1, min(max_pages, useful_pages))
+    if entry is None:
+        entry = {"depth": float(useful), "runs": 0, "pages": 0}
+    else:
+        entry["depth"] = round(0.5 * entry["depth"] + 0.5 * useful, 3)
+    entry["runs"] += 1
+    entry["pages"] += pages_fetched
+    depths[key] = entry
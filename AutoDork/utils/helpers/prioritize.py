@@ -0,0 +1,148 @@
+import os
+import json
+import random
+from datetime import date, datetime
+from rich.table import Table
+
+UNTRIED_SCORE = float("inf")
+
+
+def load_dork_stats(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+                data.setdefault("dorks", {})
+                data.setdefault("daily", {})
+                return data
+            except Exception:
+                pass
+    return {"dorks": {}, "daily": {}}
+
+
+def save_dork_stats(stats, path):
+    today = date.today().isoformat()
+    # Only today's counter matters for the daily budget.
+    stats["daily"] = {today: stats["daily"].get(today, 0)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2, sort_keys=True)
+
+
+def queries_today(stats):
+    return stats["daily"].get(date.today().isoformat(), 0)
+
+
+def dork_yield(entry):
+    # New URLs per request, lightly smoothed so one lucky run isn't gospel.
+    return (entry["new_urls"] + 0.5) / (entry["requests"] + 1)
+
+
+def dork_score(entry):
+    if not entry or not entry.get("runs"):
+        return UNTRIED_SCORE
+    mean_latency = entry["latency"] / max(1, entry["requests"])
+    # New URLs per second of backend time; latency floor avoids div-by-zero
+    # for the local backend.
+    return dork_yield(entry) / max(0.25, mean_latency)
+
+
+def expected_requests(entry):
+    if not entry or not entry.get("runs"):
+        return 1
+    return max(1, int(round(entry["requests"] / entry["runs"])))
+
+
+def plan_dorks(
+    dorks,
+    dork_keys,
+    stats,
+    run_budget=None,
+    day_budget=None,
+    min_yield=0.0,
+    explore_rate=0.1,
+    rng=None,
+):
+    """Order dorks by historical value and drop what the budget can't cover.
+
+    Returns (planned, skipped, budget) where skipped is a list of
+    (dork, reason) and budget is the number of backend calls the run may
+    spend (None for unlimited).
+    """
+    rng = rng or random.Random()
+    budget = run_budget
+    if day_budget is not None:
+        left_today = max(0, day_budget - queries_today(stats))
+        budget = left_today if budget is None else min(budget, left_today)
+    budget_kind = "per-run"
+    if day_budget is not None and (run_budget is None or budget < run_budget):
+        budget_kind = "daily"
+    scored = []
+    for i, dork in enumerate(dorks):
+        entry = stats["dorks"].get(dork_keys.get(dork))
+        scored.append((dork_score(entry), -i, dork, entry))
+    scored.sort(reverse=True)
+
+    planned = []
+    skipped = []
+    remaining = budget
+    for score, _, dork, entry in scored:
+        if entry and entry.get("runs") and dork_yield(entry) < min_yield:
+            if rng.random() >= explore_rate:
+                skipped.append(
+                    (
+                        dork,
+                        f"low yield ({dork_yield(entry):.2f} new/request over "
+                        f"{entry['runs']} run(s)); not sampled this run",
+                    )
+                )
+                continue
+        cost = expected_requests(entry)
+        if remaining is not None and cost > remaining:
+            skipped.append(
+                (
+                    dork,
+                    f"{budget_kind} budget exhausted "
+                    f"(needs ~{cost}, {remaining} left); "
+                    f"score {format_score(score)}",
+                )
+            )
+            continue
+        if remaining is not None:
+            remaining -= cost
+        planned.append(dork)
+    return planned, skipped, budget
+
+
+def record_dork_run(stats, key, requests, new_urls, latency):
+    if not key or not requests:
+        return
+    entry = stats["dorks"].setdefault(
+        key, {"runs": 0, "requests": 0, "new_urls": 0, "latency": 0.0}
+    )
+    entry["runs"] += 1
+    entry["requests"] += requests
+    entry["new_urls"] += new_urls
+    entry["latency"] = round(entry["latency"] + latency, 3)
+    entry["last_run"] = datetime.now().isoformat(timespec="seconds")
+    today = date.today().isoformat()
+    stats["daily"][today] = stats["daily"].get(today, 0) + requests
+
+
+def format_score(score):
+    return "untried" if score == UNTRIED_SCORE else f"{score:.3f}"
+
+
+def report_skipped(skipped, base_name, logs_dir, console):
+    if not skipped:
+        return
+    table = Table(title="Skipped Dorks")
+    table.add_column("Dork", style="cyan", overflow="fold")
+    table.add_column("Reason", style="yellow", overflow="fold")
+    for dork, reason in skipped:
+        table.add_row(dork, reason)
+    console.print(table)
+    log_path = os.path.join(logs_dir, f"{base_name}_schedule.log")
+    with open(log_path, "w", encoding="utf-8") as f:
+        for dork, reason in skipped:
+            f.write(f"SKIPPED\t{dork}\t{reason}\n")
+    console.print(f"[cyan]Schedule report saved to {log_path}[/cyan]")
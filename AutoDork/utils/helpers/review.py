@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import fnmatch
+from urllib.parse import urlsplit
+
+
+def url_domain(url):
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def matching_urls(url_map, new_urls, filters):
+    domain = filters.get("domain")
+    dork = filters.get("dork")
+    for url, dorks in url_map.items():
+        if filters.get("new_only") and url not in new_urls:
+            continue
+        if domain and domain not in url_domain(url):
+            continue
+        if dork and not any(dork in d for d in dorks):
+            continue
+        yield url
+
+
+def compile_pattern(pattern):
+    # "glob:" and "re:" force a kind; unprefixed patterns are regexes, and
+    # only fall back to a glob when they don't compile (e.g. *pastebin.com/*).
+    if pattern.startswith("glob:"):
+        return re.compile(fnmatch.translate(pattern[5:]))
+    if pattern.startswith("re:"):
+        return re.compile(pattern[3:])
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return re.compile(fnmatch.translate(pattern))
+
+
+def describe_filters(filters):
+    parts = []
+    if filters.get("domain"):
+        parts.append(f"domain~{filters['domain']}")
+    if filters.get("dork"):
+        parts.append(f"dork~{filters['dork']}")
+    if filters.get("new_only"):
+        parts.append("NEW only")
+    return ", ".join(parts) or "none"
+
+
+def paginated_review(
+    url_map, new_urls, results_dir, tag_urls_func, inquirer, console, page_size=50
+):
+    """Page through url_map instead of rendering it as one giant checkbox.
+
+    Selections are appended to followup.txt as they are made and their
+    tags are written to followup_tags.json once on the way out, so an
+    aborted review still keeps what was marked so far.
+    """
+    followup_path = os.path.join(results_dir, "followup.txt")
+    tag_path = os.path.join(results_dir, "followup_tags.json")
+    open(followup_path, "w", encoding="utf-8").close()
+    chosen = {}
+
+    def commit(urls, batch=False):
+        # Tags are asked per URL; batch=True asks once for the whole set.
+        urls = [u for u in urls if u not in chosen]
+        if not urls:
+            return
+        with open(followup_path, "a", encoding="utf-8") as f:
+            for url in urls:
+                f.write(url + "\n")
+        chosen.update((url, []) for url in urls)  # kept even if tagging is aborted
+        console.print(
+            "[bold cyan]Tag your marked URLs (optional, enter to skip any):[/bold cyan]"
+        )
+        if batch:
+            label = f"all {len(urls)} matching URLs"
+            tags = tag_urls_func([label]).get(label, [])
+            chosen.update((url, tags) for url in urls)
+        else:
+            tagged = tag_urls_func(urls)
+            chosen.update((url, tagged.get(url, [])) for url in urls)
+        console.print(
+            f"[green]Marked {len(urls)} URL(s) ({len(chosen)} total).[/green]"
+        )
+
+    try:
+        _review_loop(url_map, new_urls, commit, chosen, inquirer, console, page_size)
+    finally:
+        if chosen:
+            with open(tag_path, "w", encoding="utf-8") as tf:
+                json.dump(chosen, tf, indent=2)
+    if chosen:
+        console.print(f"[green]Saved marked URLs to {followup_path}[/green]")
+        console.print(f"[cyan]Saved tags to {tag_path}[/cyan]")
+    return list(chosen)
+
+
+def _review_loop(url_map, new_urls, commit, chosen, inquirer, console, page_size):
+    filters = {"domain": None, "dork": None, "new_only": False}
+    page = 0
+    while True:
+        matches = list(matching_urls(url_map, new_urls, filters))
+        pages = max(1, -(-len(matches) // page_size))
+        page = min(page, pages - 1)
+        page_urls = matches[page * page_size : (page + 1) * page_size]
+        console.print(
+            f"[cyan]{len(matches)} of {len(url_map)} URLs match (filters: "
+            f"{describe_filters(filters)}) — page {page + 1}/{pages}, "
+            f"{len(chosen)} marked[/cyan]"
+        )
+        actions = ["Review this page"]
+        if page + 1 < pages:
+            actions.append("Next page")
+        if page > 0:
+            actions.append("Previous page")
+        actions += [
+            "Jump to page",
+            "Filter by domain",
+            "Filter by dork",
+            "Toggle NEW only",
+            "Select all matching pattern",
+            "Clear filters",
+            "Done",
+        ]
+        action = inquirer.select(message="Review:", choices=actions).execute()
+        if action == "Review this page":
+            if not page_urls:
+                console.print("[yellow]No URLs on this page.[/yellow]")
+                continue
+            unmarked = [u for u in page_urls if u not in chosen]
+            if not unmarked:
+                # Skip ahead to the next page that still has something to mark.
+                later = [
+                    i
+                    for i in range(page + 1, pages)
+                    if any(
+                        u not in chosen
+                        for u in matches[i * page_size : (i + 1) * page_size]
+                    )
+                ]
+                note = f", moving to page {later[0] + 1}" if later else ""
+                console.print(
+                    f"[yellow]Every URL on this page is already marked{note}.[/yellow]"
+                )
+                page = later[0] if later else page
+                continue
+            picked = inquirer.checkbox(
+                message="Mark URLs for follow-up (space = select):",
+                choices=unmarked,
+            ).execute()
+            commit(picked)
+        elif action == "Next page":
+            page += 1
+        elif action == "Previous page":
+            page -= 1
+        elif action == "Jump to page":
+            value = inquirer.text(message=f"Page (1-{pages}):").execute().strip()
+            if value.isdigit():
+                page = max(0, min(pages - 1, int(value) - 1))
+        elif action == "Filter by domain":
+            filters["domain"] = (
+                inquirer.text(message="Domain contains (empty = any):")
+                .execute()
+                .strip()
+                or None
+            )
+            page = 0
+        elif action == "Filter by dork":
+            filters["dork"] = (
+                inquirer.text(message="Dork contains (empty = any):").execute().strip()
+                or None
+            )
+            page = 0
+        elif action == "Toggle NEW only":
+            filters["new_only"] = not filters["new_only"]
+            page = 0
+        elif action == "Select all matching pattern":
+            pattern = (
+                inquirer.text(
+                    message="Regex, or glob: prefix for a glob "
+                    "(e.g. glob:*pastebin.com/*):"
+                )
+                .execute()
+                .strip()
+            )
+            if not pattern:
+                continue
+            try:
+                rx = compile_pattern(pattern)
+            except re.error as e:
+                console.print(f"[red]Bad pattern: {e}[/red]")
+                continue
+            hits = [u for u in matches if rx.search(u)]
+            if not hits:
+                console.print("[yellow]Nothing matched.[/yellow]")
+                continue
+            if inquirer.confirm(
+                message=f"Mark {len(hits)} matching URL(s) for follow-up?"
+            ).execute():
+                batch = (
+                    len(hits) > 1
+                    and inquirer.confirm(
+                        message="Apply one set of tags to all of them? "
+                        "(no = tag each URL)",
+                        default=True,
+                    ).execute()
+                )
+                commit(hits, batch)
+        elif action == "Clear filters":
+            filters = {"domain": None, "dork": None, "new_only": False}
+            page = 0
+        else:
+            break
@@ -0,0 +1,212 @@
+import ipaddress
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Finished jobs kept around for status/stream requests.
+MAX_FINISHED_JOBS = 5000
+
+
+class JobStore:
+    def __init__(self):
+        self.jobs = {}  # insertion order = submission order
+        self.finished = deque()  # ids in the order they finished
+        self.cond = threading.Condition()
+
+    def add(self, job):
+        with self.cond:
+            self.jobs[job["id"]] = job
+
+    def update(self, job_id, **fields):
+        with self.cond:
+            self.jobs[job_id].update(fields)
+            if fields.get("status") in ("done", "failed"):
+                self.finished.append(job_id)
+                while len(self.finished) > MAX_FINISHED_JOBS:
+                    del self.jobs[self.finished.popleft()]
+            self.cond.notify_all()
+
+    def emit(self, job_id, event):
+        with self.cond:
+            self.jobs[job_id]["events"].append(event)
+            self.cond.notify_all()
+
+    def summary(self, job):
+        return {k: v for k, v in job.items() if k != "events"}
+
+
+def job_worker(store, jobs_queue, run_job, console):
+    # One worker on purpose: backends rate-limit us anyway, and run state
+    # (URL cache, depths, stats) is shared between jobs.
+    while True:
+        job_id = jobs_queue.get()
+        job = store.jobs.get(job_id)
+        if job is None:
+            continue
+        store.update(job_id, status="running", started=time.time())
+        console.print(f"[bold blue][JOB][/bold blue] {job_id} {job['script']}")
+        try:
+            result = run_job(
+                job["selected"],
+                job["inputs"],
+                job["output"],
+                lambda event: store.emit(job_id, event),
+            )
+            store.update(job_id, status="done", finished=time.time(), result=result)
+        except Exception as e:
+            store.update(job_id, status="failed", finished=time.time(), error=str(e))
+            console.print(f"[red][JOB][/red] {job_id} failed: {e}")
+
+
+def make_handler(store, jobs_queue, find_script, default_formats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def send_json(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self.send_json(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except Exception as e:
+                return self.send_json(400, {"error": f"bad request: {e}"})
+            selected = find_script(payload.get("script", ""))
+            if not selected:
+                return self.send_json(
+                    404, {"error": f"script {payload.get('script')!r} not found"}
+                )
+            inputs = dict(payload.get("inputs") or {})
+            if payload.get("target") is not None:
+                # Same rule as --wordlist: the target fills the first input.
+                primary_key = (
+                    selected["inputs"][0]["name"] if selected["inputs"] else "input"
+                )
+                inputs[primary_key] = payload["target"]
+            missing = [i["name"] for i in selected["inputs"] if i["name"] not in inputs]
+            if missing:
+                return self.send_json(
+                    400, {"error": f"missing input(s): {', '.join(missing)}"}
+                )
+            output = payload.get("output") or default_formats
+            if isinstance(output, str):
+                output = [x.strip() for x in output.split(",") if x.strip()]
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "script": selected["filename"],
+                "inputs": inputs,
+                "output": output,
+                "status": "queued",
+                "submitted": time.time(),
+                "events": [],
+                "selected": selected,
+            }
+            store.add(job)
+            jobs_queue.put(job["id"])
+            self.send_json(202, {"id": job["id"], "status": "queued"})
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if parts == ["jobs"]:
+                with store.cond:
+                    jobs = [public(store.summary(job)) for job in store.jobs.values()]
+                return self.send_json(200, {"jobs": jobs})
+            if len(parts) >= 2 and parts[0] == "jobs":
+                job = store.jobs.get(parts[1])
+                if job is None:
+                    return self.send_json(404, {"error": "unknown job"})
+                if len(parts) == 2:
+                    return self.send_json(200, public(store.summary(job)))
+                if parts[2] == "stream":
+                    return self.stream(job)
+            self.send_json(404, {"error": "not found"})
+
+        def stream(self, job):
+            # Newline-delimited JSON, one event per URL, then a final status line.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            sent = 0
+            while True:
+                with store.cond:
+                    while sent == len(job["events"]) and job["status"] not in (
+                        "done",
+                        "failed",
+                    ):
+                        store.cond.wait(timeout=15)
+                    events = job["events"][sent:]
+                    finished = job["status"] in ("done", "failed")
+                try:
+                    for event in events:
+                        self.write_chunk(event)
+                    sent += len(events)
+                    if finished and sent == len(job["events"]):
+                        self.write_chunk(public(store.summary(job)))
+                        self.wfile.write(b"0\r\n\r\n")
+                        return
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+        def write_chunk(self, payload):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def public(job):
+    return {k: v for k, v in job.items() if k != "selected"}
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(host, port, run_job, find_script, default_formats, console):
+    if not is_loopback(host):
+        console.print(
+            f"[yellow][WARN][/yellow] Binding to {host}: the job API has no "
+            "authentication, anyone who can reach this address can submit jobs."
+        )
+    store = JobStore()
+    jobs_queue = queue.Queue()
+    threading.Thread(
+        target=job_worker, args=(store, jobs_queue, run_job, console), daemon=True
+    ).start()
+    server = ThreadingHTTPServer(
+        (host, port), make_handler(store, jobs_queue, find_script, default_formats)
+    )
+    server.daemon_threads = True
+    console.print(
+        f"[bold green]AutoDork service listening on http://{host}:{port}[/bold green] "
+        "(Ctrl+C to stop)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]Shutting down AutoDork service.[/yellow]")
+    finally:
+        server.server_close()
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+from helpers.clip_inference import (  # noqa: E402
+    CPU_BACKENDS,
+    setup_backend,
+    text_features,
+    tags_from_features,
+)
+from helpers.decode_pipeline import (
+    clip_preprocess_config,
+    make_preprocess,
+)  # noqa: E402
+
+# CPU tagging backends: images/sec per backend/thread count/batch size, and
+# tag parity against fp32 on the same sample (exact-match rate, mean tag
+# Jaccard, mean embedding cosine).
+#   python benchmarks/bench_cpu_backend.py --dir Organized --images 256
+#   python benchmarks/bench_cpu_backend.py --threads 4,8 --batch-sizes 8,32
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+DEFAULT_TAGS = ["beach", "city", "dog", "cat", "food", "mountains", "people", "car"]
+
+
+def make_images(dirname, count):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        path = os.path.join(dirname, f"bench_{i:04d}.jpg")
+        blocks = (rng.random((12, 16, 3)) * 255).astype("uint8")
+        Image.fromarray(blocks).resize((1024, 768), Image.BILINEAR).save(
+            path, quality=90
+        )
+        paths.append(path)
+    return paths
+
+
+def collect_images(dirname, limit):
+    paths = []
+    for root, _, files in os.walk(dirname):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS):
+                paths.append(os.path.join(root, name))
+                if len(paths) >= limit:
+                    return paths
+    return paths
+
+
+def encode_all(encode, pixels, batch_size):
+    encode(pixels[:1])  # warm-up (ONNX session init, quantized kernels)
+    start = time.perf_counter()
+    feats = np.concatenate(
+        [encode(pixels[i : i + batch_size]) for i in range(0, len(pixels), batch_size)]
+    )
+    return feats, len(pixels) / (time.perf_counter() - start)
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return 1.0 if not a and not b else len(a & b) / len(a | b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU CLIP backends.")
+    parser.add_argument("--dir", help="Sample images from this directory instead")
+    parser.add_argument("--images", type=int, default=128)
+    parser.add_argument("--backends", default=",".join(CPU_BACKENDS))
+    parser.add_argument("--threads", default="auto", help="Comma list, e.g. 4,8,auto")
+    parser.add_argument("--batch-sizes", default="32")
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--tags", help="Tag JSON file (default: config/tags_sfw.json)")
+    args = parser.parse_args()
+
+    tags_path = args.tags or os.path.join(BASE_DIR, "config", "tags_sfw.json")
+    tags = DEFAULT_TAGS
+    if os.path.exists(tags_path):
+        with open(tags_path, "r", encoding="utf-8") as f:
+            tags = sorted(set(json.load(f))) or DEFAULT_TAGS
+
+    tmpdir = tempfile.mkdtemp(prefix="cpubench_")
+    try:
+        paths = (
+            collect_images(args.dir, args.images)
+            if args.dir
+            else make_images(tmpdir, args.images)
+        )
+        onnx_path = os.path.join(tmpdir, "clip_vision.onnx")
+        model, processor, encode, _ = setup_backend("cpu", "fp32", "auto", onnx_path)
+        preprocess = make_preprocess(*clip_preprocess_config(processor))
+        pixels = np.stack([preprocess(p) for p in paths])
+        # fp32 text features for every backend, so only the vision side differs.
+        text_feats, logit_scale = text_features(model, processor, tags, "cpu")
+        ref_feats, _ = encode_all(encode, pixels, 32)
+        ref_tags = tags_from_features(
+            ref_feats, text_feats, logit_scale, tags, args.threshold
+        )
+        print(f"{len(paths)} images, {len(tags)} tags, {os.cpu_count()} CPUs")
+        print(
+            f"{'backend':<8} {'threads':>7} {'batch':>5} {'img/s':>8} "
+            f"{'exact':>6} {'jaccard':>7} {'cosine':>7}"
+        )
+        for backend in args.backends.split(","):
+            for threads in args.threads.split(","):
+                threads = threads if threads == "auto" else int(threads)
+                try:
+                    _, _, encode, used = setup_backend(
+                        "cpu", backend, threads, onnx_path
+                    )
+                except Exception as e:
+                    print(f"{backend:<8} skipped: {e}")
+                    break
+                for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+                    feats, rate = encode_all(encode, pixels, batch_size)
+                    got = tags_from_features(
+                        feats, text_feats, logit_scale, tags, args.threshold
+                    )
+                    exact = np.mean([a == b for a, b in zip(got, ref_tags)])
+                    jac = np.mean([jaccard(a, b) for a, b in zip(got, ref_tags)])
+                    cos = float(np.mean(np.sum(feats * ref_feats, axis=1)))
+                    print(
+                        f"{backend:<8} {used:>7} {batch_size:>5} {rate:8.1f} "
+                        f"{exact:6.1%} {jac:7.3f} {cos:7.4f}"
+                    )
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import shutil
+import struct
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+from PIL import Image  # noqa: E402
+from helpers.media_dates import (  # noqa: E402
+    EXIF_IFD,
+    DATE_TIME_ORIGINAL,
+    MP4_EPOCH,
+    extract_dates,
+    parse_media_date,
+)
+from helpers.video_probe import MediaInfo  # noqa: E402
+
+# Date extraction throughput (files/sec) on a synthetic corpus: JPEGs with
+# EXIF DateTimeOriginal, PNGs without (Pillow fallback) and MP4s with an
+# mvhd creation time behind a large mdat. "before" is the old per-file loop
+# (Pillow open + MediaInfo.parse), "after" is extract_dates().
+#   python benchmarks/bench_date_extraction.py --files 2000
+#   python benchmarks/bench_date_extraction.py --workers 4 --video-mb 8
+
+
+def _atom(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def make_mp4(path, created, mdat_bytes):
+    seconds = int((created - MP4_EPOCH).total_seconds())
+    mvhd = _atom(
+        b"mvhd", bytes(4) + struct.pack(">IIII", seconds, seconds, 1000, 0) + bytes(80)
+    )
+    with open(path, "wb") as f:
+        f.write(_atom(b"ftyp", b"isom\0\0\x02\0isomiso2mp41"))
+        f.write(struct.pack(">I4s", 8 + mdat_bytes, b"mdat"))
+        f.seek(
+            mdat_bytes, os.SEEK_CUR
+        )  # sparse payload; moov after mdat like camera files
+        f.write(_atom(b"moov", mvhd))
+
+
+def make_corpus(dirname, count, video_mb):
+    base = datetime(2015, 6, 1, 12, 0, 0)
+    exif_img = Image.new("RGB", (1600, 1200), (90, 120, 150))
+    plain_img = Image.new("RGB", (800, 600), (150, 120, 90))
+    expected = {}
+    for i in range(count):
+        created = base + timedelta(hours=i)
+        kind = i % 10
+        if kind < 7:
+            path = os.path.join(dirname, f"img_{i:05d}.jpg")
+            exif = Image.Exif()
+            exif[0x0110] = "BenchCam"
+            exif.get_ifd(EXIF_IFD)[DATE_TIME_ORIGINAL] = created.strftime(
+                "%Y:%m:%d %H:%M:%S"
+            )
+            exif_img.save(path, quality=85, exif=exif)
+        elif kind < 9:
+            path = os.path.join(dirname, f"img_{i:05d}.png")
+            plain_img.save(path)
+        else:
+            path = os.path.join(dirname, f"vid_{i:05d}.mp4")
+            make_mp4(path, created, video_mb << 20)
+        expected[path] = created if kind < 7 or kind == 9 else None
+    return expected
+
+
+def legacy_date(path):
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in (".jpg", ".png"):
+            exif = Image.open(path).getexif()
+            date = exif.get(DATE_TIME_ORIGINAL) if exif else None
+            if date:
+                return datetime.strptime(date, "%Y:%m:%d %H:%M:%S")
+        elif MediaInfo is not None:
+            for track in MediaInfo.parse(path).tracks:
+                if track.track_type == "General":
+                    values = [
+                        getattr(track, k)
+                        for k in ("recorded_date", "encoded_date", "tagged_date")
+                        if getattr(track, k, None)
+                    ]
+                    date = parse_media_date(values)
+                    if date:
+                        return date
+    except Exception:
+        pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark capture-date extraction.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument(
+        "--video-mb", type=int, default=4, help="mdat size per synthetic MP4"
+    )
+    parser.add_argument("--workers", default="auto")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="datebench_")
+    try:
+        expected = make_corpus(tmpdir, args.files, args.video_mb)
+        paths = list(expected)
+        embedded = sum(1 for d in expected.values() if d)
+        print(
+            f"{len(paths)} files (70% EXIF JPEG, 20% PNG, 10% MP4), "
+            f"{os.cpu_count()} CPUs"
+        )
+
+        start = time.perf_counter()
+        old = {path: legacy_date(path) for path in paths}
+        before = time.perf_counter() - start
+        found = sum(1 for p, d in expected.items() if d and old[p] == d)
+        print(
+            f"before  {len(paths) / before:9.0f} files/s  ({before:.2f}s)  "
+            f"{found}/{embedded} embedded dates found"
+        )
+
+        conn = sqlite3.connect(os.path.join(tmpdir, "manifest.db"))
+        start = time.perf_counter()
+        dates = extract_dates(conn, paths, args.workers, args.workers)
+        after = time.perf_counter() - start
+        found = sum(1 for p, d in expected.items() if d and dates[p][0] == d)
+        sources = {}
+        for _, source in dates.values():
+            sources[source] = sources.get(source, 0) + 1
+        print(
+            f"after   {len(paths) / after:9.0f} files/s  ({after:.2f}s)  "
+            f"{found}/{embedded} embedded dates found ("
+            + ", ".join(f"{n} {s}" for s, n in sorted(sources.items()))
+            + ")"
+        )
+        conn.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
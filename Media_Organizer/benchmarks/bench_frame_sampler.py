@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+import cv2  # type: ignore  # noqa: E402
+import numpy as np  # noqa: E402
+from helpers.frame_sampler import MODES, av, iter_frames  # noqa: E402
+
+# Frame sampling throughput per codec and mode on synthetic clips: the old
+# per-sample seek against sequential grab()/retrieve() and keyframe-only
+# decoding (PyAV). Reports sampled frames/s and seconds per video.
+#   python benchmarks/bench_frame_sampler.py
+#   python benchmarks/bench_frame_sampler.py --seconds 60 --size 224 --max-frames 30
+# Codecs whose writer can't be opened by this OpenCV build are skipped.
+
+CODECS = [
+    ("MJPG", ".avi"),
+    ("XVID", ".avi"),
+    ("mp4v", ".mp4"),
+    ("avc1", ".mp4"),
+]
+
+
+def make_clip(path, fourcc, seconds, fps, width, height, gop_scenes=2):
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height)
+    )
+    if not writer.isOpened():
+        return False
+    rng = np.random.default_rng(0)
+    for _ in range(seconds * gop_scenes):
+        base = cv2.resize(
+            (rng.random((9, 16, 3)) * 255).astype("uint8"),
+            (width, height),
+            interpolation=cv2.INTER_LINEAR,
+        )
+        for i in range(fps // gop_scenes):
+            # Slow pan so inter-frame codecs have real motion to encode.
+            writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+    return os.path.getsize(path) > 0
+
+
+def time_mode(paths, mode, args):
+    start = time.perf_counter()
+    frames = 0
+    for path in paths:
+        for _ in iter_frames(path, args.interval, args.max_frames, args.size, mode):
+            frames += 1
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark video frame sampling.")
+    parser.add_argument("--videos", type=int, default=3)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--max-frames", type=int, help="Per-video frame cap")
+    parser.add_argument(
+        "--size", type=int, default=224, help="Output short side (0 = full)"
+    )
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    if "keyframes" in modes and av is None:
+        print("PyAV not installed; skipping keyframes mode")
+        modes.remove("keyframes")
+
+    tmpdir = tempfile.mkdtemp(prefix="framebench_")
+    try:
+        print(
+            f"{args.videos} x {args.seconds}s "
+            f"{args.width}x{args.height}@{args.fps} clips, "
+            f"interval={args.interval}s, size={args.size or 'full'}"
+        )
+        print(f"{'codec':<6} {'mode':<10} {'frames':>7} {'frames/s':>9} {'s/video':>8}")
+        for fourcc, ext in CODECS:
+            paths = []
+            for i in range(args.videos):
+                path = os.path.join(tmpdir, f"{fourcc}_{i}{ext}")
+                if not make_clip(
+                    path, fourcc, args.seconds, args.fps, args.width, args.height
+                ):
+                    break
+                paths.append(path)
+            if not paths:
+                print(f"{fourcc:<6} skipped: writer unavailable")
+                continue
+            for mode in modes:
+                frames, elapsed = time_mode(paths, mode, args)
+                print(
+                    f"{fourcc:<6} {mode:<10} {frames:>7} {frames / elapsed:9.1f} "
+                    f"{elapsed / len(paths):8.2f}"
+                )
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
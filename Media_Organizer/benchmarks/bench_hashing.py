@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+from helpers.hashing import (  # noqa: E402
+    auto_workers,
+    available_algorithms,
+    hash_file,
+    run_parallel,
+)
+
+# Hashing throughput (GB/s) across worker counts and algorithms.
+#   python benchmarks/bench_hashing.py                  # synthetic files in a temp dir
+#   python benchmarks/bench_hashing.py --dir /mnt/media # real files on the target disk
+# Without dropping the page cache between runs (needs root), repeated runs
+# measure cached reads; use --dir on a large tree for cold-ish numbers.
+
+
+def make_files(dirname, count, size_mb):
+    chunk = os.urandom(1024 * 1024)
+    paths = []
+    for i in range(count):
+        path = os.path.join(dirname, f"bench_{i:04d}.bin")
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(chunk)
+        paths.append(path)
+    return paths
+
+
+def collect_files(dirname, limit):
+    paths = []
+    for root, _, files in os.walk(dirname):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                paths.append(path)
+                if len(paths) >= limit:
+                    return paths
+    return paths
+
+
+def run(paths, algorithm, workers, chunk_kb, mmap_mb):
+    total = sum(os.path.getsize(p) for p in paths)
+    start = time.perf_counter()
+    results = run_parallel(
+        paths,
+        lambda p: hash_file(
+            p,
+            algorithm,
+            buffer_size=chunk_kb * 1024,
+            mmap_threshold=mmap_mb * 1024 * 1024 if mmap_mb else 0,
+        ),
+        workers,
+    )
+    elapsed = time.perf_counter() - start
+    failed = sum(isinstance(r, Exception) for r in results.values())
+    return total / elapsed / 1e9, elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hashing engine.")
+    parser.add_argument("--dir", help="Hash files from this directory instead")
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--workers", default="1,2,4,8,16")
+    parser.add_argument("--algorithms", default="md5,blake2b,sha1")
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument(
+        "--mmap-mb",
+        type=int,
+        default=0,
+        help="Use mmap for files >= this size (0 = off)",
+    )
+    parser.add_argument(
+        "--legacy", action="store_true", help="Also time the old 8 KB single-thread MD5"
+    )
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.dir:
+        paths = collect_files(args.dir, args.files)
+        target = args.dir
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="hashbench_")
+        print(f"Writing {args.files} x {args.size_mb} MB to {tmpdir} ...")
+        paths = make_files(tmpdir, args.files, args.size_mb)
+        target = tmpdir
+    workers_auto, kind = auto_workers(target)
+    print(f"{len(paths)} files | device: {kind} (auto workers: {workers_auto})")
+    try:
+        if args.legacy:
+            gbps, elapsed, _ = run(paths, "md5", 1, 8, 0)
+            print(
+                f"{'md5 (8 KB legacy)':<20} workers={1:<3} "
+                f"{gbps:6.2f} GB/s  ({elapsed:.2f}s)"
+            )
+        algos = [a for a in args.algorithms.split(",") if a in available_algorithms()]
+        for algo in algos:
+            for w in [int(x) for x in args.workers.split(",")]:
+                gbps, elapsed, failed = run(paths, algo, w, args.chunk_kb, args.mmap_mb)
+                note = f"  {failed} failed" if failed else ""
+                print(
+                    f"{algo:<20} workers={w:<3} "
+                    f"{gbps:6.2f} GB/s  ({elapsed:.2f}s){note}"
+                )
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+from helpers.media_index import (  # noqa: E402
+    open_index,
+    merge_log,
+    export_jsonl,
+    query,
+)
+
+# Media index query latency on a synthetic library: tag/NSFW logs are merged
+# with merge_log() (ingest rate), then the same questions are answered by a
+# full scan of the JSONL export ("before", what ad-hoc scripts had to do)
+# and by query() over the tag/date/score indexes ("after").
+#   python benchmarks/bench_query.py --entries 200000
+#   python benchmarks/bench_query.py --entries 1000000 --tags 2000
+
+QUERIES = {
+    "unsafe images tagged t7 from 2019": dict(
+        tags=["t7"],
+        classification="unsafe",
+        kind="image",
+        date_from="2019",
+        date_to="2019",
+    ),
+    "tagged t3 and t11": dict(tags=["t3", "t11"]),
+    "score >= 0.95 in 2021-06": dict(
+        min_score=0.95, date_from="2021-06", date_to="2021-06"
+    ),
+    "first 100 tagged t1": dict(tags=["t1"], limit=100),
+}
+
+
+def make_logs(dirname, entries, tag_count, seed=0):
+    rng = random.Random(seed)
+    # Zipf-ish tag popularity, like a real vocabulary.
+    weights = [1 / (i + 1) for i in range(tag_count)]
+    tags = [f"t{i}" for i in range(tag_count)]
+    paths = []
+    with open(
+        os.path.join(dirname, "media_tags_20240101_000000.tsv"), "w", encoding="utf-8"
+    ) as f:
+        f.write("FilePath\tTags...\n")
+        for i in range(entries):
+            ext = ".mp4" if i % 10 == 0 else ".jpg"
+            path = f"/library/{i % 997:03d}/file_{i:08d}{ext}"
+            paths.append(path)
+            f.write(
+                path
+                + "\t"
+                + "\t".join(set(rng.choices(tags, weights, k=rng.randint(1, 8))))
+                + "\n"
+            )
+    with open(
+        os.path.join(dirname, "nsfw_log_20240101_000001.csv"), "w", encoding="utf-8"
+    ) as f:
+        f.write("File,Classification,UnsafeScore\n")
+        for path in paths:
+            score = rng.random()
+            f.write(f"{path},{'unsafe' if score >= 0.6 else 'safe'},{score:.4f}\n")
+    start = date(2015, 1, 1)
+    return [
+        (path, (start + timedelta(days=rng.randrange(3650))).isoformat())
+        for path in paths
+    ]
+
+
+def scan_jsonl(
+    path,
+    tags=(),
+    classification=None,
+    kind=None,
+    date_from=None,
+    date_to=None,
+    min_score=None,
+    limit=None,
+):
+    matches = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if tags and not set(tags) <= set(entry["tags"]):
+                continue
+            if classification and entry["classification"] != classification:
+                continue
+            if kind and entry["media_type"] != kind:
+                continue
+            if date_from and entry["capture_date"] < date_from:
+                continue
+            if date_to and entry["capture_date"][: len(date_to)] > date_to:
+                continue
+            if min_score is not None and entry["unsafe_score"] < min_score:
+                continue
+            matches.append(entry["file"])
+            if limit and len(matches) >= limit:
+                break
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark media index queries.")
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--tags", type=int, default=500, help="vocabulary size")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="querybench_")
+    try:
+        dates = make_logs(tmpdir, args.entries, args.tags)
+        conn = open_index(os.path.join(tmpdir, "media_index.db"))
+        start = time.perf_counter()
+        for kind, name in (
+            ("media_tags_", "media_tags_20240101_000000.tsv"),
+            ("nsfw_log_", "nsfw_log_20240101_000001.csv"),
+        ):
+            merge_log(conn, tmpdir, kind, name)
+        ingest = time.perf_counter() - start
+        with conn:
+            conn.executemany(
+                "UPDATE media SET capture_date = ? WHERE path = ?",
+                ((d, p) for p, d in dates),
+            )
+        conn.execute("ANALYZE")
+        jsonl = os.path.join(tmpdir, "media_index.jsonl")
+        export_jsonl(conn, jsonl)
+        print(
+            f"{args.entries} entries, {args.tags} tags; merged logs at "
+            f"{args.entries / ingest:,.0f} entries/s"
+        )
+
+        for label, filters in QUERIES.items():
+            start = time.perf_counter()
+            expected = scan_jsonl(jsonl, **filters)
+            before = time.perf_counter() - start
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                found = [row[0] for row in query(conn, **filters)]
+                timings.append(time.perf_counter() - start)
+            after = sorted(timings)[len(timings) // 2]
+            same = (
+                sorted(found) == sorted(expected)
+                if not filters.get("limit")
+                else len(found) == len(expected)
+            )
+            print(
+                f"{label:36s} {len(found):7d} hits  before {before * 1000:9.1f} ms  "
+                f"after {after * 1000:8.2f} ms  {'match' if same else 'MISMATCH'}"
+            )
+        conn.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
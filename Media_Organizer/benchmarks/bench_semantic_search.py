@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+from helpers.embedding_store import open_store, append, load_matrix  # noqa: E402
+from helpers.vector_index import (  # noqa: E402
+    DEFAULT_NPROBE,
+    brute_force,
+    ensure_ivfpq,
+    search_ivfpq,
+)
+
+# Semantic search latency and recall on a synthetic embedding store (CLIP-
+# sized, L2-normalised float16 vectors with low intrinsic dimension, which
+# is what makes real embeddings searchable). Brute force is the exact
+# reference; IVF-PQ is timed per query after a one-off build, at several
+# nprobe settings, with recall@k against brute force.
+#   python benchmarks/bench_semantic_search.py --vectors 200000
+#   python benchmarks/bench_semantic_search.py --vectors 1000000 --nprobe 32 64 128
+
+
+def make_vectors(count, dim, rank, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim)).astype(np.float32)
+    for start in range(0, count, 65536):
+        n = min(65536, count - start)
+        x = rng.standard_normal((n, rank)).astype(np.float32) @ basis
+        x += 0.05 * np.sqrt(rank) * rng.standard_normal((n, dim)).astype(np.float32)
+        yield x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semantic search backends.")
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument(
+        "--rank", type=int, default=32, help="intrinsic dimension of the data"
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument(
+        "--nprobe", type=int, nargs="+", default=[16, 32, DEFAULT_NPROBE, 128]
+    )
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="searchbench_")
+    try:
+        store = open_store(tmpdir, "bench/clip", args.dim)
+        row = 0
+        for block in make_vectors(args.vectors, args.dim, args.rank):
+            append(store, [f"h{i}" for i in range(row, row + len(block))], block)
+            row += len(block)
+        matrix = load_matrix(store)
+        rng = np.random.default_rng(1)
+        queries = np.asarray(
+            matrix[rng.integers(0, len(matrix), args.queries)], dtype=np.float32
+        )
+        queries += 0.02 * rng.standard_normal(queries.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        print(f"{len(matrix)} x {args.dim} float16 vectors, {os.cpu_count()} CPUs")
+
+        start = time.perf_counter()
+        truth = [brute_force(matrix, q, args.k)[0] for q in queries]
+        brute = (time.perf_counter() - start) / len(queries)
+        print(
+            f"brute force            {brute * 1000:8.2f} ms/query  "
+            f"recall@{args.k} 1.000"
+        )
+
+        start = time.perf_counter()
+        index, action = ensure_ivfpq(store["index_path"], matrix)
+        print(
+            f"IVF-PQ {action} in {time.perf_counter() - start:.1f}s "
+            f"({len(index['centroids'])} lists, {index['codes'].shape[1]} bytes/vector)"
+        )
+        for nprobe in args.nprobe:
+            start = time.perf_counter()
+            found = [search_ivfpq(index, matrix, q, args.k, nprobe)[0] for q in queries]
+            elapsed = (time.perf_counter() - start) / len(queries)
+            recall = np.mean(
+                [len(set(a) & set(b)) / args.k for a, b in zip(truth, found)]
+            )
+            print(
+                f"IVF-PQ nprobe {nprobe:4d}     {elapsed * 1000:8.2f} ms/query  "
+                f"recall@{args.k} {recall:.3f}"
+            )
+        store["conn"].close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+    ),
+)
+import cv2  # type: ignore  # noqa: E402
+import numpy as np  # noqa: E402
+import torch  # type: ignore  # noqa: E402
+from PIL import Image  # noqa: E402
+from transformers import CLIPProcessor, CLIPModel  # type: ignore  # noqa: E402
+from helpers.clip_inference import (  # noqa: E402
+    MODEL_NAME,
+    setup_backend,
+    text_features,
+    tag_images,
+)
+
+# Video tagging throughput (videos/minute): the old per-video path (model
+# reloaded per video, text re-encoded with every batch) against the shared
+# inference module (model loaded once, cached text embeddings, vision-only).
+#   python benchmarks/bench_video_tagging.py                  # synthetic clips
+#   python benchmarks/bench_video_tagging.py --dir Organized  # real videos
+# Frame sampling is identical in both paths so only inference is compared.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv", ".m4v", ".webm")
+DEFAULT_TAGS = ["beach", "city", "dog", "cat", "food", "mountains", "people", "car"]
+
+
+def make_videos(dirname, count, seconds, fps=10):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        path = os.path.join(dirname, f"bench_{i:03d}.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (320, 240))
+        for _ in range(seconds):
+            frame = cv2.resize(
+                (rng.random((6, 8, 3)) * 255).astype("uint8"),
+                (320, 240),
+                interpolation=cv2.INTER_NEAREST,
+            )
+            for _ in range(fps):
+                writer.write(frame)
+        writer.release()
+        paths.append(path)
+    return paths
+
+
+def collect_videos(dirname, limit):
+    paths = []
+    for root, _, files in os.walk(dirname):
+        for name in sorted(files):
+            if name.lower().endswith(VIDEO_EXTS):
+                paths.append(os.path.join(root, name))
+                if len(paths) >= limit:
+                    return paths
+    return paths
+
+
+def sample_frames(video_path, interval_sec=1):
+    frames = []
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    for frame_no in range(0, frame_count, max(1, int(fps * interval_sec))):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+    cap.release()
+    return frames
+
+
+def legacy_tag(frames, tags, batch_size, device, threshold):
+    model = CLIPModel.from_pretrained(MODEL_NAME).to(device)
+    processor = CLIPProcessor.from_pretrained(MODEL_NAME)
+    out = []
+    for i in range(0, len(frames), batch_size):
+        inputs = processor(
+            text=tags,
+            images=frames[i : i + batch_size],
+            return_tensors="pt",
+            padding=True,
+        )
+        inputs = {
+            k: v.to(device) if torch.is_tensor(v) else v for k, v in inputs.items()
+        }
+        probs = model(**inputs).logits_per_image.softmax(dim=1).detach().cpu().numpy()
+        out += [[t for t, p in zip(tags, row) if p >= threshold] for row in probs]
+    return out
+
+
+def run(label, videos, frames_by_video, tag_func):
+    start = time.perf_counter()
+    results = {}
+    for path in videos:
+        results[path] = tag_func(frames_by_video[path])
+    elapsed = time.perf_counter() - start
+    frames = sum(len(f) for f in frames_by_video.values())
+    print(
+        f"{label:<10} {len(videos) / elapsed * 60:8.1f} videos/min  "
+        f"{frames / elapsed:7.1f} frames/s  ({elapsed:.1f}s)"
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLIP video tagging.")
+    parser.add_argument("--dir", help="Tag videos from this directory instead")
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--seconds", type=int, default=20, help="Synthetic clip length")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=24)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--tags", help="Tag JSON file (default: config/tags_sfw.json)")
+    parser.add_argument(
+        "--backend",
+        default="fp32",
+        choices=("fp32", "int8", "onnx"),
+        help="CPU backend for 'after'",
+    )
+    args = parser.parse_args()
+
+    tags_path = args.tags or os.path.join(BASE_DIR, "config", "tags_sfw.json")
+    tags = DEFAULT_TAGS
+    if os.path.exists(tags_path):
+        with open(tags_path, "r", encoding="utf-8") as f:
+            tags = sorted(set(json.load(f))) or DEFAULT_TAGS
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    tmpdir = None
+    if args.dir:
+        videos = collect_videos(args.dir, args.videos)
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="tagbench_")
+        videos = make_videos(tmpdir, args.videos, args.seconds)
+    try:
+        frames_by_video = {p: sample_frames(p, args.interval) for p in videos}
+        print(
+            f"{len(videos)} videos, {sum(map(len, frames_by_video.values()))} frames, "
+            f"{len(tags)} tags, device={device}"
+        )
+        old = run(
+            "before",
+            videos,
+            frames_by_video,
+            lambda frames: legacy_tag(
+                frames, tags, args.batch_size, device, args.threshold
+            ),
+        )
+        cache_dir = tempfile.mkdtemp(prefix="tagbench_text_")
+        onnx_path = os.path.join(cache_dir, "clip_vision.onnx")
+        try:
+
+            def shared(frames):
+                model, processor, encode, _ = setup_backend(
+                    device, args.backend, "auto", onnx_path
+                )
+                text = text_features(
+                    model, processor, tags, device, cache_dir=cache_dir
+                )
+                return tag_images(
+                    frames,
+                    tags,
+                    text,
+                    processor,
+                    encode,
+                    args.batch_size,
+                    args.threshold,
+                )
+
+            new = run("after", videos, frames_by_video, shared)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        same = sum(old[p] == new[p] for p in videos)
+        print(f"Identical frame tags in {same}/{len(videos)} videos")
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import json
 import argparse
 from datetime import datetime
 from colorama import Fore, Style, init
+from helpers.manifest import stage_manifest, manifest_files
 
 init(autoreset=True)
 BANNER = f"""
@@ -34,6 +35,7 @@ ERROR_LOG = os.path.join(
     LOGS_DIR, f"detect_nsfw_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
 CHECKPOINT_FILE = os.path.join(LOGS_DIR, "detect_nsfw_checkpoint.json")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
 CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
 
 # --- ARGS ---
@@ -44,6 +46,11 @@ parser.add_argument("--dry-run", action="store_true", help="Preview, no changes
 parser.add_argument(
     "--resume", action="store_true", help="Resume from last checkpoint if available"
 )
+parser.add_argument(
+    "--rescan",
+    action="store_true",
+    help="Rescan the tree even if the manifest is fresh",
+)
 args = parser.parse_args()
 
 # --- BACKEND AUTO-DETECTION ---
@@ -91,13 +98,12 @@ else:
     confidence_threshold = 0.6
 
 
-def gather_image_files(organized_dir):
-    img_files = []
-    for root, _, files in os.walk(organized_dir):
-        for file in files:
-            if file.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".bmp")):
-                img_files.append(os.path.join(root, file))
-    return img_files
+def gather_image_files(manifest, organized_dir):
+    return [
+        row[0]
+        for row in manifest_files(manifest, organized_dir, ("image",))
+        if row[0].lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".bmp"))
+    ]
 
 
 already_checked = set()
@@ -106,7 +112,10 @@ if args.resume and os.path.exists(CHECKPOINT_FILE):
         checkpoint = json.load(f)
     already_checked = set(checkpoint.get("checked_files", []))
 
-img_files = [f for f in gather_image_files(ORGANIZED_DIR) if f not in already_checked]
+manifest = stage_manifest(MANIFEST_FILE, ORGANIZED_DIR, config, args.rescan, ERROR_LOG)
+img_files = [
+    f for f in gather_image_files(manifest, ORGANIZED_DIR) if f not in already_checked
+]
 print(Fore.CYAN + f"🖼️ Found {len(img_files)} new images to scan." + Style.RESET_ALL)
 
 if not img_files:
@@ -170,7 +179,7 @@ if not args.dry_run and results:
     print(Fore.GREEN + f"📝 NSFW log: {NSFW_LOG}" + Style.RESET_ALL)
 
 if errors:
-    with open(ERROR_LOG, "w", encoding="utf-8") as f:
+    with open(ERROR_LOG, "a", encoding="utf-8") as f:
         for fpath, msg in errors:
             f.write(f"{fpath}\t{msg}\n")
     print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
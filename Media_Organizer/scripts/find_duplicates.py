@@ -8,12 +8,22 @@ if len(sys.argv) > 2 and not sys.argv[1].startswith("-"):
 
 import os
 import json
-import hashlib
 import argparse
 from collections import defaultdict
 from tqdm import tqdm
 from datetime import datetime
 from colorama import Fore, Style, init
+from helpers.hashing import (
+    DEFAULT_ALGORITHM,
+    available_algorithms,
+    hash_file,
+    hash_partial,
+    resolve_workers,
+    run_parallel,
+)
+from helpers.dedupe import format_bytes
+from helpers.hash_cache import open_hash_cache, lookup, store, prune
+from helpers.manifest import stage_manifest, manifest_files
 
 # --- SETUP ---
 init(autoreset=True)
@@ -36,10 +46,17 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOGS_DIR, exist_ok=True)
-CHECKPOINT_FILE = os.path.join(LOGS_DIR, "find_duplicates_checkpoint.json")
+HASH_CACHE_FILE = os.path.join(LOGS_DIR, "hash_cache.sqlite")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
 DUPLICATES_LOG = os.path.join(
     LOGS_DIR, f"duplicate_log_{datetime.now():%Y%m%d_%H%M%S}.csv"
 )
+NEAR_DUPLICATES_LOG = os.path.join(
+    LOGS_DIR, f"near_duplicate_log_{datetime.now():%Y%m%d_%H%M%S}.csv"
+)
+VIDEO_MATCH_LOG = os.path.join(
+    LOGS_DIR, f"video_match_log_{datetime.now():%Y%m%d_%H%M%S}.csv"
+)
 ERROR_LOG = os.path.join(
     LOGS_DIR, f"duplicate_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
@@ -55,7 +72,42 @@ parser.add_argument(
     help="Do not write/move anything, just print what would happen",
 )
 parser.add_argument(
-    "--resume", action="store_true", help="Resume from last checkpoint if available"
+    "--rescan",
+    action="store_true",
+    help="Rescan the tree even if the manifest is fresh",
+)
+parser.add_argument(
+    "--no-cache", action="store_true", help="Ignore and don't update the hash cache"
+)
+parser.add_argument(
+    "--algorithm",
+    choices=available_algorithms(),
+    help="Hash algorithm (default: config hash_algorithm, else md5)",
+)
+parser.add_argument(
+    "--workers", help="Hashing threads, or 'auto' to tune by device type"
+)
+parser.add_argument(
+    "--near-duplicates",
+    action="store_true",
+    help="Find resized/re-encoded copies of images by perceptual hash instead",
+)
+parser.add_argument(
+    "--hash-method",
+    choices=("dhash", "phash"),
+    help="Perceptual hash for --near-duplicates "
+    "(default: config perceptual_hash, else phash)",
+)
+parser.add_argument(
+    "--threshold",
+    type=int,
+    help="Max Hamming distance (of 64 bits) per image/frame for near-duplicate modes "
+    "(default: config, else 10)",
+)
+parser.add_argument(
+    "--near-videos",
+    action="store_true",
+    help="Find re-encoded/trimmed copies of videos by frame-signature matching instead",
 )
 args = parser.parse_args()
 
@@ -64,68 +116,207 @@ if os.path.exists(CONFIG_FILE):
     with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         config = json.load(f)
     min_size_kb = config.get("min_file_size_kb", 1)
+    partial_hash_kb = config.get("partial_hash_kb", 64)
+    hash_algorithm = config.get("hash_algorithm", DEFAULT_ALGORITHM)
+    hash_workers = config.get("hash_workers", "auto")
+    use_hash_cache = config.get("hash_cache", True)
+    perceptual_hash = config.get("perceptual_hash", "phash")
+    near_threshold = config.get("near_duplicate_threshold", 10)
+    video_interval = config.get("video_fingerprint_interval", 1.0)
+    video_min_seconds = config.get("video_match_min_seconds", 5)
+    video_min_coverage = config.get("video_match_min_coverage", 0.5)
 else:
     config = {}
     min_size_kb = 1
+    partial_hash_kb = 64
+    hash_algorithm = DEFAULT_ALGORITHM
+    hash_workers = "auto"
+    use_hash_cache = True
+    perceptual_hash = "phash"
+    near_threshold = 10
+    video_interval = 1.0
+    video_min_seconds = 5
+    video_min_coverage = 0.5
+hash_algorithm = args.algorithm or hash_algorithm
+hash_workers = args.workers or hash_workers
+perceptual_hash = args.hash_method or perceptual_hash
+near_threshold = args.threshold if args.threshold is not None else near_threshold
 
-# --- CHECKPOINT (structure for future use) ---
-resume_hashes = {}
-if args.resume and os.path.exists(CHECKPOINT_FILE):
-    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-        resume_data = json.load(f)
-    resume_hashes = resume_data.get("hashes", {})
 
+def hash_stage(items, hash_func, desc, colour, errors, workers=1):
+    # items: [(file_path, size)]; returns {file_path: hash_func result}
+    out = {}
+    pbar = tqdm(total=len(items), desc=desc, unit="file", colour=colour)
 
-def compute_md5(file_path, chunk_size=8192):
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                hash_md5.update(chunk)
-    except PermissionError:
-        raise PermissionError(f"Permission denied: {file_path}")
-    except Exception as e:
-        raise RuntimeError(f"Can't read file: {file_path} — {e}")
-    return hash_md5.hexdigest()
+    def on_done(item, result):
+        file_path = item[0]
+        if isinstance(result, PermissionError):
+            errors.append((file_path, str(result)))
+            pbar.write(
+                Fore.YELLOW + f"⚠️ Permission denied: {file_path}" + Style.RESET_ALL
+            )
+        elif isinstance(result, Exception):
+            errors.append((file_path, str(result)))
+            pbar.write(Fore.RED + f"❌ Error: {file_path} — {result}" + Style.RESET_ALL)
+        else:
+            out[file_path] = result
+        pbar.update(1)
+
+    run_parallel(items, lambda item: hash_func(*item), workers, on_done)
+    pbar.close()
+    return out
 
 
-def find_duplicate_files(base_dir, min_kb, error_log_path):
+def colliding(groups):
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def find_duplicate_files(
+    base_dir,
+    rows,
+    min_kb,
+    error_log_path,
+    partial_kb=64,
+    algorithm=DEFAULT_ALGORITHM,
+    workers=1,
+    cache=None,
+    update_cache=True,
+):
     hash_map = defaultdict(list)
     files_to_scan = []
     errors = []
-    for root, _, files in os.walk(base_dir):
-        for name in files:
-            file_path = os.path.join(root, name)
+    for file_path, size, *_ in rows:
+        if size / 1024 < min_kb:
+            errors.append((file_path, f"File too small ({size / 1024:.1f} KB)"))
+            continue
+        files_to_scan.append((file_path, size))
+
+    # Stage 1: only files sharing an exact size can be duplicates.
+    by_size = defaultdict(list)
+    for file_path, size in files_to_scan:
+        by_size[size].append((file_path, size))
+    stage2 = [item for members in colliding(by_size) for item in members]
+
+    # Hashes from earlier runs, for files whose dev/inode/size/mtime are unchanged.
+    # Candidates are re-stat'ed: the manifest may predate an in-place edit.
+    cached = {}
+    stats = {}
+    if cache is not None:
+        for file_path, _ in stage2:
             try:
-                if os.path.islink(file_path):
-                    errors.append((file_path, "Symlink skipped"))
-                    continue
-                size_kb = os.path.getsize(file_path) / 1024
-                if size_kb < min_kb:
-                    errors.append((file_path, f"File too small ({size_kb:.1f} KB)"))
-                    continue
-                files_to_scan.append(file_path)
-            except Exception as e:
+                stats[file_path] = os.stat(file_path)
+            except OSError as e:
                 errors.append((file_path, f"Stat failed: {e}"))
+                continue
+            entry = lookup(cache, file_path, stats[file_path], algorithm)
+            if entry:
+                cached[file_path] = entry
+    cache_hits = 0
 
-    pbar = tqdm(files_to_scan, desc="🔍 Hashing files", unit="file", colour="cyan")
-    for file_path in pbar:
-        try:
-            file_hash = compute_md5(file_path)
-            if file_hash:
-                hash_map[file_hash].append(file_path)
+    # Stage 2: first/last N KB of each size-collision survivor.
+    edge_bytes = max(1, int(partial_kb * 1024))
+    bytes_read = 0
+    bytes_touched = 0  # distinct file bytes read at least once
+    partials = {}
+    to_partial = []
+    for file_path, size in stage2:
+        entry = cached.get(file_path)
+        if entry and entry["partial_kb"] == partial_kb and entry["partial_hash"]:
+            complete = size <= 2 * edge_bytes
+            partials[file_path] = (entry["partial_hash"], 0, complete)
+            cache_hits += 1
+        else:
+            to_partial.append((file_path, size))
+    partials.update(
+        hash_stage(
+            to_partial,
+            lambda path, size: hash_partial(path, size, edge_bytes, algorithm),
+            "🔍 Partial hashing",
+            "blue",
+            errors,
+            workers,
+        )
+    )
+    by_partial = defaultdict(list)
+    for file_path, size in stage2:
+        if file_path in partials:
+            partial_hash, nread, complete = partials[file_path]
+            bytes_read += nread
+            bytes_touched += nread
+            by_partial[(size, partial_hash)].append((file_path, size))
+
+    # Stage 3: full hash only where the partial hashes still collide.
+    stage3 = []
+    fulls = {}
+    for members in colliding(by_partial):
+        for file_path, size in members:
+            partial_hash, _, complete = partials[file_path]
+            entry = cached.get(file_path)
+            if complete:
+                hash_map[partial_hash].append(file_path)
+            elif entry and entry["full_hash"]:
+                fulls[file_path] = entry["full_hash"]
+                hash_map[entry["full_hash"]].append(file_path)
+                cache_hits += 1
             else:
-                errors.append((file_path, "Hash failed"))
-        except PermissionError as e:
-            errors.append((file_path, str(e)))
-            pbar.write(
-                Fore.YELLOW + f"⚠️ Permission denied: {file_path}" + Style.RESET_ALL
+                stage3.append((file_path, size))
+    hashed = hash_stage(
+        stage3,
+        lambda path, size: hash_file(path, algorithm),
+        "🔍 Hashing files",
+        "cyan",
+        errors,
+        workers,
+    )
+    fulls.update(hashed)
+    for file_path, size in stage3:
+        file_hash = hashed.get(file_path)
+        if file_hash:
+            hash_map[file_hash].append(file_path)
+            bytes_read += size
+            bytes_touched += size - partials[file_path][1]
+        elif file_path in hashed:
+            errors.append((file_path, "Hash failed"))
+
+    if cache is not None and update_cache:
+        fresh = [p for p, _ in to_partial if p in partials] + [p for p, _ in stage3]
+        store(
+            cache,
+            (
+                (
+                    p,
+                    stats[p],
+                    partial_kb,
+                    partials[p][0],
+                    fulls.get(p) or (partials[p][0] if partials[p][2] else None),
+                )
+                for p in dict.fromkeys(fresh)
+                if p in partials and p in stats
+            ),
+            algorithm,
+        )
+        pruned = prune(cache, base_dir, (row[0] for row in rows))
+        if pruned:
+            print(
+                Fore.CYAN
+                + f"🧹 Pruned {pruned} vanished files from hash cache."
+                + Style.RESET_ALL
             )
-        except Exception as e:
-            errors.append((file_path, str(e)))
-            pbar.write(Fore.RED + f"❌ Error: {file_path} — {e}" + Style.RESET_ALL)
+
+    bytes_total = sum(size for _, size in files_to_scan)
+    print(
+        Fore.CYAN
+        + f"\n📊 {len(files_to_scan)} files scanned: {len(stage2)} share a size, "
+        f"{len(stage3)} needed a full hash, {cache_hits} hashes reused from cache."
+        + Style.RESET_ALL
+    )
+    print(
+        Fore.CYAN + f"📊 Bytes read: {format_bytes(bytes_read)} | "
+        f"never read: {format_bytes(bytes_total - bytes_touched)} "
+        f"of {format_bytes(bytes_total)}" + Style.RESET_ALL
+    )
     if errors:
-        with open(error_log_path, "w", encoding="utf-8") as elog:
+        with open(error_log_path, "a", encoding="utf-8") as elog:
             for path, err in errors:
                 elog.write(f"{path},{err}\n")
         print(
@@ -136,6 +327,174 @@ def find_duplicate_files(base_dir, min_kb, error_log_path):
     return {h: paths for h, paths in hash_map.items() if len(paths) > 1}, errors
 
 
+def find_near_duplicates(rows, min_kb, error_log_path, method, threshold, workers=1):
+    # Imported here so exact mode keeps working without NumPy/Pillow.
+    from helpers.phash import image_hash, is_image, group_near_duplicates
+
+    images = [
+        (path, size)
+        for path, size, *_ in rows
+        if is_image(path) and size / 1024 >= min_kb
+    ]
+    errors = []
+
+    hashed = hash_stage(
+        images,
+        lambda path, size: image_hash(path, method),
+        f"🖼️  {method}",
+        "magenta",
+        errors,
+        workers,
+    )
+    entries = {
+        path: (hashed[path][0], hashed[path][1], size)
+        for path, size in images
+        if path in hashed
+    }
+    groups = group_near_duplicates(entries, threshold)
+    print(
+        Fore.CYAN + f"\n📊 {len(images)} images, {len(entries)} hashed, "
+        f"{sum(len(g) for g in groups)} in near-duplicate groups "
+        f"(≤ {threshold} bits apart)." + Style.RESET_ALL
+    )
+    if errors:
+        with open(error_log_path, "a", encoding="utf-8") as elog:
+            for path, err in errors:
+                elog.write(f"{path},{err}\n")
+        print(
+            Fore.YELLOW
+            + f"\n⚠️ Warnings/Errors logged to: {error_log_path}"
+            + Style.RESET_ALL
+        )
+    return groups, errors
+
+
+def report_near_duplicates(groups):
+    from helpers.phash import hash_hex
+
+    print(
+        Fore.GREEN
+        + f"\n✅ Found {len(groups)} sets of near-duplicate images.\n"
+        + Style.RESET_ALL
+    )
+    if not args.dry_run and groups:
+        with open(NEAR_DUPLICATES_LOG, "w", encoding="utf-8") as out:
+            out.write("GroupID,Hash,Similarity,FilePath\n")
+            for idx, group in enumerate(groups, 1):
+                for path, value, score in group:
+                    out.write(f"{idx},{hash_hex(value)},{score:.3f},{path}\n")
+        print(
+            Fore.GREEN
+            + f"📝 Near-duplicate log saved to {NEAR_DUPLICATES_LOG}"
+            + Style.RESET_ALL
+        )
+    elif not groups:
+        print(
+            Fore.YELLOW + "No near-duplicates found. No log written." + Style.RESET_ALL
+        )
+    else:
+        print(Fore.YELLOW + "[Dry Run] No logs written." + Style.RESET_ALL)
+
+    for idx, group in enumerate(groups, 1):
+        print(Fore.MAGENTA + f"[Group {idx}] Keep: {group[0][0]}" + Style.RESET_ALL)
+        for path, _, score in group[1:]:
+            print("  " + Fore.YELLOW + f"- {path} ({score:.0%})" + Style.RESET_ALL)
+        print()
+
+
+def find_near_duplicate_videos(
+    rows,
+    min_kb,
+    error_log_path,
+    interval_sec,
+    frame_threshold,
+    min_seconds,
+    min_coverage,
+    workers=1,
+):
+    from helpers.video_fingerprint import (
+        is_video,
+        video_signatures,
+        match_videos,
+        group_video_matches,
+    )
+
+    videos = [
+        (path, size)
+        for path, size, *_ in rows
+        if is_video(path) and size / 1024 >= min_kb
+    ]
+    errors = []
+
+    sampled = hash_stage(
+        videos,
+        lambda path, size: video_signatures(path, interval_sec),
+        "🎞️  Fingerprinting",
+        "magenta",
+        errors,
+        workers,
+    )
+    fingerprints = {path: sigs for path, (sigs, _) in sampled.items() if sigs}
+    durations = {path: duration for path, (_, duration) in sampled.items()}
+    matches = match_videos(fingerprints, interval_sec, frame_threshold, min_seconds)
+    groups = group_video_matches(matches, durations, dict(videos), min_coverage)
+    print(
+        Fore.CYAN + f"\n📊 {len(videos)} videos, {len(fingerprints)} fingerprinted, "
+        f"{len(matches)} matching pairs, {sum(len(g) for g in groups)} in groups."
+        + Style.RESET_ALL
+    )
+    if errors:
+        with open(error_log_path, "a", encoding="utf-8") as elog:
+            for path, err in errors:
+                elog.write(f"{path},{err}\n")
+        print(
+            Fore.YELLOW
+            + f"\n⚠️ Warnings/Errors logged to: {error_log_path}"
+            + Style.RESET_ALL
+        )
+    return groups, errors
+
+
+def report_video_matches(groups):
+    print(
+        Fore.GREEN
+        + f"\n✅ Found {len(groups)} sets of near-duplicate videos.\n"
+        + Style.RESET_ALL
+    )
+    if not args.dry_run and groups:
+        with open(VIDEO_MATCH_LOG, "w", encoding="utf-8") as out:
+            out.write("GroupID,Similarity,MatchedSeconds,OffsetSeconds,FilePath\n")
+            for idx, group in enumerate(groups, 1):
+                for path, coverage, seconds, offset in group:
+                    out.write(
+                        f"{idx},{coverage:.3f},{seconds:.1f},{offset:.1f},{path}\n"
+                    )
+        print(
+            Fore.GREEN
+            + f"📝 Video match log saved to {VIDEO_MATCH_LOG}"
+            + Style.RESET_ALL
+        )
+    elif not groups:
+        print(
+            Fore.YELLOW
+            + "No near-duplicate videos found. No log written."
+            + Style.RESET_ALL
+        )
+    else:
+        print(Fore.YELLOW + "[Dry Run] No logs written." + Style.RESET_ALL)
+
+    for idx, group in enumerate(groups, 1):
+        print(Fore.MAGENTA + f"[Group {idx}] Keep: {group[0][0]}" + Style.RESET_ALL)
+        for path, coverage, seconds, offset in group[1:]:
+            print(
+                "  "
+                + Fore.YELLOW
+                + f"- {path} ({seconds:.0f}s matched, {coverage:.0%} of shorter, "
+                f"offset {offset:+.1f}s)" + Style.RESET_ALL
+            )
+        print()
+
+
 if __name__ == "__main__":
     print(
         Fore.CYAN
@@ -147,10 +506,81 @@ if __name__ == "__main__":
         + f"Config loaded: {CONFIG_FILE if os.path.exists(CONFIG_FILE) else '[default]'}"
         + Style.RESET_ALL
     )
+    workers, device_kind = resolve_workers(hash_workers, args.input_dir)
+    print(
+        Fore.CYAN
+        + f"Hash: {hash_algorithm} | Workers: {workers} ({device_kind})"
+        + Style.RESET_ALL
+    )
     print(Fore.CYAN + f"Dry run: {args.dry_run}\n" + Style.RESET_ALL)
 
+    manifest = stage_manifest(
+        MANIFEST_FILE, args.input_dir, config, args.rescan, ERROR_LOG
+    )
+    rows = manifest_files(manifest, args.input_dir)
+
+    if args.near_videos:
+        try:
+            groups, errors = find_near_duplicate_videos(
+                rows,
+                min_size_kb,
+                ERROR_LOG,
+                video_interval,
+                near_threshold,
+                video_min_seconds,
+                video_min_coverage,
+                workers,
+            )
+        except Exception as e:
+            print(Fore.RED + f"\n❌ FATAL ERROR: {e}" + Style.RESET_ALL)
+            sys.exit(1)
+        report_video_matches(groups)
+        print(Fore.GREEN + "🎉 Video matching complete!" + Style.RESET_ALL)
+        print(
+            Fore.CYAN
+            + "Review the log, then: move_duplicates.py --videos [--min-similarity 0.9]"
+            + Style.RESET_ALL
+        )
+        sys.exit(0)
+
+    if args.near_duplicates:
+        try:
+            groups, errors = find_near_duplicates(
+                rows,
+                min_size_kb,
+                ERROR_LOG,
+                perceptual_hash,
+                near_threshold,
+                workers,
+            )
+        except Exception as e:
+            print(Fore.RED + f"\n❌ FATAL ERROR: {e}" + Style.RESET_ALL)
+            sys.exit(1)
+        report_near_duplicates(groups)
+        print(Fore.GREEN + "🎉 Near-duplicate scanning complete!" + Style.RESET_ALL)
+        print(
+            Fore.CYAN
+            + "Review the log, then: move_duplicates.py --near [--min-similarity 0.9]"
+            + Style.RESET_ALL
+        )
+        sys.exit(0)
+
+    cache = None
+    if use_hash_cache and not args.no_cache:
+        cache = open_hash_cache(HASH_CACHE_FILE)
+        print(Fore.CYAN + f"Hash cache: {HASH_CACHE_FILE}" + Style.RESET_ALL)
     try:
-        dupes, errors = find_duplicate_files(args.input_dir, min_size_kb, ERROR_LOG)
+        dupes, errors = find_duplicate_files(
+            args.input_dir,
+            rows,
+            min_size_kb,
+            ERROR_LOG,
+            partial_hash_kb,
+            hash_algorithm,
+            workers,
+            cache=cache,
+            update_cache=not args.dry_run,
+        )
     except Exception as e:
         print(Fore.RED + f"\n❌ FATAL ERROR: {e}" + Style.RESET_ALL)
         sys.exit(1)
@@ -170,9 +600,6 @@ if __name__ == "__main__":
         print(
             Fore.GREEN + f"📝 Duplicate log saved to {DUPLICATES_LOG}" + Style.RESET_ALL
         )
-        with open(CHECKPOINT_FILE, "w", encoding="utf-8") as cpt:
-            json.dump({"completed": True, "hashes": list(dupes.keys())}, cpt, indent=2)
-        print(Fore.CYAN + f"Checkpoint written to {CHECKPOINT_FILE}" + Style.RESET_ALL)
     elif not dupes:
         print(Fore.YELLOW + "No duplicates found. No log written." + Style.RESET_ALL)
     else:
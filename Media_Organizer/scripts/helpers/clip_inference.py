@@ -0,0 +1,227 @@
+import os
+import sqlite3
+import numpy as np
+import torch  # type: ignore
+from transformers import CLIPProcessor, CLIPModel  # type: ignore
+
+from helpers.embedding_store import model_slug
+
+# Shared CLIP inference for the tagging scripts: the model is loaded once per
+# process, tag text embeddings are computed once per tag string and persisted,
+# and batches only go through the vision tower.
+#
+# CPU backends (cpu_backend in config.json):
+#   fp32  plain model under torch.inference_mode
+#   int8  dynamic int8 quantization of every nn.Linear (the bulk of ViT time)
+#   onnx  vision tower exported once to ONNX and run with onnxruntime
+# int8 vectors (text and image) differ from the fp32/GPU/ONNX ones, so the
+# persisted text cache and embedding stores are keyed by embedding_key().
+
+MODEL_NAME = "openai/clip-vit-base-patch32"
+CPU_BACKENDS = ("fp32", "int8", "onnx")
+
+_loaded = {}
+
+
+def configure_cpu_threads(threads="auto"):
+    """Pin torch's intra-op pool; returns the thread count used."""
+    if threads in (None, "auto", 0):
+        threads = os.cpu_count() or 4
+    torch.set_num_threads(int(threads))
+    return int(threads)
+
+
+def load_clip(device, model_name=MODEL_NAME, quantize=False):
+    key = (model_name, str(device), quantize)
+    if key not in _loaded:
+        model = CLIPModel.from_pretrained(model_name).to(device)
+        model.eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        processor = CLIPProcessor.from_pretrained(model_name)
+        _loaded[key] = (model, processor)
+    return _loaded[key]
+
+
+def embedding_key(device, backend, model_name=MODEL_NAME):
+    """Store/cache name for vectors produced by this device/backend."""
+    if device == "cpu" and backend == "int8":
+        return model_name + ":int8"
+    return model_name
+
+
+def normalise(feats):
+    return (feats / np.linalg.norm(feats, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def pixel_features(model, pixels, device):
+    """L2-normalised (n, dim) float32 features for a preprocessed (n, 3, H, W) array."""
+    with torch.inference_mode():
+        feats = model.get_image_features(
+            pixel_values=torch.from_numpy(pixels).to(device)
+        )
+    return normalise(feats.float().cpu().numpy())
+
+
+class _VisionTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+
+def export_onnx_vision(model, onnx_path):
+    size = model.config.vision_config.image_size
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    with torch.inference_mode():
+        torch.onnx.export(
+            _VisionTower(model).eval(),
+            torch.zeros(1, 3, size, size),
+            onnx_path,
+            input_names=["pixel_values"],
+            output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=17,
+        )
+
+
+def vision_encoder(model, device, backend="fp32", onnx_path=None, threads=None):
+    """Return encode(pixels) -> normalised features for the chosen backend.
+
+    For "onnx", model must be the unquantized fp32 model; the export is
+    written to onnx_path on first use and reused afterwards.
+    """
+    if backend != "onnx":
+        return lambda pixels: pixel_features(model, pixels, device)
+    try:
+        import onnxruntime as ort  # type: ignore
+    except ImportError:
+        raise RuntimeError(
+            "cpu_backend 'onnx' needs onnxruntime (pip install onnxruntime)"
+        )
+    if not os.path.exists(onnx_path):
+        export_onnx_vision(model, onnx_path)
+    options = ort.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = int(threads)
+    session = ort.InferenceSession(
+        onnx_path, options, providers=["CPUExecutionProvider"]
+    )
+    return lambda pixels: normalise(
+        session.run(None, {"pixel_values": np.ascontiguousarray(pixels, np.float32)})[0]
+    )
+
+
+def setup_backend(device, backend, threads, onnx_path):
+    """Load CLIP for device/backend; returns (model, processor, encode, threads).
+
+    Cached per process like load_clip, so repeated calls are free.
+    """
+    if device != "cpu":
+        backend = "fp32"
+    elif backend not in CPU_BACKENDS:
+        raise ValueError(
+            f"Unknown cpu_backend {backend!r} (choose from {', '.join(CPU_BACKENDS)})"
+        )
+    key = ("backend", str(device), backend, threads, onnx_path)
+    if key not in _loaded:
+        threads = configure_cpu_threads(threads) if device == "cpu" else None
+        model, processor = load_clip(device, quantize=backend == "int8")
+        encode = vision_encoder(model, device, backend, onnx_path, threads)
+        _loaded[key] = (model, processor, encode, threads)
+    return _loaded[key]
+
+
+def _encode_text(model, processor, tags, device):
+    with torch.inference_mode():
+        inputs = processor(text=tags, return_tensors="pt", padding=True)
+        feats = model.get_text_features(**{k: v.to(device) for k, v in inputs.items()})
+    return normalise(feats.float().cpu().numpy())
+
+
+def query_features(model, processor, text, device):
+    """L2-normalised (dim,) float32 vector for one free-text query."""
+    return _encode_text(model, processor, [text], device)[0]
+
+
+def text_features(
+    model, processor, tags, device, cache_dir=None, model_name=MODEL_NAME
+):
+    """Return ((len(tags), dim) float32, logit_scale) for the tag vocabulary.
+
+    With cache_dir, vectors are persisted per tag string, so a grown
+    vocabulary only encodes the new tags.
+    """
+    logit_scale = float(model.logit_scale.exp())
+    if not cache_dir:
+        return _encode_text(model, processor, tags, device), logit_scale
+    os.makedirs(cache_dir, exist_ok=True)
+    conn = sqlite3.connect(
+        os.path.join(cache_dir, model_slug(model_name) + "_text.sqlite")
+    )
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS text_vectors "
+            "(tag TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        cached = {}
+        for i in range(0, len(tags), 500):
+            chunk = tags[i : i + 500]
+            cached.update(
+                (tag, np.frombuffer(blob, dtype=np.float32))
+                for tag, blob in conn.execute(
+                    "SELECT tag, vector FROM text_vectors "
+                    f"WHERE tag IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        missing = [t for t in dict.fromkeys(tags) if t not in cached]
+        if missing:
+            feats = _encode_text(model, processor, missing, device)
+            cached.update(zip(missing, feats))
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO text_vectors VALUES (?, ?)",
+                    ((t, v.tobytes()) for t, v in zip(missing, feats)),
+                )
+    finally:
+        conn.close()
+    return np.stack([cached[t] for t in tags]), logit_scale
+
+
+def tags_from_features(image_feats, text_feats, logit_scale, tags, threshold):
+    # Same softmax over the vocabulary as CLIPModel.logits_per_image.
+    logits = logit_scale * (image_feats @ text_feats.T)
+    logits -= logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    probs /= probs.sum(axis=1, keepdims=True)
+    return [[tag for tag, prob in zip(tags, row) if prob >= threshold] for row in probs]
+
+
+def image_features(images, processor, encode):
+    """Normalised (n, dim) features for a list of PIL images."""
+    pixels = processor(images=images, return_tensors="np")["pixel_values"]
+    return encode(pixels.astype(np.float32))
+
+
+def tag_images(images, tags, text, processor, encode, batch_size, threshold):
+    """Tag PIL images against precomputed text=(feats, logit_scale); one list per image.
+
+    encode is a vision_encoder(); a failed batch yields empty tag lists.
+    """
+    text_feats, logit_scale = text
+    tags_per_img = []
+    for i in range(0, len(images), batch_size):
+        batch = images[i : i + batch_size]
+        try:
+            feats = image_features(batch, processor, encode)
+            tags_per_img.extend(
+                tags_from_features(feats, text_feats, logit_scale, tags, threshold)
+            )
+        except Exception:
+            tags_per_img.extend([] for _ in batch)
+    return tags_per_img
@@ -0,0 +1,137 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Producer/consumer image loading for the tagging scripts. A pool of decode
+# threads (Pillow releases the GIL while decoding and resizing) turns paths
+# into ready model inputs and a bounded queue holds a few batches ahead of
+# inference, so the model never waits on disk and decoding never waits on
+# the model.
+
+_DONE = object()
+
+
+def default_workers():
+    return min(8, os.cpu_count() or 4)
+
+
+def clip_preprocess_config(processor):
+    """(shortest_edge, (crop_h, crop_w), mean, std) from a CLIPProcessor."""
+    ip = processor.image_processor
+    size = ip.size
+    edge = (
+        size.get("shortest_edge", size.get("height"))
+        if isinstance(size, dict)
+        else size
+    )
+    crop = ip.crop_size
+    if isinstance(crop, dict):
+        crop = (crop["height"], crop["width"])
+    elif isinstance(crop, int):
+        crop = (crop, crop)
+    return (
+        edge,
+        tuple(crop),
+        np.asarray(ip.image_mean, np.float32),
+        np.asarray(ip.image_std, np.float32),
+    )
+
+
+def make_preprocess(edge, crop, mean, std):
+    """path -> (3, crop_h, crop_w) float32, matching CLIPImageProcessor."""
+    scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+    offset = (mean / std).reshape(3, 1, 1)
+
+    def preprocess(path):
+        with Image.open(path) as img:
+            # JPEG: let libjpeg decode at 1/2..1/8 scale, still >= the target.
+            img.draft("RGB", (edge, edge))
+            img = img.convert("RGB")
+            w, h = img.size
+            ratio = edge / min(w, h)
+            rw, rh = max(crop[1], round(w * ratio)), max(crop[0], round(h * ratio))
+            img = img.resize((rw, rh), Image.BICUBIC)
+            left, top = (rw - crop[1]) // 2, (rh - crop[0]) // 2
+            img = img.crop((left, top, left + crop[1], top + crop[0]))
+            arr = np.asarray(img, dtype=np.float32).transpose(2, 0, 1)
+        return arr * scale - offset
+
+    return preprocess
+
+
+def _safe(preprocess, path):
+    try:
+        return preprocess(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def prefetch_batches(paths, preprocess, batch_size, workers=None, prefetch=4):
+    """Yield (batch_paths, pixels (n, 3, H, W) or None, errors [(path, msg)]).
+
+    At most batch_size * (prefetch + 1) images are decoded or queued at once.
+    """
+    workers = workers or default_workers()
+    ready = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def producer():
+        try:
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="decode"
+            ) as pool:
+                window = deque()
+                it = iter(paths)
+                limit = batch_size * (prefetch + 1)
+                exhausted = False
+                while not stop.is_set():
+                    while not exhausted and len(window) < limit:
+                        path = next(it, None)
+                        if path is None:
+                            exhausted = True
+                            break
+                        window.append((path, pool.submit(_safe, preprocess, path)))
+                    if not window:
+                        break
+                    batch = [
+                        window.popleft() for _ in range(min(batch_size, len(window)))
+                    ]
+                    arrays, good, errors = [], [], []
+                    for path, future in batch:
+                        arr, err = future.result()
+                        if err is None:
+                            arrays.append(arr)
+                            good.append(path)
+                        else:
+                            errors.append((path, err))
+                    item = (good, np.stack(arrays) if arrays else None, errors)
+                    while not stop.is_set():
+                        try:
+                            ready.put(item, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+        finally:
+            ready.put(_DONE)
+
+    thread = threading.Thread(target=producer, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue, then let it finish.
+        while thread.is_alive():
+            try:
+                ready.get(timeout=0.1)
+            except queue.Empty:
+                pass
@@ -0,0 +1,82 @@
+import os
+import errno
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# In-place deduplication for exact duplicates: the duplicate's path is kept
+# but it is replaced by a hardlink to the original, or by a copy-on-write
+# reflink (FICLONE; btrfs, XFS, bcachefs, ...), so the space comes back
+# without moving anything. Contents are compared byte for byte first, and
+# the swap goes through a temp name plus os.replace so the path is never
+# missing.
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int)
+ACTIONS = ("hardlink", "reflink")
+CHUNK = 1 << 20
+
+
+def format_bytes(n):
+    """Human-readable size: 512 B, 1.5 KB ... TB."""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+
+
+def same_bytes(a, b):
+    if os.path.getsize(a) != os.path.getsize(b):
+        return False
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            chunk = fa.read(CHUNK)
+            if chunk != fb.read(CHUNK):
+                return False
+            if not chunk:
+                return True
+
+
+def same_inode(st_a, st_b):
+    return (st_a.st_dev, st_a.st_ino) == (st_b.st_dev, st_b.st_ino)
+
+
+def freed_bytes(st):
+    """Bytes released by dropping this inode's data (0 if other links keep it)."""
+    return st.st_size if st.st_nlink == 1 else 0
+
+
+def reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks need Linux (FICLONE)")
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV):
+                raise OSError(
+                    e.errno, "Filesystem does not support reflinks here"
+                ) from e
+            raise
+
+
+def link_duplicate(original, dup, action):
+    """Replace dup with a hardlink/reflink of original; returns bytes freed."""
+    if not same_bytes(original, dup):
+        raise ValueError("Contents differ from the original; left alone")
+    st = os.stat(dup)
+    tmp = os.path.join(os.path.dirname(dup), f".{os.path.basename(dup)}.dedupe")
+    try:
+        if action == "hardlink":
+            os.link(original, tmp)
+        else:
+            reflink(original, tmp)
+            shutil.copystat(dup, tmp)
+        os.replace(tmp, dup)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+    return freed_bytes(st)
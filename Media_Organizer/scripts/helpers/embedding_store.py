@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import numpy as np
+
+from helpers.hashing import hash_file, hash_partial
+
+# Append-only image-embedding store, one per model:
+#   <slug>.f16     raw float16 rows of `dim` values (np.memmap-able)
+#   <slug>.sqlite  content hash -> row, plus path -> content hash so unchanged
+#                  files are never re-read to find their key
+# Vectors are written and fsync'ed before their index rows are committed, so
+# a crash can only leave unreferenced rows at the tail, never a bad lookup.
+# Videos get their own store (<slug>_video.*) holding one mean-pooled frame
+# embedding per video, keyed by video_key() instead of a full-file hash.
+
+DTYPE = np.float16
+VIDEO_KEY_KB = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS vectors (
+    content_hash TEXT PRIMARY KEY,
+    row INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paths_by_hash ON paths (content_hash);
+"""
+
+
+def model_slug(model_name):
+    return model_name.replace("/", "__").replace(":", "_")
+
+
+def open_store(store_dir, model_name, dim, kind="image"):
+    os.makedirs(store_dir, exist_ok=True)
+    base = os.path.join(store_dir, model_slug(model_name))
+    if kind != "image":
+        base += f"_{kind}"
+    conn = sqlite3.connect(base + ".sqlite")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    stored = dict(conn.execute("SELECT key, value FROM meta"))
+    if stored and int(stored["dim"]) != dim:
+        raise ValueError(
+            f"Embedding store {base}.sqlite has dim {stored['dim']}, model gives {dim}"
+        )
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO meta VALUES (?, ?)",
+            [("model", model_name), ("dim", str(dim))],
+        )
+    return {
+        "conn": conn,
+        "vectors_path": base + ".f16",
+        "index_path": base + ".ivfpq.npz",
+        "dim": dim,
+    }
+
+
+def row_count(store):
+    try:
+        size = os.path.getsize(store["vectors_path"])
+    except OSError:
+        return 0
+    return size // (store["dim"] * np.dtype(DTYPE).itemsize)
+
+
+def video_key(path):
+    """Cheap video content key: size plus a hash of its first/last VIDEO_KEY_KB."""
+    size = os.path.getsize(path)
+    partial, _, _ = hash_partial(path, size, VIDEO_KEY_KB * 1024)
+    return f"{size}:{partial}"
+
+
+def content_keys(store, paths, key_func=hash_file):
+    """{path: content key}; only files whose size/mtime changed are re-keyed."""
+    conn = store["conn"]
+    keys, fresh, errors = {}, [], []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            errors.append((path, f"Stat failed: {e}"))
+            continue
+        row = conn.execute(
+            "SELECT size, mtime_ns, content_hash FROM paths WHERE path = ?", (path,)
+        ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            keys[path] = row[2]
+            continue
+        try:
+            keys[path] = key_func(path)
+        except Exception as e:
+            errors.append((path, str(e)))
+            continue
+        fresh.append((path, st.st_size, st.st_mtime_ns, keys[path]))
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)", fresh)
+    return keys, errors
+
+
+def lookup(store, content_hashes):
+    """{content_hash: row} for the hashes already embedded."""
+    conn = store["conn"]
+    found = {}
+    hashes = list(content_hashes)
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i : i + 500]
+        found.update(
+            conn.execute(
+                "SELECT content_hash, row FROM vectors "
+                f"WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+        )
+    return found
+
+
+def append(store, content_hashes, vectors):
+    """Append vectors (n, dim) for content_hashes; returns their rows."""
+    vectors = np.ascontiguousarray(vectors, dtype=DTYPE)
+    if vectors.ndim != 2 or vectors.shape[1] != store["dim"]:
+        raise ValueError(f"Expected (n, {store['dim']}) vectors, got {vectors.shape}")
+    start = row_count(store)
+    with open(store["vectors_path"], "ab") as f:
+        # Drop a torn partial row from an interrupted write before appending.
+        f.truncate(start * store["dim"] * np.dtype(DTYPE).itemsize)
+        f.write(vectors.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    rows = list(range(start, start + len(vectors)))
+    with store["conn"]:
+        store["conn"].executemany(
+            "INSERT OR REPLACE INTO vectors VALUES (?, ?)", zip(content_hashes, rows)
+        )
+    return rows
+
+
+def load_matrix(store):
+    """Read-only (n, dim) float16 memmap of every stored vector."""
+    n = row_count(store)
+    if n == 0:
+        return np.zeros((0, store["dim"]), dtype=DTYPE)
+    return np.memmap(
+        store["vectors_path"], dtype=DTYPE, mode="r", shape=(n, store["dim"])
+    )
+
+
+def row_paths(store, rows):
+    """{row: [paths]} for vector rows (several paths when content is duplicated)."""
+    found = {}
+    rows = [int(r) for r in rows]
+    for i in range(0, len(rows), 500):
+        chunk = rows[i : i + 500]
+        for row, path in store["conn"].execute(
+            "SELECT v.row, p.path FROM vectors v "
+            "JOIN paths p ON p.content_hash = v.content_hash "
+            f"WHERE v.row IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ):
+            found.setdefault(row, []).append(path)
+    return found
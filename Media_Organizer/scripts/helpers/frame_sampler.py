@@ -0,0 +1,232 @@
+import heapq
+import math
+
+import cv2  # type: ignore
+import numpy as np
+
+try:
+    import av  # type: ignore
+except ImportError:
+    av = None
+
+# Frame sampling for video stages. Modes:
+#   sequential  grab() every frame, retrieve()/convert only the kept ones; no
+#               seeking, so each frame is decoded once (default)
+#   keyframes   decode keyframes only (needs PyAV; falls back to sequential)
+#   seek        the old per-sample CAP_PROP_POS_FRAMES seek, kept for
+#               benchmarks and very sparse sampling of short-GOP files
+#   adaptive    the same sample grid visited coarse-to-fine (middle, quarters,
+#               eighths, ...) with gaps that span a scene change refined
+#               first, so a caller can stop as soon as it has seen enough;
+#               it seeks per sample, so it only pays off when the early stop
+#               skips most of the grid (opt-in, not the default)
+# Frames are yielded as (timestamp_sec, ndarray) in RGB (or grayscale),
+# optionally downscaled so the short side is `size` pixels. Pass an `info`
+# dict to get fps/frame_count/duration from the capture the sampler opened
+# (filled in once iteration starts), instead of opening the file twice.
+
+MODES = ("sequential", "keyframes", "seek", "adaptive")
+SCENE_BOOST = 4  # gaps spanning a scene change count this many times larger
+
+
+def probe(path):
+    """(fps, frame_count, duration_sec) from the container header."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"Can't open video: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return fps, frame_count, frame_count / fps
+    finally:
+        cap.release()
+
+
+def _convert(frame, size, gray, bgr=True):
+    if gray:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY if bgr else cv2.COLOR_RGB2GRAY)
+    elif bgr:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if size:
+        h, w = frame.shape[:2]
+        scale = size / min(h, w)
+        if scale < 1:
+            frame = cv2.resize(
+                frame,
+                (max(1, round(w * scale)), max(1, round(h * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+    return frame
+
+
+def _effective_interval(duration, interval_sec, max_frames):
+    # With a cap, spread the samples over the whole video instead of
+    # stopping after the first max_frames intervals.
+    if max_frames and duration and duration / interval_sec > max_frames:
+        return duration / max_frames
+    return interval_sec
+
+
+def uniform_count(duration, interval_sec, max_frames=None):
+    """Frames the sequential/seek modes would sample from a video this long."""
+    n = math.ceil(duration / interval_sec - 1e-6) if duration > 0 else 0
+    return min(n, max_frames) if max_frames else n
+
+
+def _thumb(frame):
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    return (
+        cv2.resize(frame, (16, 16), interpolation=cv2.INTER_AREA).astype(np.float32)
+        / 255
+    )
+
+
+def _gap_priority(lo, hi, thumbs, scene_threshold):
+    size = hi - lo - 1
+    if lo in thumbs and hi in thumbs:
+        if float(np.abs(thumbs[lo] - thumbs[hi]).mean()) >= scene_threshold:
+            return size * SCENE_BOOST
+    return size
+
+
+def _header(cap, info):
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if info is not None:
+        info.update(fps=fps, frame_count=frame_count, duration=frame_count / fps)
+    return fps, frame_count
+
+
+def _sequential(path, interval_sec, max_frames, size, gray, info=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Can't open video: {path}")
+    try:
+        fps, frame_count = _header(cap, info)
+        interval = _effective_interval(frame_count / fps, interval_sec, max_frames)
+        next_t, idx, kept = 0.0, 0, 0
+        while cap.grab():
+            t = idx / fps
+            idx += 1
+            if t + 1e-6 < next_t:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+            yield t, _convert(frame, size, gray)
+            kept += 1
+            if max_frames and kept >= max_frames:
+                return
+            next_t += interval * max(1, int((t - next_t) // interval) + 1)
+    finally:
+        cap.release()
+
+
+def _seek(path, interval_sec, max_frames, size, gray, info=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Can't open video: {path}")
+    try:
+        fps, frame_count = _header(cap, info)
+        interval = _effective_interval(frame_count / fps, interval_sec, max_frames)
+        step = max(1, int(fps * interval))
+        kept = 0
+        for frame_no in range(0, frame_count, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            yield frame_no / fps, _convert(frame, size, gray)
+            kept += 1
+            if max_frames and kept >= max_frames:
+                return
+    finally:
+        cap.release()
+
+
+def _adaptive(path, interval_sec, max_frames, size, gray, scene_threshold, info=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Can't open video: {path}")
+    try:
+        fps, frame_count = _header(cap, info)
+        duration = frame_count / fps
+        interval = _effective_interval(duration, interval_sec, max_frames)
+        n = uniform_count(duration, interval, max_frames)
+        if n == 0:
+            return
+        # Each heap entry is a run of unsampled slots strictly between lo and
+        # hi (-1 and n are the video edges); the largest run is split first.
+        thumbs = {}
+        heap = [(-n, -1, n)]
+        while heap:
+            _, lo, hi = heapq.heappop(heap)
+            mid = (lo + hi) // 2
+            cap.set(
+                cv2.CAP_PROP_POS_FRAMES, min(frame_count - 1, int(mid * interval * fps))
+            )
+            ret, frame = cap.read()
+            if ret:
+                frame = _convert(frame, size, gray)
+                thumbs[mid] = _thumb(frame)
+                yield mid * interval, frame
+            for a, b in ((lo, mid), (mid, hi)):
+                if b - a > 1:
+                    heapq.heappush(
+                        heap, (-_gap_priority(a, b, thumbs, scene_threshold), a, b)
+                    )
+    finally:
+        cap.release()
+
+
+def _keyframes(path, interval_sec, max_frames, size, gray, info=None):
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        duration = (
+            float(stream.duration * stream.time_base) if stream.duration else None
+        )
+        if duration is None and container.duration:
+            duration = container.duration / 1_000_000
+        if info is not None:
+            fps = float(stream.average_rate) if stream.average_rate else 25
+            info.update(
+                fps=fps, frame_count=stream.frames or 0, duration=duration or 0.0
+            )
+        interval = _effective_interval(duration, interval_sec, max_frames)
+        last_t, kept = None, 0
+        for frame in container.decode(stream):
+            t = float(frame.time) if frame.time is not None else 0.0
+            if last_t is not None and t - last_t + 1e-6 < interval:
+                continue
+            last_t = t
+            yield t, _convert(frame.to_ndarray(format="rgb24"), size, gray, bgr=False)
+            kept += 1
+            if max_frames and kept >= max_frames:
+                return
+
+
+def iter_frames(
+    path,
+    interval_sec=1.0,
+    max_frames=None,
+    size=None,
+    mode="sequential",
+    gray=False,
+    scene_threshold=0.25,
+    info=None,
+):
+    """Yield (timestamp_sec, frame) samples from path; see module comment for modes.
+
+    Adaptive mode yields frames out of timestamp order.
+    """
+    if mode == "adaptive":
+        return _adaptive(
+            path, interval_sec, max_frames, size, gray, scene_threshold, info
+        )
+    if mode == "keyframes" and av is not None:
+        return _keyframes(path, interval_sec, max_frames, size, gray, info)
+    if mode == "seek":
+        return _seek(path, interval_sec, max_frames, size, gray, info)
+    return _sequential(path, interval_sec, max_frames, size, gray, info)
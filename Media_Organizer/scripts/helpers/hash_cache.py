@@ -0,0 +1,96 @@
+import os
+import time
+import sqlite3
+
+# Persistent per-file hash cache. An entry is only trusted while the file's
+# (device, inode, size, mtime_ns) still match what was recorded for its path,
+# so any rewrite, replace or touch invalidates it.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    partial_kb INTEGER,
+    partial_hash TEXT,
+    full_hash TEXT,
+    updated REAL NOT NULL
+)
+"""
+
+
+def open_hash_cache(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(SCHEMA)
+    return conn
+
+
+def path_range(root):
+    # [lo, hi) covering every path strictly under root, so the primary key
+    # index can be used instead of LIKE.
+    prefix = os.path.join(os.path.abspath(root), "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def stat_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def lookup(conn, path, st, algorithm):
+    """Return {'partial_kb', 'partial_hash', 'full_hash'} if still valid, else None."""
+    row = conn.execute(
+        "SELECT dev, inode, size, mtime_ns, algorithm, partial_kb, partial_hash, "
+        "full_hash "
+        "FROM file_hashes WHERE path = ?",
+        (path,),
+    ).fetchone()
+    if row is None or tuple(row[:4]) != stat_key(st) or row[4] != algorithm:
+        return None
+    return {"partial_kb": row[5], "partial_hash": row[6], "full_hash": row[7]}
+
+
+def store(conn, entries, algorithm):
+    """entries: iterable of (path, st, partial_kb, partial_hash, full_hash)."""
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO file_hashes "
+        "(path, dev, inode, size, mtime_ns, algorithm, partial_kb, partial_hash, "
+        "full_hash, updated) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(path) DO UPDATE SET dev=excluded.dev, inode=excluded.inode, "
+        "size=excluded.size, mtime_ns=excluded.mtime_ns, algorithm=excluded.algorithm, "
+        "partial_kb=excluded.partial_kb, partial_hash=excluded.partial_hash, "
+        "full_hash=COALESCE(excluded.full_hash, "
+        "CASE WHEN file_hashes.mtime_ns=excluded.mtime_ns "
+        "AND file_hashes.size=excluded.size AND file_hashes.inode=excluded.inode "
+        "AND file_hashes.algorithm=excluded.algorithm "
+        "THEN file_hashes.full_hash END), updated=excluded.updated",
+        (
+            (path, *stat_key(st), algorithm, pkb, phash, fhash, now)
+            for path, st, pkb, phash, fhash in entries
+        ),
+    )
+    conn.commit()
+
+
+def prune(conn, root, seen_paths):
+    """Drop entries under root whose file was not seen in this scan."""
+    lo, hi = path_range(root)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM seen")
+    conn.executemany(
+        "INSERT OR IGNORE INTO seen VALUES (?)", ((p,) for p in seen_paths)
+    )
+    cur = conn.execute(
+        "DELETE FROM file_hashes WHERE path >= ? AND path < ? "
+        "AND path NOT IN (SELECT path FROM seen)",
+        (lo, hi),
+    )
+    conn.execute("DELETE FROM seen")
+    conn.commit()
+    return cur.rowcount
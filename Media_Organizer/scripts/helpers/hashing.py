@@ -0,0 +1,198 @@
+import os
+import mmap
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import xxhash  # type: ignore
+except ImportError:
+    xxhash = None
+
+DEFAULT_ALGORITHM = "md5"
+BUFFER_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 256 * 1024 * 1024
+NETWORK_FS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "sshfs", "fuse.sshfs")
+
+_local = threading.local()
+
+
+def available_algorithms():
+    algos = sorted(hashlib.algorithms_available)
+    if xxhash is not None:
+        algos += ["xxh64", "xxh3_64", "xxh3_128"]
+    return algos
+
+
+def new_hasher(algorithm=DEFAULT_ALGORITHM):
+    if algorithm.startswith("xxh"):
+        if xxhash is None:
+            raise ValueError(
+                f"{algorithm} needs the xxhash package (pip install xxhash)"
+            )
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+
+def _buffer(size):
+    # One reusable buffer per worker thread; readinto() fills it in place.
+    buf = getattr(_local, "buf", None)
+    if buf is None or len(buf) != size:
+        buf = _local.buf = bytearray(size)
+    return buf
+
+
+def hash_file(
+    path,
+    algorithm=DEFAULT_ALGORITHM,
+    buffer_size=BUFFER_SIZE,
+    mmap_threshold=MMAP_THRESHOLD,
+):
+    hasher = new_hasher(algorithm)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if mmap_threshold and size >= mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    view = memoryview(mm)
+                    try:
+                        for pos in range(0, size, 64 * buffer_size):
+                            hasher.update(view[pos : pos + 64 * buffer_size])
+                    finally:
+                        view.release()
+            else:
+                buf = _buffer(buffer_size)
+                view = memoryview(buf)
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    hasher.update(view[:n])
+    except PermissionError:
+        raise PermissionError(f"Permission denied: {path}")
+    except Exception as e:
+        raise RuntimeError(f"Can't read file: {path} — {e}")
+    return hasher.hexdigest()
+
+
+def hash_partial(path, size, edge_bytes, algorithm=DEFAULT_ALGORITHM):
+    """Hash the first and last edge_bytes of a file.
+
+    Returns (digest, bytes_read, complete); complete is True when the file
+    was small enough to be read whole, i.e. digest is the full-file hash.
+    """
+    hasher = new_hasher(algorithm)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            if size <= 2 * edge_bytes:
+                data = f.read()
+                hasher.update(data)
+                return hasher.hexdigest(), len(data), True
+            buf = _buffer(max(edge_bytes, BUFFER_SIZE))
+            view = memoryview(buf)
+            n = f.readinto(view[:edge_bytes])
+            hasher.update(view[:n])
+            f.seek(-edge_bytes, os.SEEK_END)
+            m = f.readinto(view[:edge_bytes])
+            hasher.update(view[:m])
+    except PermissionError:
+        raise PermissionError(f"Permission denied: {path}")
+    except Exception as e:
+        raise RuntimeError(f"Can't read file: {path} — {e}")
+    return hasher.hexdigest(), n + m, False
+
+
+def _mount_fstype(path):
+    try:
+        path = os.path.realpath(path)
+        best, fstype = "", None
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mnt = parts[1].replace("\\040", " ")
+                if (path == mnt or path.startswith(mnt.rstrip("/") + "/")) and len(
+                    mnt
+                ) > len(best):
+                    best, fstype = mnt, parts[2]
+        return fstype
+    except OSError:
+        return None
+
+
+def device_type(path):
+    """Best-effort 'hdd' / 'ssd' / 'nvme' / 'network' / 'unknown' for path."""
+    fstype = _mount_fstype(path)
+    if fstype and (fstype in NETWORK_FS or fstype.startswith("fuse.")):
+        return "network"
+    try:
+        st = os.stat(path)
+        sys_dev = os.path.realpath(
+            f"/sys/dev/block/{os.major(st.st_dev)}:{os.minor(st.st_dev)}"
+        )
+    except (OSError, AttributeError):
+        return "unknown"
+    if not os.path.isdir(sys_dev):
+        return "unknown"
+    # Partitions have no queue/ of their own; use the parent disk.
+    if not os.path.exists(os.path.join(sys_dev, "queue")):
+        sys_dev = os.path.dirname(sys_dev)
+    name = os.path.basename(sys_dev)
+    try:
+        with open(os.path.join(sys_dev, "queue", "rotational")) as f:
+            rotational = f.read().strip() == "1"
+    except OSError:
+        return "unknown"
+    if rotational:
+        return "hdd"
+    return "nvme" if name.startswith("nvme") else "ssd"
+
+
+def auto_workers(path):
+    cpus = os.cpu_count() or 4
+    kind = device_type(path)
+    # HDDs thrash on concurrent seeks; flash and network storage want
+    # plenty of requests in flight.
+    workers = {
+        "hdd": 2,
+        "ssd": min(16, cpus * 2),
+        "nvme": min(32, cpus * 4),
+        "network": 16,
+    }.get(kind, min(8, cpus))
+    return workers, kind
+
+
+def resolve_workers(setting, path):
+    if setting in (None, "auto", 0):
+        return auto_workers(path)
+    return max(1, int(setting)), "configured"
+
+
+def run_parallel(items, func, workers, on_done=None):
+    """Run func(item) over items on a thread pool.
+
+    Returns {item: result}; exceptions are returned in place of results
+    so the caller can log them per file.
+    """
+    results = {}
+    if workers <= 1:
+        for item in items:
+            try:
+                results[item] = func(item)
+            except Exception as e:
+                results[item] = e
+            if on_done:
+                on_done(item, results[item])
+        return results
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as pool:
+        futures = {pool.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                results[item] = e
+            if on_done:
+                on_done(item, results[item])
+    return results
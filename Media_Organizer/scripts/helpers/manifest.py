@@ -0,0 +1,325 @@
+import os
+import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from colorama import Fore, Style
+
+from helpers.hash_cache import path_range
+
+# One shared listing of the media tree for every stage. A scan walks the
+# tree once with parallel os.scandir (d_type answers is_dir/is_symlink
+# without extra syscalls) and later stages read the rows back instead of
+# walking again; stages that move files update the rows as they go.
+# Before a listing is reused every known directory is re-stat'ed: adding,
+# removing or renaming an entry changes its directory's mtime, so only those
+# directories are listed again. Files edited in place don't touch the
+# directory, so a full walk is still forced after manifest_max_age seconds.
+
+IMAGE_EXTS = {
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".webp",
+    ".bmp",
+    ".gif",
+    ".tif",
+    ".tiff",
+    ".heic",
+}
+VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv", ".m4v", ".webm"}
+DEFAULT_MAX_AGE = 3600
+DEFAULT_WORKERS = 16
+MAX_PRINTED_ERRORS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    media_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scans (
+    root TEXT PRIMARY KEY,
+    scanned REAL NOT NULL,
+    files INTEGER NOT NULL
+);
+"""
+
+
+def media_type(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext in IMAGE_EXTS:
+        return "image"
+    if ext in VIDEO_EXTS:
+        return "video"
+    return "other"
+
+
+def open_manifest(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _scan_dir(path):
+    """(path, mtime_ns, files, subdirs, errors) for one directory, not recursive."""
+    files, dirs, errors = [], [], []
+    try:
+        # Stat before listing, so a change made during the listing shows up
+        # as a changed directory next time.
+        mtime_ns = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_symlink():
+                        errors.append((entry.path, "Symlink skipped"))
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    files.append(
+                        (
+                            entry.path,
+                            st.st_size,
+                            st.st_mtime_ns,
+                            st.st_dev,
+                            entry.inode(),
+                            media_type(entry.name),
+                        )
+                    )
+                except OSError as e:
+                    errors.append((entry.path, f"Stat failed: {e}"))
+    except OSError as e:
+        errors.append((path, f"Scan failed: {e}"))
+        mtime_ns = None
+    return path, mtime_ns, files, dirs, errors
+
+
+def walk_parallel(roots, workers=DEFAULT_WORKERS):
+    """Return (rows, dirs, errors) for every regular file under roots.
+
+    dirs is [(path, mtime_ns)] for every directory that could be listed.
+    """
+    rows, dir_rows, errors = [], [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        pending = {pool.submit(_scan_dir, root) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, mtime_ns, files, dirs, errs = future.result()
+                rows.extend(files)
+                errors.extend(errs)
+                if mtime_ns is not None:
+                    dir_rows.append((path, mtime_ns))
+                pending.update(pool.submit(_scan_dir, d) for d in dirs)
+    return rows, dir_rows, errors
+
+
+def _store(conn, rows, dir_rows):
+    conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?)", dir_rows)
+
+
+def _forget(conn, path, files_only=False):
+    """Drop the rows for path's subtree (or only its direct files)."""
+    lo, hi = path_range(path)
+    if files_only:
+        direct = [
+            (p,)
+            for (p,) in conn.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (lo, hi)
+            )
+            if os.path.dirname(p) == path
+        ]
+        conn.executemany("DELETE FROM files WHERE path = ?", direct)
+        return
+    conn.execute("DELETE FROM files WHERE path >= ? AND path < ?", (lo, hi))
+    conn.execute(
+        "DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, lo, hi)
+    )
+
+
+def scan(conn, root, workers=DEFAULT_WORKERS):
+    """Rescan root and replace its rows. Returns (file_count, errors)."""
+    root = os.path.abspath(root)
+    rows, dir_rows, errors = walk_parallel([root], workers)
+    with conn:
+        _forget(conn, root)
+        _store(conn, rows, dir_rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO scans VALUES (?, ?, ?)",
+            (root, time.time(), len(rows)),
+        )
+    return len(rows), errors
+
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def refresh(conn, root, workers=DEFAULT_WORKERS):
+    """Re-list only the directories under root whose mtime changed.
+
+    Returns (changed_dirs, errors), or (None, []) when root has no stored
+    directory listing to validate against.
+    """
+    root = os.path.abspath(root)
+    lo, hi = path_range(root)
+    known = dict(
+        conn.execute(
+            "SELECT path, mtime_ns FROM dirs "
+            "WHERE path = ? OR (path >= ? AND path < ?)",
+            (root, lo, hi),
+        )
+    )
+    if root not in known:
+        return None, []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        current = dict(zip(known, pool.map(_dir_mtime, known)))
+    gone = [d for d, mtime_ns in current.items() if mtime_ns is None]
+    changed = [
+        d
+        for d, mtime_ns in current.items()
+        if mtime_ns is not None and mtime_ns != known[d]
+    ]
+    if not gone and not changed:
+        return 0, []
+    rows, dir_rows, errors, new_dirs = [], [], [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        for path, mtime_ns, files, dirs, errs in pool.map(_scan_dir, changed):
+            rows.extend(files)
+            errors.extend(errs)
+            if mtime_ns is not None:
+                dir_rows.append((path, mtime_ns))
+            new_dirs.extend(d for d in dirs if d not in known)
+    if new_dirs:
+        sub_rows, sub_dirs, sub_errors = walk_parallel(new_dirs, workers)
+        rows += sub_rows
+        dir_rows += sub_dirs
+        errors += sub_errors
+    with conn:
+        for path in gone:
+            _forget(conn, path)
+        for path in changed:
+            _forget(conn, path, files_only=True)
+        _store(conn, rows, dir_rows)
+    return len(gone) + len(changed), errors
+
+
+def scan_age(conn, root):
+    """Seconds since root (or a directory containing it) was scanned, else None."""
+    root = os.path.abspath(root)
+    ages = [
+        time.time() - scanned
+        for scanned_root, scanned in conn.execute("SELECT root, scanned FROM scans")
+        if root == scanned_root or root.startswith(os.path.join(scanned_root, ""))
+    ]
+    return min(ages) if ages else None
+
+
+def ensure_scanned(
+    conn, root, max_age=DEFAULT_MAX_AGE, workers=DEFAULT_WORKERS, rescan=False
+):
+    """Bring root's rows up to date, as cheaply as the stored listing allows.
+
+    Returns (action, count, errors): ("scanned", file_count, ...) after a
+    full walk, or ("refreshed", changed_dir_count, ...).
+    """
+    age = None if rescan else scan_age(conn, root)
+    if age is not None and age <= max_age:
+        changed, errors = refresh(conn, root, workers)
+        if changed is not None:
+            return "refreshed", changed, errors
+    count, errors = scan(conn, root, workers)
+    return "scanned", count, errors
+
+
+def manifest_files(conn, root, media_types=None, min_size=0):
+    """Rows (path, size, mtime_ns, dev, inode, media_type) under root, by path."""
+    lo, hi = path_range(root)
+    sql = "SELECT * FROM files WHERE path >= ? AND path < ? AND size >= ?"
+    params = [lo, hi, min_size]
+    if media_types:
+        sql += f" AND media_type IN ({','.join('?' * len(media_types))})"
+        params += list(media_types)
+    return conn.execute(sql + " ORDER BY path", params).fetchall()
+
+
+def record_moves(conn, moves):
+    """moves: iterable of (src, dst); re-stats dst so cross-device moves stay valid."""
+    rows = []
+    for src, dst in moves:
+        try:
+            st = os.stat(dst)
+        except OSError:
+            continue
+        rows.append(
+            (
+                os.path.abspath(src),
+                os.path.abspath(dst),
+                st.st_size,
+                st.st_mtime_ns,
+                st.st_dev,
+                st.st_ino,
+                media_type(dst),
+            )
+        )
+    with conn:
+        conn.executemany("DELETE FROM files WHERE path = ?", ((r[0],) for r in rows))
+        conn.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            (r[1:] for r in rows),
+        )
+    return len(rows)
+
+
+def stage_manifest(db_path, root, config, rescan=False, error_log=None):
+    """Open the manifest and make sure root is covered; prints what it did.
+
+    Every scan error (including skipped symlinks) is appended to error_log
+    when given; the console only shows the first few.
+    """
+    conn = open_manifest(db_path)
+    action, value, errors = ensure_scanned(
+        conn,
+        root,
+        config.get("manifest_max_age", DEFAULT_MAX_AGE),
+        config.get("scan_workers", DEFAULT_WORKERS),
+        rescan,
+    )
+    if action == "scanned":
+        print(Fore.CYAN + f"📂 Scanned {value} files under {root}" + Style.RESET_ALL)
+    else:
+        print(
+            Fore.CYAN
+            + f"📂 Reusing manifest for {root} ({value} changed directories re-listed)"
+            + Style.RESET_ALL
+        )
+    for path, err in errors[:MAX_PRINTED_ERRORS]:
+        print(Fore.YELLOW + f"⚠️ {path}: {err}" + Style.RESET_ALL)
+    if len(errors) > MAX_PRINTED_ERRORS:
+        print(
+            Fore.YELLOW
+            + f"⚠️ ... and {len(errors) - MAX_PRINTED_ERRORS} more scan errors"
+            + Style.RESET_ALL
+        )
+    if errors and error_log:
+        with open(error_log, "a", encoding="utf-8") as f:
+            for path, err in errors:
+                f.write(f"{path},{err}\n")
+        print(Fore.YELLOW + f"⚠️ Scan errors logged to: {error_log}" + Style.RESET_ALL)
+    return conn
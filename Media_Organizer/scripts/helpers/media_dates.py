@@ -0,0 +1,271 @@
+import os
+import struct
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+from helpers.manifest import media_type
+from helpers.video_probe import probe_videos, resolve_workers
+
+# Capture dates for organize_by_date, resolved for a whole batch before
+# anything moves. Fast paths read only file headers:
+#   JPEG      APP1/Exif segment in the first HEADER_BYTES -> DateTimeOriginal
+#   PNG       chunk headers only, eXIf chunk -> DateTimeOriginal
+#   MP4/MOV   top-level atom headers up to moov, then mvhd creation_time
+# A fast path either finds the date, proves the file has none (straight to
+# mtime) or returns UNDETERMINED; those files fall back to Pillow (image
+# EXIF, on a process pool) or the cached MediaInfo probe (video container
+# dates), and finally the file's mtime.
+
+HEADER_BYTES = 128 * 1024
+JPEG_EXTS = {".jpg", ".jpeg"}
+PNG_EXTS = {".png"}
+MP4_EXTS = {".mp4", ".mov", ".m4v", ".3gp"}
+EXIF_IFD = 0x8769
+DATE_TIME_ORIGINAL = 0x9003
+MP4_EPOCH = datetime(1904, 1, 1)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+UNDETERMINED = object()
+
+
+def _ifd(tiff, bo, offset):
+    """{tag: (type, count, value_offset)} for the IFD at offset."""
+    (count,) = struct.unpack_from(bo + "H", tiff, offset)
+    entries = {}
+    for i in range(count):
+        at = offset + 2 + i * 12
+        tag, kind, n = struct.unpack_from(bo + "HHI", tiff, at)
+        entries[tag] = (kind, n, at + 8)
+    return entries
+
+
+def _tiff_date(tiff):
+    if tiff[:2] == b"II":
+        bo = "<"
+    elif tiff[:2] == b"MM":
+        bo = ">"
+    else:
+        return None
+    ifd0 = _ifd(tiff, bo, struct.unpack_from(bo + "I", tiff, 4)[0])
+    ifds = [ifd0]
+    if EXIF_IFD in ifd0:
+        exif_offset = struct.unpack_from(bo + "I", tiff, ifd0[EXIF_IFD][2])[0]
+        ifds.insert(0, _ifd(tiff, bo, exif_offset))
+    for ifd in ifds:
+        if DATE_TIME_ORIGINAL not in ifd:
+            continue
+        kind, n, at = ifd[DATE_TIME_ORIGINAL]
+        if kind != 2:  # ASCII
+            continue
+        start = at if n <= 4 else struct.unpack_from(bo + "I", tiff, at)[0]
+        raw = tiff[start : start + n].rstrip(b"\0 ").decode("ascii", "replace")
+        try:
+            return datetime.strptime(raw, "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            return None
+    return None
+
+
+def jpeg_exif_date(path):
+    """DateTimeOriginal from the Exif APP1 segment, reading only the header.
+
+    None means the file has no such date; UNDETERMINED means the header
+    couldn't be read far enough to tell.
+    """
+    with open(path, "rb") as f:
+        data = f.read(HEADER_BYTES)
+    if data[:2] != b"\xff\xd8":
+        return UNDETERMINED
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return UNDETERMINED
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / start of scan: no more metadata
+            return None
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        if marker == 0xE1 and data[pos + 4 : pos + 10] == b"Exif\0\0":
+            try:
+                return _tiff_date(data[pos + 10 : pos + 2 + length])
+            except struct.error:
+                return UNDETERMINED  # segment runs past HEADER_BYTES or is corrupt
+        pos += 2 + length
+    return UNDETERMINED
+
+
+def png_exif_date(path):
+    """DateTimeOriginal from an eXIf chunk, seeking over image data.
+
+    Same return values as jpeg_exif_date.
+    """
+    with open(path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return UNDETERMINED
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return UNDETERMINED
+            length, kind = struct.unpack(">I4s", header)
+            if kind == b"eXIf":
+                try:
+                    return _tiff_date(f.read(length))
+                except struct.error:
+                    return UNDETERMINED
+            if kind == b"IEND":
+                return None
+            f.seek(length + 4, os.SEEK_CUR)  # data + CRC
+
+
+def _atoms(f, start, end):
+    """Yield (type, body_offset, atom_end) for the atoms in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack_from(">I4s", header)
+        body = pos + 8
+        if size == 1 and len(header) == 16:
+            (size,) = struct.unpack_from(">Q", header, 8)
+            body = pos + 16
+        elif size == 0:
+            size = end - pos
+        if size < body - pos:
+            return
+        yield kind, body, pos + size
+        pos += size
+
+
+def mp4_creation_date(path):
+    """mvhd creation_time (UTC, naive) by walking atom headers; None if unset."""
+    with open(path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        for kind, body, atom_end in _atoms(f, 0, end):
+            if kind != b"moov":
+                continue
+            for child, child_body, _ in _atoms(f, body, atom_end):
+                if child != b"mvhd":
+                    continue
+                f.seek(child_body)
+                head = f.read(12)
+                if len(head) < 8:
+                    return None
+                if head[0] == 1:
+                    (created,) = struct.unpack_from(">Q", head, 4)
+                else:
+                    (created,) = struct.unpack_from(">I", head, 4)
+                return MP4_EPOCH + timedelta(seconds=created) if created else None
+            return None
+    return None
+
+
+def header_date(path):
+    """(date, source) from header-only parsing.
+
+    source is exif/mvhd when found, "absent" when the header shows there is
+    no embedded date, and None when a slower fallback has to decide.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in JPEG_EXTS or ext in PNG_EXTS:
+            date = (jpeg_exif_date if ext in JPEG_EXTS else png_exif_date)(path)
+            if date is UNDETERMINED:
+                return None, None
+            return (date, "exif") if date else (None, "absent")
+        if ext in MP4_EXTS:
+            date = mp4_creation_date(path)
+            return (date, "mvhd") if date else (None, None)
+    except (OSError, struct.error, OverflowError):
+        pass
+    return None, None
+
+
+def pil_exif_date(path):
+    try:
+        with Image.open(path) as img:
+            exif = img.getexif()
+            date = exif.get_ifd(EXIF_IFD).get(DATE_TIME_ORIGINAL) or exif.get(
+                DATE_TIME_ORIGINAL
+            )
+        if date:
+            return datetime.strptime(date, "%Y:%m:%d %H:%M:%S")
+    except Exception:
+        pass
+    return None
+
+
+def parse_media_date(values):
+    """First parseable MediaInfo recorded/encoded/tagged date string."""
+    for value in values:
+        try:
+            return datetime.fromisoformat(value.split("T")[0])
+        except Exception:
+            try:
+                return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+            except Exception:
+                continue
+    return None
+
+
+def _mtime_date(path):
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(path))
+    except Exception:
+        return None
+
+
+def extract_dates(conn, paths, workers="auto", probe_workers="auto", on_done=None):
+    """Return {path: (date or None, source)} for every path.
+
+    source is one of exif, mvhd, pil, mediainfo, mtime or None. conn is the
+    manifest connection (for the shared video probe cache); on_done(n) is
+    called as dates are resolved.
+    """
+    workers = resolve_workers(workers)
+    results, images, videos = {}, [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, (date, source) in zip(paths, pool.map(header_date, paths)):
+            if date:
+                results[path] = (date, source)
+                continue
+            if source == "absent":
+                continue  # no embedded date to find; mtime below
+            kind = media_type(path)
+            if kind == "image":
+                images.append(path)
+            elif kind == "video":
+                videos.append(path)
+    if on_done and results:
+        on_done(len(results))
+
+    if images:
+        with ProcessPoolExecutor(max_workers=min(workers, len(images))) as pool:
+            chunksize = max(1, min(64, len(images) // (workers * 4)))
+            for path, date in zip(
+                images, pool.map(pil_exif_date, images, chunksize=chunksize)
+            ):
+                if date:
+                    results[path] = (date, "pil")
+                    if on_done:
+                        on_done(1)
+    if videos:
+        probes = probe_videos(conn, videos, probe_workers)
+        for path in videos:
+            date = parse_media_date(probes.get(path, {}).get("dates", []))
+            if date:
+                results[path] = (date, "mediainfo")
+                if on_done:
+                    on_done(1)
+
+    for path in paths:
+        if path not in results:
+            date = _mtime_date(path)
+            results[path] = (date, "mtime" if date else None)
+            if on_done:
+                on_done(1)
+    return results
@@ -0,0 +1,348 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+from datetime import datetime, timedelta
+
+from helpers.manifest import media_type
+
+# Persistent media index: one row per file (tags, NSFW result, capture date,
+# content hash), upserted by path. Every merged log is recorded in
+# consumed_logs, so each run reads only the logs not recorded there (a log
+# that failed to merge, or finished after a newer one, is picked up next
+# time); fixed-name legacy logs are re-read only when their size/mtime
+# change. Dates and hashes are refreshed
+# only for files a new log mentions and whose size/mtime moved.
+#
+# Queries go through an inverted tag index (media_tags, (tag, path) primary
+# key, kept in step with every tag upsert) plus B-tree indexes on capture
+# date and unsafe score, so a filtered query touches only matching rows.
+
+LOG_KINDS = {
+    "media_tags_": ".tsv",
+    "video_tags_": ".tsv",
+    "nsfw_log_": ".csv",
+}
+LEGACY_LOGS = {"nsfw_log.csv": "nsfw_log_"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL,
+    tags TEXT,
+    classification TEXT,
+    unsafe_score REAL,
+    capture_date TEXT,
+    date_source TEXT,
+    content_hash TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_by_hash ON media (content_hash);
+CREATE INDEX IF NOT EXISTS media_by_date ON media (capture_date);
+CREATE INDEX IF NOT EXISTS media_by_score ON media (unsafe_score);
+CREATE TABLE IF NOT EXISTS media_tags (
+    tag TEXT NOT NULL COLLATE NOCASE,
+    path TEXT NOT NULL,
+    PRIMARY KEY (tag, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS media_tags_by_path ON media_tags (path);
+CREATE TABLE IF NOT EXISTS consumed_logs (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    entries INTEGER NOT NULL,
+    consumed REAL NOT NULL
+);
+"""
+
+
+def open_index(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    fresh = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'media_tags'"
+    ).fetchone()
+    conn.executescript(SCHEMA)
+    if fresh:  # index created by an older version: build the tag index once
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO media_tags "
+                "SELECT j.value, m.path FROM media m, json_each(m.tags) j "
+                "WHERE m.tags IS NOT NULL"
+            )
+    return conn
+
+
+def consumed_names(conn):
+    """Names of every log already merged."""
+    return {name for (name,) in conn.execute("SELECT name FROM consumed_logs")}
+
+
+def pending_logs(conn, logs_dir, full=False):
+    """[(kind, name)] of logs not merged yet (every log if full).
+
+    Oldest first per kind.
+    """
+    names = sorted(os.listdir(logs_dir)) if os.path.isdir(logs_dir) else []
+    consumed = set() if full else consumed_names(conn)
+    pending = []
+    for kind, ext in LOG_KINDS.items():
+        pending += [
+            (kind, name)
+            for name in names
+            if name.startswith(kind) and name.endswith(ext) and name not in consumed
+        ]
+    for name, kind in LEGACY_LOGS.items():
+        try:
+            st = os.stat(os.path.join(logs_dir, name))
+        except OSError:
+            continue
+        row = conn.execute(
+            "SELECT size, mtime_ns FROM consumed_logs WHERE name = ?", (name,)
+        ).fetchone()
+        if full or row != (st.st_size, st.st_mtime_ns):
+            pending.append((kind, name))
+    return pending
+
+
+def read_tag_log(tsv_path):
+    """{path: [tags]} from a media_tags_/video_tags_ TSV."""
+    tag_data = {}
+    with open(tsv_path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        next(reader, None)
+        for row in reader:
+            if row:
+                tag_data[row[0]] = [t for t in row[1:] if t]
+    return tag_data
+
+
+def read_nsfw_log(csv_path):
+    """{path: (classification, unsafe_score)} from an NSFW CSV."""
+    nsfw_data = {}
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            nsfw_data[row["File"]] = (
+                row["Classification"].strip().lower(),
+                float(row["UnsafeScore"]),
+            )
+    return nsfw_data
+
+
+def merge_log(conn, logs_dir, kind, name):
+    """Upsert one log's entries and advance the high-water mark; returns the paths."""
+    log_path = os.path.join(logs_dir, name)
+    st = os.stat(log_path)
+    now = time.time()
+    if kind == "nsfw_log_":
+        data = read_nsfw_log(log_path)
+        rows = [(p, media_type(p), c, s, now) for p, (c, s) in data.items()]
+        sql = (
+            "INSERT INTO media "
+            "(path, media_type, classification, unsafe_score, updated) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+            "classification=excluded.classification, "
+            "unsafe_score=excluded.unsafe_score, updated=excluded.updated"
+        )
+    else:
+        data = read_tag_log(log_path)
+        rows = [(p, media_type(p), json.dumps(tags), now) for p, tags in data.items()]
+        sql = (
+            "INSERT INTO media (path, media_type, tags, updated) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+            "tags=excluded.tags, updated=excluded.updated"
+        )
+    with conn:
+        conn.executemany(sql, rows)
+        if kind != "nsfw_log_":
+            conn.executemany(
+                "DELETE FROM media_tags WHERE path = ?", ((p,) for p in data)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO media_tags VALUES (?, ?)",
+                ((tag, p) for p, tags in data.items() for tag in tags),
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO consumed_logs VALUES (?, ?, ?, ?, ?, ?)",
+            (name, kind, st.st_size, st.st_mtime_ns, len(rows), now),
+        )
+    return list(data)
+
+
+def stale_files(conn, paths):
+    """({path: stat} whose date/hash need computing, errors) for indexed paths."""
+    stale, errors = {}, []
+    for path in paths:
+        row = conn.execute(
+            "SELECT size, mtime_ns, content_hash FROM media WHERE path = ?", (path,)
+        ).fetchone()
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            errors.append((path, f"Stat failed: {e}"))
+            continue
+        if (
+            row is None
+            or row[2] is None
+            or (row[0], row[1]) != (st.st_size, st.st_mtime_ns)
+        ):
+            stale[path] = st
+    return stale, errors
+
+
+def update_files(conn, entries):
+    """entries: iterable of (path, st, capture_date, date_source, content_hash)."""
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "UPDATE media SET capture_date = ?, date_source = ?, content_hash = ?, "
+            "size = ?, mtime_ns = ?, updated = ? WHERE path = ?",
+            (
+                (date, source, content_hash, st.st_size, st.st_mtime_ns, now, path)
+                for path, st, date, source, content_hash in entries
+            ),
+        )
+
+
+COLUMNS = (
+    "m.path, m.media_type, m.tags, m.classification, m.unsafe_score, m.capture_date, "
+    "m.date_source, m.content_hash"
+)
+
+
+def row_entry(row):
+    """Index row -> the old merge_tag_logs JSONL entry (plus the new fields)."""
+    path, kind, tags, classification, score, date, source, content_hash = row
+    return {
+        "file": path,
+        "tags": json.loads(tags) if tags else [],
+        "nsfw": classification == "unsafe",
+        "unsafe_score": score or 0.0,
+        "capture_date": date,
+        "media_type": kind,
+        "classification": classification or "unknown",
+        "date_source": source,
+        "content_hash": content_hash,
+    }
+
+
+def export_jsonl(conn, out_path):
+    """Write every row as JSONL; returns the number of entries."""
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for row in conn.execute(f"SELECT {COLUMNS} FROM media m ORDER BY m.path"):
+            out.write(json.dumps(row_entry(row)) + "\n")
+            count += 1
+    return count
+
+
+PERIOD_FORMATS = ("%Y", "%Y-%m", "%Y-%m-%d")
+
+
+def parse_period(value):
+    """Normalise a YYYY, YYYY-MM or YYYY-MM-DD date; ValueError if malformed."""
+    parts = value.strip().split("-")
+    if 1 <= len(parts) <= 3 and len(parts[0]) == 4 and all(p.isdigit() for p in parts):
+        fmt = PERIOD_FORMATS[len(parts) - 1]
+        try:
+            return datetime.strptime("-".join(parts), fmt).strftime(fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"invalid date {value!r} (expected YYYY, YYYY-MM or YYYY-MM-DD)")
+
+
+def _period_end(value):
+    """Exclusive upper bound for a YYYY, YYYY-MM or YYYY-MM-DD date."""
+    parts = [int(p) for p in parse_period(value).split("-")]
+    if len(parts) == 1:
+        return f"{parts[0] + 1:04d}"
+    if len(parts) == 2:
+        year, month = parts
+        return f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+    return (datetime(*parts) + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _tag_count(conn, tag):
+    sql = "SELECT COUNT(*) FROM media_tags WHERE tag = ?"
+    return conn.execute(sql, (tag,)).fetchone()[0]
+
+
+def query(
+    conn,
+    tags=(),
+    any_tags=(),
+    exclude_tags=(),
+    date_from=None,
+    date_to=None,
+    classification=None,
+    min_score=None,
+    max_score=None,
+    kind=None,
+    limit=None,
+    count=False,
+):
+    """Cursor over index rows matching every filter (or a 1-row count).
+
+    tags must all be present, any_tags at least one, exclude_tags none
+    (case-insensitive). Dates are YYYY, YYYY-MM or YYYY-MM-DD, both ends
+    inclusive. Rows are in path order; map them with row_entry().
+    """
+    tables, where, params = ["media m"], [], []
+    if tags:
+        # Walk the inverted index for the rarest tag (already in path order)
+        # and probe it for the others before any media row is read.
+        if len(tags) > 1:
+            tags = sorted(tags, key=lambda t: _tag_count(conn, t))
+        tables = ["media_tags t0", "JOIN media m ON m.path = t0.path"]
+        where.append("t0.tag = ?")
+        params.append(tags[0])
+        for i, tag in enumerate(tags[1:], 1):
+            where.append(
+                f"EXISTS (SELECT 1 FROM media_tags t{i} "
+                f"WHERE t{i}.tag = ? AND t{i}.path = t0.path)"
+            )
+            params.append(tag)
+    if any_tags:
+        where.append(
+            "m.path IN (SELECT path FROM media_tags "
+            f"WHERE tag IN ({','.join('?' * len(any_tags))}))"
+        )
+        params += list(any_tags)
+    if exclude_tags:
+        where.append(
+            "m.path NOT IN (SELECT path FROM media_tags "
+            f"WHERE tag IN ({','.join('?' * len(exclude_tags))}))"
+        )
+        params += list(exclude_tags)
+    if date_from:
+        where.append("m.capture_date >= ?")
+        params.append(parse_period(date_from))
+    if date_to:
+        where.append("m.capture_date < ?")
+        params.append(_period_end(date_to))
+    if classification:
+        where.append("m.classification = ?")
+        params.append(classification)
+    if min_score is not None:
+        where.append("m.unsafe_score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        where.append("m.unsafe_score <= ?")
+        params.append(max_score)
+    if kind:
+        where.append("m.media_type = ?")
+        params.append(kind)
+    sql = f"SELECT {'COUNT(*)' if count else COLUMNS} FROM {' '.join(tables)}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if not count:
+        sql += f" ORDER BY {'t0.path' if tags else 'm.path'}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+    return conn.execute(sql, params)
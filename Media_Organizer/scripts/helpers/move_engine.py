@@ -0,0 +1,332 @@
+import os
+import json
+import errno
+import shutil
+import filecmp
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Shared file-move engine for organize_by_date and move_duplicates.
+#   plan     every destination is decided up front; _dupN collisions are
+#            resolved against an in-memory index (one listing per target
+#            directory) instead of os.path.exists loops
+#   execute  target directories are created once, same-device moves are a
+#            link + unlink (never replaces a file that appeared after
+#            planning), cross-device moves go to a bounded pool of copy
+#            workers
+#   journal  JSONL write-ahead log: the whole plan is fsynced before the
+#            first move, completed moves are appended (fsynced in groups),
+#            and resume()/undo() reconcile against the filesystem, so a
+#            crash between a move and its journal line is harmless
+#
+# Journal records: {"op": "plan", "i", "src", "dst"[, "info"]} ... {"op": "planned"},
+# then {"op": "done"|"failed", "i", ...}, {"op": "complete"}, and for an
+# undo {"op": "undone", "i"} ... {"op": "undo_complete"}.
+
+SYNC_EVERY = 64
+PARTIAL_SUFFIX = ".partial"
+DEST_EXISTS = "Destination exists"
+# os.link errors meaning "no hard links on this filesystem", not a conflict.
+NO_LINK_ERRNOS = {
+    errno.EPERM,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EMLINK,
+    errno.ENOSYS,
+}
+
+
+def _listing(dirname):
+    try:
+        return {name.casefold() for name in os.listdir(dirname)}
+    except OSError:
+        return set()
+
+
+def plan_moves(items, index=None):
+    """items: iterable of (src, dest_dir). Returns [(src, dst)].
+
+    Names are compared case-insensitively so a plan is also safe on
+    case-insensitive filesystems.
+    """
+    index = {} if index is None else index
+    plan = []
+    for src, dest_dir in items:
+        names = index.get(dest_dir)
+        if names is None:
+            names = index[dest_dir] = _listing(dest_dir)
+        name = os.path.basename(src)
+        base, ext = os.path.splitext(name)
+        counter = 1
+        while name.casefold() in names:
+            name = f"{base}_dup{counter}{ext}"
+            counter += 1
+        names.add(name.casefold())
+        plan.append((src, os.path.join(dest_dir, name)))
+    return plan
+
+
+def make_dirs(paths):
+    """Create each parent directory of paths once; returns {dir: st_dev}."""
+    devices = {}
+    for dirname in sorted({os.path.dirname(p) for p in paths}):
+        os.makedirs(dirname, exist_ok=True)
+        devices[dirname] = os.stat(dirname).st_dev
+    return devices
+
+
+def _place(src, dst):
+    """Rename src to dst on one device, raising FileExistsError if dst exists.
+
+    os.rename/os.replace would silently overwrite a file created at dst
+    after the plan was made; a hard link fails instead. Filesystems without
+    hard links fall back to check-then-rename.
+    """
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in NO_LINK_ERRNOS:
+            raise
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, DEST_EXISTS, dst)
+        os.rename(src, dst)
+        return
+    os.unlink(src)
+
+
+def _copy_move(src, dst):
+    tmp = dst + PARTIAL_SUFFIX
+    shutil.copy2(src, tmp)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    try:
+        _place(tmp, dst)
+    except FileExistsError:
+        os.unlink(tmp)
+        raise
+    os.unlink(src)
+
+
+def _append(journal_path):
+    """Open a journal for appending, first ending any line torn by a crash."""
+    with open(journal_path, "ab+") as f:
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    return open(journal_path, "a", encoding="utf-8")
+
+
+def _write(journal, records, sync=False):
+    for record in records:
+        journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+    journal.flush()
+    if sync:
+        os.fsync(journal.fileno())
+
+
+def _run(ops, journal, copy_workers, on_done, done_op="done"):
+    """ops: [(i, src, dst)]. Moves src -> dst; returns (moved, errors)."""
+    moved, errors, copies = [], [], []
+    unsynced = 0
+
+    def finish(i, src, dst, method, error=None):
+        nonlocal unsynced
+        if error is None:
+            moved.append((src, dst))
+            record = {"op": done_op, "i": i, "method": method}
+        else:
+            errors.append((src, error))
+            record = {"op": "failed", "i": i, "error": error}
+        unsynced += 1
+        sync = unsynced >= SYNC_EVERY
+        _write(journal, [record], sync)
+        if sync:
+            unsynced = 0
+        if on_done:
+            on_done(src, dst, method, error)
+
+    devices = make_dirs(dst for _, _, dst in ops)
+    for i, src, dst in ops:
+        try:
+            st = os.stat(src)
+        except FileNotFoundError:
+            finish(i, src, dst, None, "Not found")
+            continue
+        except OSError as e:
+            finish(i, src, dst, None, str(e))
+            continue
+        if st.st_dev != devices[os.path.dirname(dst)]:
+            copies.append((i, src, dst))
+            continue
+        try:
+            _place(src, dst)
+            finish(i, src, dst, "rename")
+        except FileExistsError:
+            finish(i, src, dst, None, DEST_EXISTS)
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                copies.append((i, src, dst))
+            else:
+                finish(i, src, dst, None, str(e))
+
+    if copies:
+        with ThreadPoolExecutor(max_workers=max(1, copy_workers)) as pool:
+            futures = {
+                pool.submit(_copy_move, src, dst): (i, src, dst)
+                for i, src, dst in copies
+            }
+            for future in as_completed(futures):
+                i, src, dst = futures[future]
+                error = future.exception()
+                if isinstance(error, FileExistsError):
+                    error = DEST_EXISTS
+                finish(i, src, dst, "copy", str(error) if error else None)
+    _write(journal, [], sync=True)
+    return moved, errors
+
+
+def execute(plan, journal_path, copy_workers=4, on_done=None, info=None):
+    """Journal and carry out plan [(src, dst)]; returns (moved, errors).
+
+    on_done(src, dst, method, error) is called after every move. info, if
+    given, is {src: JSON-able value} kept in the plan records so a resume
+    can report what each move was for (see read_journal()["info"]).
+    """
+    os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+    records = []
+    for i, (src, dst) in enumerate(plan):
+        record = {"op": "plan", "i": i, "src": src, "dst": dst}
+        if info and src in info:
+            record["info"] = info[src]
+        records.append(record)
+    with _append(journal_path) as journal:
+        _write(journal, records + [{"op": "planned"}], sync=True)
+        moved, errors = _run(
+            [(i, src, dst) for i, (src, dst) in enumerate(plan)],
+            journal,
+            copy_workers,
+            on_done,
+        )
+        _write(journal, [{"op": "complete"}], sync=True)
+    return moved, errors
+
+
+def read_journal(journal_path):
+    """Replay a journal into its state.
+
+    {'plan': [(src, dst)], 'info', 'planned', 'done', 'undone', 'complete',
+    'undo_complete'}
+    """
+    state = {
+        "plan": [],
+        "info": {},
+        "planned": False,
+        "done": {},
+        "undone": set(),
+        "complete": False,
+        "undo_complete": False,
+    }
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # line torn by a crash
+            op = record.get("op")
+            if op == "plan":
+                state["plan"].append((record["src"], record["dst"]))
+                if "info" in record:
+                    state["info"][record["src"]] = record["info"]
+            elif op in ("planned", "complete", "undo_complete"):
+                state[op] = True
+            elif op == "done":
+                state["done"][record["i"]] = record.get("method")
+            elif op == "undone":
+                state["undone"].add(record["i"])
+    return state
+
+
+def latest_journal(logs_dir, prefix):
+    if not os.path.isdir(logs_dir):
+        return None
+    names = sorted(
+        f for f in os.listdir(logs_dir) if f.startswith(prefix) and f.endswith(".jsonl")
+    )
+    return os.path.join(logs_dir, names[-1]) if names else None
+
+
+def _reconcile(i, src, dst, journal):
+    """Settle a planned move the journal has no result for.
+
+    Returns "done" if it already happened, "pending" if it still has to
+    run, or an error message.
+    """
+    partial = dst + PARTIAL_SUFFIX
+    if os.path.exists(partial):
+        os.unlink(partial)
+    src_exists, dst_exists = os.path.exists(src), os.path.exists(dst)
+    if dst_exists and not src_exists:
+        result = "done"
+    elif dst_exists and filecmp.cmp(src, dst, shallow=False):
+        os.unlink(src)  # copy finished, source unlink did not
+        result = "done"
+    elif dst_exists:
+        return DEST_EXISTS
+    elif src_exists:
+        return "pending"
+    else:
+        return "Not found"
+    _write(journal, [{"op": "done", "i": i, "method": "reconciled"}])
+    return result
+
+
+def resume(journal_path, copy_workers=4, on_done=None):
+    """Finish an interrupted journal; returns (moved, errors).
+
+    moved includes moves completed before the interruption, so callers
+    can bring the manifest up to date.
+    """
+    state = read_journal(journal_path)
+    if not state["planned"]:
+        return [], []  # crashed while writing the plan: nothing was moved
+    moved = [state["plan"][i] for i in state["done"]]
+    errors, pending = [], []
+    with _append(journal_path) as journal:
+        for i, (src, dst) in enumerate(state["plan"]):
+            if i in state["done"]:
+                continue
+            result = _reconcile(i, src, dst, journal)
+            if result == "done":
+                moved.append((src, dst))
+            elif result == "pending":
+                pending.append((i, src, dst))
+            else:
+                errors.append((src, result))
+        new_moved, new_errors = _run(pending, journal, copy_workers, on_done)
+        _write(journal, [{"op": "complete"}], sync=True)
+    return moved + new_moved, errors + new_errors
+
+
+def undo(journal_path, copy_workers=4, on_done=None):
+    """Move every completed move of a journal back; returns (restored, errors).
+
+    restored is [(current_path, original_path)]. Safe to rerun.
+    """
+    state = read_journal(journal_path)
+    ops, errors = [], []
+    for i in sorted(state["done"], reverse=True):
+        if i in state["undone"]:
+            continue
+        src, dst = state["plan"][i]
+        if os.path.exists(src):
+            errors.append((dst, f"Original path is occupied: {src}"))
+        else:
+            ops.append((i, dst, src))
+    with _append(journal_path) as journal:
+        restored, run_errors = _run(
+            ops, journal, copy_workers, on_done, done_op="undone"
+        )
+        _write(journal, [{"op": "undo_complete"}], sync=True)
+    return restored, errors + run_errors
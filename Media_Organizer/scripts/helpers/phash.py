@@ -0,0 +1,147 @@
+import os
+import numpy as np
+from PIL import Image, ImageOps
+
+# Perceptual hashes for near-duplicate images (resized, re-encoded, lightly
+# edited copies). Hashes are 64-bit ints; similarity is Hamming distance.
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp", ".tif", ".tiff")
+HASH_BITS = 64
+METHODS = ("dhash", "phash")
+
+_PHASH_SIZE = 32
+_k = np.arange(_PHASH_SIZE)[:, None]
+_n = np.arange(_PHASH_SIZE)[None, :]
+_DCT = np.sqrt(2.0 / _PHASH_SIZE) * np.cos(
+    np.pi * (2 * _n + 1) * _k / (2 * _PHASH_SIZE)
+)
+_DCT[0] /= np.sqrt(2.0)
+_WEIGHTS = 1 << np.arange(HASH_BITS - 1, -1, -1, dtype=np.uint64)
+
+
+def load_gray(path, size):
+    """Decode path to a (h, w) float32 grayscale array of the given (w, h) size."""
+    with Image.open(path) as img:
+        # JPEGs decode straight at 1/2..1/8 scale; far cheaper than full size.
+        img.draft("L", (size[0] * 4, size[1] * 4))
+        img = ImageOps.exif_transpose(img)
+        dims = img.size
+        img = img.convert("L").resize(size, Image.BILINEAR)
+        return np.asarray(img, dtype=np.float32), dims
+
+
+def bits_to_int(bits):
+    return int(np.dot(bits.ravel().astype(np.uint64), _WEIGHTS))
+
+
+def dhash(pixels):
+    # pixels: 8 rows x 9 cols; one bit per horizontal gradient sign.
+    return bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(pixels):
+    # pixels: 32x32; keep the 8x8 lowest frequencies, threshold at their median.
+    low = (_DCT @ pixels @ _DCT.T)[:8, :8].ravel()
+    return bits_to_int(low > np.median(low[1:]))
+
+
+def image_hash(path, method="phash"):
+    """Return (hash, (width, height)) for an image file."""
+    if method == "dhash":
+        pixels, dims = load_gray(path, (9, 8))
+        return dhash(pixels), dims
+    pixels, dims = load_gray(path, (_PHASH_SIZE, _PHASH_SIZE))
+    return phash(pixels), dims
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def similarity(distance):
+    return 1.0 - distance / HASH_BITS
+
+
+def hash_hex(value):
+    return f"{value:016x}"
+
+
+class BKTree:
+    """Metric tree over Hamming distance; radius queries skip whole subtrees
+    via the triangle inequality instead of comparing every pair."""
+
+    def __init__(self):
+        self.root = None  # [hash, [items], {distance: child}]
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """Yield (distance, item) for every item within radius of value."""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                for item in node[1]:
+                    yield d, item
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+
+
+def group_near_duplicates(entries, threshold):
+    """entries: {path: (hash, (w, h), size_bytes)}.
+
+    Returns [[(path, hash, similarity), ...], ...]. The first member of each
+    group is the keeper (most pixels, then largest file) and every other
+    member is within threshold bits of it, so groups never chain through
+    intermediate images.
+    """
+    tree = BKTree()
+    for path, (value, _, _) in entries.items():
+        tree.add(value, path)
+    order = sorted(
+        entries,
+        key=lambda p: (entries[p][1][0] * entries[p][1][1], entries[p][2]),
+        reverse=True,
+    )
+    assigned = set()
+    groups = []
+    for keeper in order:
+        if keeper in assigned:
+            continue
+        value = entries[keeper][0]
+        members = sorted(
+            (d, p)
+            for d, p in tree.search(value, threshold)
+            if p != keeper and p not in assigned
+        )
+        if not members:
+            continue
+        assigned.add(keeper)
+        group = [(keeper, value, 1.0)]
+        for d, p in members:
+            assigned.add(p)
+            group.append((p, entries[p][0], similarity(d)))
+        groups.append(group)
+    return groups
+
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTS
@@ -0,0 +1,273 @@
+import os
+import numpy as np
+
+# Top-k inner-product search over the stored (L2-normalised) CLIP vectors.
+#   brute  float32 matmul over the float16 memmap in chunks; exact, and the
+#          fastest choice up to ~100k vectors
+#   ivfpq  inverted file + product quantization in plain NumPy: a coarse
+#          k-means picks the nprobe closest lists, their members are scored
+#          from uint8 PQ codes of the residuals with one lookup table per
+#          query, and the best k * RERANK are re-scored exactly from the
+#          memmap
+# The IVF-PQ index is saved next to its store (<slug>.ivfpq.npz). Rows
+# appended since the last build are encoded with the existing quantizers;
+# the quantizers are retrained once the store has doubled.
+
+CHUNK_ROWS = 65536
+PQ_CENTROIDS = 256  # one uint8 code per sub-vector
+PQ_SUB_DIM = 8
+TRAIN_SAMPLE = 65536
+PQ_TRAIN_SAMPLE = 16384
+KMEANS_ITERS = 12
+RERANK = 8
+DEFAULT_NPROBE = 64
+BRUTE_FORCE_MAX = 100000
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def brute_force(matrix, query, k):
+    """(rows, scores) of the k best rows of matrix for a normalised query."""
+    query = np.asarray(query, dtype=np.float32)
+    rows = np.zeros(0, dtype=np.int64)
+    scores = np.zeros(0, dtype=np.float32)
+    for start in range(0, len(matrix), CHUNK_ROWS):
+        chunk = np.asarray(matrix[start : start + CHUNK_ROWS], dtype=np.float32) @ query
+        best = top_k(chunk, k)
+        rows = np.concatenate([rows, best + start])
+        scores = np.concatenate([scores, chunk[best]])
+        keep = top_k(scores, k)
+        rows, scores = rows[keep], scores[keep]
+    return rows, scores
+
+
+def _nearest(x, centroids):
+    """Index of the nearest centroid (L2) for every row of x."""
+    c_norms = (centroids * centroids).sum(axis=1)
+    assign = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), CHUNK_ROWS):
+        block = x[start : start + CHUNK_ROWS]
+        assign[start : start + len(block)] = np.argmin(
+            c_norms - 2 * block @ centroids.T, axis=1
+        )
+    return assign
+
+
+def kmeans(x, k, iters=KMEANS_ITERS, seed=0):
+    """Lloyd's k-means on float32 rows; empty clusters are re-seeded."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(x, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = (
+            np.add.reduceat(x[order], starts, axis=0) / counts[filled, None]
+        )
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return centroids
+
+
+def _sample(matrix, size, seed=0):
+    n = len(matrix)
+    if n <= size:
+        return np.asarray(matrix, dtype=np.float32)
+    rows = np.sort(np.random.default_rng(seed).choice(n, size, replace=False))
+    return np.asarray(matrix[rows], dtype=np.float32)
+
+
+def _split(x):
+    """(n, dim) -> (dim / PQ_SUB_DIM, n, PQ_SUB_DIM) sub-vectors."""
+    return x.reshape(len(x), -1, PQ_SUB_DIM).transpose(1, 0, 2)
+
+
+def _pq_codes(sub, books):
+    """Nearest codeword per sub-vector, all sub-spaces in one batched matmul."""
+    b_norms = (books * books).sum(axis=2)[:, None, :]
+    codes = np.empty((sub.shape[1], len(books)), dtype=np.uint8)
+    step = max(1, CHUNK_ROWS // 32)
+    for start in range(0, sub.shape[1], step):
+        block = sub[:, start : start + step]
+        dist = b_norms - 2 * np.matmul(block, books.transpose(0, 2, 1))
+        codes[start : start + block.shape[1]] = dist.argmin(axis=2).T
+    return codes
+
+
+def train_pq(residuals, iters=KMEANS_ITERS, seed=0):
+    """k-means codebooks (dim / PQ_SUB_DIM, PQ_CENTROIDS, PQ_SUB_DIM).
+
+    All sub-spaces are trained together.
+    """
+    rng = np.random.default_rng(seed)
+    sub = np.ascontiguousarray(_split(residuals))
+    k = min(PQ_CENTROIDS, sub.shape[1])
+    books = sub[:, rng.choice(sub.shape[1], k, replace=False)].copy()
+    for _ in range(iters):
+        codes = _pq_codes(sub, books)
+        for j in range(len(books)):
+            counts = np.bincount(codes[:, j], minlength=k)
+            order = np.argsort(codes[:, j], kind="stable")
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            books[j, filled] = (
+                np.add.reduceat(sub[j][order], starts, axis=0) / counts[filled, None]
+            )
+    return books
+
+
+def _encode(index, x):
+    """(list ids, PQ codes) for float32 rows x."""
+    lists = _nearest(x, index["centroids"])
+    residuals = x - index["centroids"][lists]
+    return lists, _pq_codes(_split(residuals), index["codebooks"])
+
+
+def _add(index, matrix, start):
+    """Encode rows [start:] of matrix and merge them into the inverted lists."""
+    new_lists, new_codes, new_rows = [], [], []
+    for pos in range(start, len(matrix), CHUNK_ROWS):
+        block = np.asarray(matrix[pos : pos + CHUNK_ROWS], dtype=np.float32)
+        block_lists, block_codes = _encode(index, block)
+        new_lists.append(block_lists)
+        new_codes.append(block_codes)
+        new_rows.append(np.arange(pos, pos + len(block)))
+    nlist = len(index["centroids"])
+    old_lists = np.repeat(np.arange(nlist), np.diff(index["offsets"]))
+    all_lists = np.concatenate([old_lists] + new_lists)
+    order = np.argsort(all_lists, kind="stable")
+    index["rows"] = np.concatenate([index["rows"]] + new_rows)[order]
+    index["codes"] = np.concatenate([index["codes"]] + new_codes)[order]
+    index["offsets"] = np.concatenate(
+        [[0], np.cumsum(np.bincount(all_lists, minlength=nlist))]
+    )
+    index["indexed_rows"] = len(matrix)
+    return index
+
+
+def build_ivfpq(matrix, nlist=None, seed=0):
+    """Train the coarse and PQ quantizers on a sample and encode every row."""
+    n, dim = matrix.shape
+    if dim % PQ_SUB_DIM:
+        raise ValueError(f"Vector dim {dim} is not a multiple of {PQ_SUB_DIM}")
+    nlist = nlist or int(np.clip(np.sqrt(n), 16, 4096))
+    sample = _sample(matrix, TRAIN_SAMPLE, seed)
+    centroids = kmeans(sample, nlist, seed=seed)
+    sample = sample[:: max(1, len(sample) // PQ_TRAIN_SAMPLE)][:PQ_TRAIN_SAMPLE]
+    codebooks = train_pq(sample - centroids[_nearest(sample, centroids)], seed=seed)
+    index = {
+        "centroids": centroids,
+        "codebooks": codebooks,
+        "rows": np.zeros(0, dtype=np.int64),
+        "codes": np.zeros((0, dim // PQ_SUB_DIM), dtype=np.uint8),
+        "offsets": np.zeros(len(centroids) + 1, dtype=np.int64),
+        "trained_rows": n,
+        "indexed_rows": 0,
+    }
+    return _add(index, matrix, 0)
+
+
+def save_ivfpq(index, path):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **{key: np.asarray(value) for key, value in index.items()})
+    os.replace(tmp, path)
+
+
+def load_ivfpq(path):
+    with np.load(path) as data:
+        index = {key: data[key] for key in data.files}
+    index["trained_rows"] = int(index["trained_rows"])
+    index["indexed_rows"] = int(index["indexed_rows"])
+    return index
+
+
+def ensure_ivfpq(path, matrix, rebuild=False):
+    """Load, extend or (re)build the index at path for matrix.
+
+    Returns (index, action).
+    """
+    index = None
+    if not rebuild and os.path.exists(path):
+        try:
+            index = load_ivfpq(path)
+        except Exception:
+            index = None  # unreadable: rebuild below
+    n = len(matrix)
+    if index is not None and index["centroids"].shape[1] != matrix.shape[1]:
+        index = None
+    if index is None or n > 2 * index["trained_rows"] or n < index["indexed_rows"]:
+        action = "built"
+        index = build_ivfpq(matrix)
+    elif n > index["indexed_rows"]:
+        action = f"added {n - index['indexed_rows']}"
+        index = _add(index, matrix, index["indexed_rows"])
+    else:
+        return index, "loaded"
+    save_ivfpq(index, path)
+    return index, action
+
+
+def search_ivfpq(index, matrix, query, k, nprobe=DEFAULT_NPROBE):
+    """(rows, scores) of the approximate k best rows, exactly re-scored."""
+    query = np.asarray(query, dtype=np.float32)
+    coarse = index["centroids"] @ query
+    probe = top_k(coarse, nprobe)
+    offsets = index["offsets"]
+    spans = [(offsets[c], offsets[c + 1]) for c in probe]
+    cand = (
+        np.concatenate([np.arange(lo, hi) for lo, hi in spans])
+        if spans
+        else np.zeros(0, int)
+    )
+    if not len(cand):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    books = index["codebooks"]
+    lut = np.einsum("msd,md->ms", books, query.reshape(len(books), PQ_SUB_DIM))
+    approx = np.repeat(coarse[probe], [hi - lo for lo, hi in spans])
+    approx += lut[np.arange(len(books)), index["codes"][cand]].sum(axis=1)
+    shortlist = index["rows"][cand[top_k(approx, k * RERANK)]]
+    order = np.sort(shortlist)  # sequential reads from the memmap
+    exact = np.asarray(matrix[order], dtype=np.float32) @ query
+    best = top_k(exact, k)
+    return order[best], exact[best]
+
+
+def search(
+    matrix,
+    query,
+    k,
+    method="auto",
+    index_path=None,
+    nprobe=DEFAULT_NPROBE,
+    brute_max=BRUTE_FORCE_MAX,
+    rebuild=False,
+):
+    """(rows, scores, description) using brute force or IVF-PQ.
+
+    method "auto" picks brute force up to brute_max rows; ivfpq needs
+    index_path to persist the index.
+    """
+    if method == "auto":
+        method = "brute" if len(matrix) <= brute_max or not index_path else "ivfpq"
+    if method == "brute" or len(matrix) == 0:
+        rows, scores = brute_force(matrix, query, k)
+        return rows, scores, "brute force"
+    index, action = ensure_ivfpq(index_path, matrix, rebuild)
+    rows, scores = search_ivfpq(index, matrix, query, k, nprobe)
+    return (
+        rows,
+        scores,
+        f"IVF-PQ ({len(index['centroids'])} lists, nprobe {nprobe}, index {action})",
+    )
@@ -0,0 +1,186 @@
+import os
+from collections import defaultdict
+
+import cv2  # type: ignore
+import numpy as np
+
+from helpers.phash import dhash, hamming
+from helpers.frame_sampler import iter_frames
+
+# Video fingerprints: one 64-bit dHash per sampled frame. Copies are found
+# through an inverted index of short signature shingles, then aligned by
+# voting on the time offset between the two sequences.
+
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv", ".m4v", ".webm")
+# 16-bit bands. Two frames <= 3 bits apart always agree exactly on at least
+# one band, but a shingle key needs *both* of its frames to agree on the same
+# band, which is only guaranteed when the two frame pairs differ by <= 3
+# bits in total. Noisier copies still collide on most shingles in practice
+# and the offset vote only needs min_votes of them, so this is a recall
+# trade-off, not a guarantee.
+BANDS = 4
+BAND_BITS = 64 // BANDS
+# Frames this close to all-0/all-1 bits (black, white, fades) match everything.
+MIN_ENTROPY_BITS = 8
+# Shingle keys with more postings than this are ignored (intros, logos,
+# static shots); they add little but cost quadratic pair votes.
+MAX_POSTINGS = 50
+
+
+def is_video(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTS
+
+
+def video_signatures(path, interval_sec=1.0):
+    """Sample one frame every interval_sec; return (signatures, duration_sec)."""
+    info = {}
+    signatures = []
+    for _, gray in iter_frames(path, interval_sec, size=64, gray=True, info=info):
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        signatures.append(dhash(small.astype(np.float32)))
+    return signatures, max(info.get("duration", 0.0), len(signatures) * interval_sec)
+
+
+def informative(sig):
+    ones = bin(sig).count("1")
+    return MIN_ENTROPY_BITS <= ones <= 64 - MIN_ENTROPY_BITS
+
+
+def band(sig, b):
+    return (sig >> (b * BAND_BITS)) & ((1 << BAND_BITS) - 1)
+
+
+def shingles(signatures, size=2):
+    """Yield (position, key) for each run of `size` informative frames, per band."""
+    for i in range(len(signatures) - size + 1):
+        window = signatures[i : i + size]
+        if not all(informative(s) for s in window):
+            continue
+        for b in range(BANDS):
+            yield i, (b,) + tuple(band(s, b) for s in window)
+
+
+def build_index(fingerprints, shingle_size=2):
+    """fingerprints: {video_id: [signatures]} -> {key: [(video_id, pos)]}."""
+    index = defaultdict(list)
+    for vid, sigs in fingerprints.items():
+        for pos, key in shingles(sigs, shingle_size):
+            index[key].append((vid, pos))
+    return index
+
+
+def candidate_offsets(index, min_votes=3):
+    """Return {(a, b): {offset: votes}} for video pairs sharing shingles.
+
+    offset is in samples: frame i of a lines up with frame i - offset of b.
+    """
+    votes = defaultdict(lambda: defaultdict(int))
+    for key, postings in index.items():
+        if len(postings) > MAX_POSTINGS:
+            continue
+        for i, (a, pa) in enumerate(postings):
+            for b, pb in postings[i + 1 :]:
+                if a == b:
+                    continue
+                if a > b:
+                    a, pa, b, pb = b, pb, a, pa
+                votes[(a, b)][pa - pb] += 1
+    return {
+        pair: hist for pair, hist in votes.items() if max(hist.values()) >= min_votes
+    }
+
+
+def align(sig_a, sig_b, offset, frame_threshold):
+    """Count informative frames that match when b is shifted by offset samples."""
+    matched = 0
+    for j in range(max(0, -offset), min(len(sig_b), len(sig_a) - offset)):
+        sa, sb = sig_a[j + offset], sig_b[j]
+        if informative(sa) and informative(sb) and hamming(sa, sb) <= frame_threshold:
+            matched += 1
+    return matched
+
+
+def match_videos(
+    fingerprints,
+    interval_sec=1.0,
+    frame_threshold=10,
+    min_seconds=5,
+    shingle_size=2,
+    top_offsets=3,
+):
+    """Return [{a, b, matched_seconds, offset_seconds, coverage}, ...].
+
+    Only the few best-voted offsets per candidate pair (and their
+    neighbours, for half-sample drift) are verified frame by frame.
+    """
+    index = build_index(fingerprints, shingle_size)
+    candidates = candidate_offsets(index)
+    matches = []
+    for (a, b), hist in candidates.items():
+        tried = set()
+        best = (0, 0)
+        for offset, _ in sorted(hist.items(), key=lambda kv: -kv[1])[:top_offsets]:
+            for off in (offset - 1, offset, offset + 1):
+                if off in tried:
+                    continue
+                tried.add(off)
+                matched = align(fingerprints[a], fingerprints[b], off, frame_threshold)
+                if matched > best[0]:
+                    best = (matched, off)
+        matched, offset = best
+        seconds = matched * interval_sec
+        if seconds < min_seconds:
+            continue
+        shorter = min(len(fingerprints[a]), len(fingerprints[b])) or 1
+        matches.append(
+            {
+                "a": a,
+                "b": b,
+                "matched_seconds": seconds,
+                "offset_seconds": offset * interval_sec,
+                "coverage": min(1.0, matched / shorter),
+            }
+        )
+    return matches
+
+
+def group_video_matches(matches, durations, sizes, min_coverage=0.5):
+    """Keeper-centred groups like phash.group_near_duplicates.
+
+    Returns [[(path, coverage, matched_seconds, offset_seconds), ...], ...];
+    the keeper (longest, then largest file) comes first with offset 0 and
+    each member's offset is where it starts inside the keeper.
+    """
+    links = defaultdict(dict)
+    for m in matches:
+        if m["coverage"] < min_coverage:
+            continue
+        links[m["a"]][m["b"]] = (
+            m["coverage"],
+            m["matched_seconds"],
+            m["offset_seconds"],
+        )
+        links[m["b"]][m["a"]] = (
+            m["coverage"],
+            m["matched_seconds"],
+            -m["offset_seconds"],
+        )
+    order = sorted(
+        links, key=lambda p: (durations.get(p, 0), sizes.get(p, 0)), reverse=True
+    )
+    assigned = set()
+    groups = []
+    for keeper in order:
+        if keeper in assigned:
+            continue
+        members = [
+            (p, *info)
+            for p, info in sorted(links[keeper].items(), key=lambda kv: -kv[1][0])
+            if p not in assigned
+        ]
+        if not members:
+            continue
+        assigned.add(keeper)
+        assigned.update(p for p, *_ in members)
+        groups.append([(keeper, 1.0, durations.get(keeper, 0), 0.0)] + members)
+    return groups
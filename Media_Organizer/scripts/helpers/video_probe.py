@@ -0,0 +1,191 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from pymediainfo import MediaInfo  # type: ignore
+except ImportError:
+    MediaInfo = None
+try:
+    import cv2  # type: ignore
+except ImportError:
+    cv2 = None
+
+from helpers.hash_cache import stat_key
+
+# Container/stream facts for videos, probed once and shared by every stage.
+# Probes run in worker processes (MediaInfo and OpenCV hold the GIL for
+# much of a parse) and are cached in the manifest database keyed on
+# (device, inode, size, mtime_ns), not path, so a file moved by
+# organize_by_date keeps its entry and any rewrite invalidates it.
+
+FIELDS = ("duration", "fps", "frame_count", "width", "height", "codec", "dates")
+DATE_KEYS = ("recorded_date", "encoded_date", "tagged_date")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_probes (
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    fps REAL,
+    frame_count INTEGER,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    dates TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (dev, inode, size, mtime_ns)
+)
+"""
+
+
+def resolve_workers(setting):
+    if setting in (None, "auto", 0):
+        return os.cpu_count() or 4
+    return max(1, int(setting))
+
+
+def _number(value, kind=float):
+    try:
+        return kind(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _mediainfo(path, info):
+    parsed = MediaInfo.parse(path)
+    if isinstance(parsed, str) or not hasattr(parsed, "tracks"):
+        return
+    for track in parsed.tracks:
+        kind = getattr(track, "track_type", None)
+        if kind == "General":
+            duration = _number(getattr(track, "duration", None))
+            if duration:
+                info["duration"] = duration / 1000
+            info["dates"] = [
+                getattr(track, key) for key in DATE_KEYS if getattr(track, key, None)
+            ]
+        elif kind == "Video" and info["codec"] is None:
+            info["fps"] = _number(getattr(track, "frame_rate", None))
+            info["frame_count"] = _number(getattr(track, "frame_count", None), int)
+            info["width"] = _number(getattr(track, "width", None), int)
+            info["height"] = _number(getattr(track, "height", None), int)
+            info["codec"] = getattr(track, "format", None) or getattr(
+                track, "codec_id", None
+            )
+
+
+def _opencv(path, info):
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"Can't open video: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        info["fps"] = info["fps"] or fps
+        info["frame_count"] = info["frame_count"] or frame_count
+        info["duration"] = info["duration"] or frame_count / fps
+        info["width"] = info["width"] or int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        info["height"] = info["height"] or int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if info["codec"] is None:
+            fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+            codec = "".join(chr((fourcc >> s) & 0xFF) for s in (0, 8, 16, 24))
+            info["codec"] = codec.strip("\0 ") or None
+    finally:
+        cap.release()
+
+
+def probe_file(path):
+    """Probe one video; returns a dict of FIELDS plus 'error' (None on success).
+
+    MediaInfo is tried first (it also has the container dates); OpenCV
+    fills whatever is still missing.
+    """
+    info = dict.fromkeys(FIELDS)
+    info["dates"] = []
+    errors = []
+    for backend in (MediaInfo and _mediainfo, cv2 and _opencv):
+        if not backend or None not in (
+            info["duration"],
+            info["fps"],
+            info["frame_count"],
+        ):
+            continue
+        try:
+            backend(path, info)
+        except Exception as e:
+            errors.append(str(e))
+    if info["duration"] is None:
+        info["error"] = (
+            "; ".join(errors)
+            or "No video probe backend (install pymediainfo or opencv)"
+        )
+    else:
+        info["error"] = None
+    return info
+
+
+def _probe_task(path):
+    try:
+        return path, probe_file(path)
+    except Exception as e:
+        return path, dict(dict.fromkeys(FIELDS), dates=[], error=str(e))
+
+
+def _row_to_info(row):
+    info = dict(zip(FIELDS, row), error=None)
+    info["dates"] = json.loads(info["dates"] or "[]")
+    return info
+
+
+def probe_videos(conn, paths, workers="auto", on_done=None):
+    """Return {path: info} for paths, probing only files not in the cache.
+
+    conn is the manifest connection; on_done(n) is called as probes finish
+    (cache hits included), e.g. to advance a progress bar. Files that can't
+    be stat'ed are left out.
+    """
+    conn.execute(SCHEMA)
+    results, keys, todo = {}, {}, []
+    for path in paths:
+        try:
+            key = stat_key(os.stat(path))
+        except OSError:
+            continue
+        keys[path] = key
+        row = conn.execute(
+            "SELECT duration, fps, frame_count, width, height, codec, dates "
+            "FROM video_probes "
+            "WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            todo.append(path)
+        else:
+            results[path] = _row_to_info(row)
+    if on_done and results:
+        on_done(len(results))
+    if todo:
+        workers = min(resolve_workers(workers), len(todo))
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, min(32, len(todo) // (workers * 4)))
+            for path, info in pool.map(_probe_task, todo, chunksize=chunksize):
+                results[path] = info
+                # Failures are retried next run (a backend may get installed).
+                if info["error"] is None:
+                    values = [info[f] for f in FIELDS[:6]]
+                    values += [json.dumps(info["dates"]), time.time()]
+                    rows.append((*keys[path], *values))
+                if on_done:
+                    on_done(1)
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO video_probes "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+    return results
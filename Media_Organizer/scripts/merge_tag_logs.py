@@ -5,12 +5,23 @@ if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
     del sys.argv[1]
 
 import os
-import sys
 import json
-import csv
 import argparse
+from tqdm import tqdm
 from datetime import datetime
 from colorama import Fore, Style, init
+from helpers.hashing import hash_file, resolve_workers, run_parallel
+from helpers.hash_cache import open_hash_cache, lookup
+from helpers.manifest import open_manifest
+from helpers.media_dates import extract_dates
+from helpers.media_index import (
+    open_index,
+    pending_logs,
+    merge_log,
+    stale_files,
+    update_files,
+    export_jsonl,
+)
 
 init(autoreset=True)
 BANNER = f"""
@@ -23,150 +34,188 @@ BANNER = f"""
 {Style.RESET_ALL}
 """
 
-print(BANNER)
-print(Fore.MAGENTA + ">>> Merge Tag Logs (Flagship Mode) <<<" + Style.RESET_ALL)
-
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
-os.makedirs(LOGS_DIR, exist_ok=True)
-MEDIA_TAGS = sorted(
-    [
-        f
-        for f in os.listdir(LOGS_DIR)
-        if f.startswith("media_tags_") and f.endswith(".tsv")
-    ]
-)
-VIDEO_TAGS = sorted(
-    [
-        f
-        for f in os.listdir(LOGS_DIR)
-        if f.startswith("video_tags_") and f.endswith(".tsv")
-    ]
-)
-NSFW_LOG = os.path.join(LOGS_DIR, "nsfw_log.csv")  # May not exist!
+INDEX_FILE = os.path.join(LOGS_DIR, "media_index.db")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
+HASH_CACHE_FILE = os.path.join(LOGS_DIR, "hash_cache.sqlite")
+CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
 OUTPUT_JSONL = os.path.join(
     LOGS_DIR, f"media_index_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
 )
 ERROR_LOG = os.path.join(
     LOGS_DIR, f"merge_tag_logs_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
-CHECKPOINT_FILE = os.path.join(LOGS_DIR, "merge_tag_logs_checkpoint.json")
-
-# --- ARGS ---
-parser = argparse.ArgumentParser(
-    description="Merge image/video tag logs into a unified index (with gusto)."
-)
-parser.add_argument(
-    "--dry-run", action="store_true", help="Preview merge, no index/logs written"
-)
-parser.add_argument(
-    "--resume", action="store_true", help="Resume from last checkpoint if available"
-)
-args = parser.parse_args()
-
-
-def read_tags_tsv(tsv_path):
-    tag_data = {}
-    try:
-        with open(tsv_path, "r", encoding="utf-8") as f:
-            reader = csv.reader(f, delimiter="\t")
-            next(reader, None)
-            for row in reader:
-                if row:
-                    tag_data[row[0]] = [t for t in row[1:] if t]
-    except Exception as e:
-        print(Fore.RED + f"❌ Failed to read {tsv_path}: {e}" + Style.RESET_ALL)
-    return tag_data
-
-
-def read_nsfw_log(csv_path):
-    nsfw_data = {}
-    if os.path.exists(csv_path):
-        try:
-            with open(csv_path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    nsfw_data[row["File"]] = {
-                        "classification": row["Classification"].strip().lower(),
-                        "unsafe_score": float(row["UnsafeScore"]),
-                    }
-        except Exception as e:
-            print(Fore.RED + f"❌ Failed to read NSFW log: {e}" + Style.RESET_ALL)
-    return nsfw_data
-
-
-def get_capture_date(path):
-    try:
-        ts = os.path.getmtime(path)
-        return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
-    except Exception:
-        return None
 
 
-# --- CHECKPOINT RESUME ---
-already_merged = set()
-if args.resume and os.path.exists(CHECKPOINT_FILE):
-    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-        checkpoint = json.load(f)
-    already_merged = set(checkpoint.get("merged_files", []))
+def main():
+    print(BANNER)
+    print(Fore.MAGENTA + ">>> Merge Tag Logs (Flagship Mode) <<<" + Style.RESET_ALL)
 
-errors = []
-index = []
+    os.makedirs(LOGS_DIR, exist_ok=True)
 
-
-# --- Merge logs ---
-def process_log_files(tag_files, nsfw_data, already_merged, errors):
+    # --- ARGS ---
+    parser = argparse.ArgumentParser(
+        description="Merge image/video tag logs into a unified index (with gusto)."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Preview merge, no index/logs written"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Kept for compatibility: every run only merges logs not merged before",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-read every tag/NSFW log, not just new ones",
+    )
+    parser.add_argument(
+        "--no-export",
+        action="store_true",
+        help="Skip the timestamped JSONL export of the whole index",
+    )
+    args = parser.parse_args()
+
+    # --- CONFIG LOAD ---
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        algorithm = config.get("hash_algorithm", "md5")
+        hash_workers = config.get("hash_workers", "auto")
+        use_hash_cache = config.get("hash_cache", True)
+        probe_workers = config.get("probe_workers", "auto")
+        date_workers = config.get("date_workers", "auto")
+    else:
+        algorithm = "md5"
+        hash_workers = "auto"
+        use_hash_cache = True
+        probe_workers = "auto"
+        date_workers = "auto"
+
+    errors = []
+    index = open_index(INDEX_FILE)
+
+    # --- Merge new logs ---
+    pending = pending_logs(index, LOGS_DIR, args.full)
+    print(
+        Fore.CYAN
+        + f"Reading {len(pending)} new tag/NSFW logs into {INDEX_FILE}..."
+        + Style.RESET_ALL
+    )
+    touched = set()
     merged_count = 0
-    for file in tag_files:
-        tag_data = read_tags_tsv(os.path.join(LOGS_DIR, file))
-        for fpath, tags in tag_data.items():
-            if fpath in already_merged:
-                continue
-            nsfw_info = nsfw_data.get(
-                fpath, {"classification": "unknown", "unsafe_score": 0.0}
+    for kind, name in pending:
+        if args.dry_run:
+            print(Fore.CYAN + f"[DRY RUN] Would merge: {name}" + Style.RESET_ALL)
+            continue
+        try:
+            paths = merge_log(index, LOGS_DIR, kind, name)
+        except Exception as e:
+            print(Fore.RED + f"❌ Failed to read {name}: {e}" + Style.RESET_ALL)
+            errors.append(f"{name}\t{e}")
+            continue
+        print(
+            Fore.YELLOW
+            + f"🟢 Merged {len(paths)} entries from {name}"
+            + Style.RESET_ALL
+        )
+        touched.update(paths)
+        merged_count += len(paths)
+
+    # --- Dates & content hashes (only for new or changed files) ---
+    stale, stat_errors = stale_files(index, sorted(touched))
+    errors += [f"{fpath}\t{msg}" for fpath, msg in stat_errors]
+    if stale:
+        paths = list(stale)
+        date_bar = tqdm(
+            total=len(paths),
+            desc="📅 Reading capture dates",
+            unit="file",
+            colour="blue",
+        )
+        dates = extract_dates(
+            open_manifest(MANIFEST_FILE),
+            paths,
+            date_workers,
+            probe_workers,
+            date_bar.update,
+        )
+        date_bar.close()
+
+        hashes = {}
+        cache = open_hash_cache(HASH_CACHE_FILE) if use_hash_cache else None
+        if cache is not None:
+            for path in paths:
+                entry = lookup(cache, path, stale[path], algorithm)
+                if entry and entry["full_hash"]:
+                    hashes[path] = entry["full_hash"]
+        to_hash = [p for p in paths if p not in hashes]
+        if to_hash:
+            workers, _ = resolve_workers(hash_workers, os.path.dirname(to_hash[0]))
+            hash_bar = tqdm(
+                total=len(to_hash), desc="🔍 Hashing files", unit="file", colour="cyan"
             )
-            entry = {
-                "file": fpath,
-                "tags": tags,
-                "nsfw": nsfw_info["classification"] == "unsafe",
-                "unsafe_score": nsfw_info["unsafe_score"],
-                "capture_date": get_capture_date(fpath),
-            }
-            index.append(entry)
-            merged_count += 1
-    return merged_count
-
-
-# --- Process logs (images/videos) ---
-print(Fore.CYAN + "Reading and merging tag logs..." + Style.RESET_ALL)
-nsfw_data = read_nsfw_log(NSFW_LOG)
-img_count = process_log_files(MEDIA_TAGS, nsfw_data, already_merged, errors)
-vid_count = process_log_files(VIDEO_TAGS, nsfw_data, already_merged, errors)
-
-if not args.dry_run:
-    with open(OUTPUT_JSONL, "w", encoding="utf-8") as out:
-        for item in index:
-            out.write(json.dumps(item) + "\n")
+            for path, result in run_parallel(
+                to_hash,
+                lambda p: hash_file(p, algorithm),
+                workers,
+                lambda *_: hash_bar.update(1),
+            ).items():
+                if isinstance(result, Exception):
+                    errors.append(f"{path}\t{result}")
+                else:
+                    hashes[path] = result
+            hash_bar.close()
+        print(
+            Fore.CYAN
+            + f"🧮 {len(paths) - len(to_hash)} hashes from the hash cache, "
+            + f"{len(to_hash)} computed"
+            + Style.RESET_ALL
+        )
+
+        update_files(
+            index,
+            (
+                (
+                    path,
+                    stale[path],
+                    dates[path][0].strftime("%Y-%m-%d") if dates[path][0] else None,
+                    dates[path][1],
+                    hashes.get(path),
+                )
+                for path in paths
+            ),
+        )
+
+    # --- Export ---
+    if not args.no_export and not args.dry_run:
+        exported = export_jsonl(index, OUTPUT_JSONL)
+        print(
+            Fore.GREEN
+            + f"📝 Combined index ({exported} entries) written to: {OUTPUT_JSONL}"
+            + Style.RESET_ALL
+        )
+
+    if errors:
+        with open(ERROR_LOG, "w", encoding="utf-8") as f:
+            for msg in errors:
+                f.write(msg + "\n")
+        print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
+
     print(
-        Fore.GREEN + f"📝 Combined index written to: {OUTPUT_JSONL}" + Style.RESET_ALL
+        Fore.GREEN
+        + f"\n🎉 Done! Merged {merged_count} entries "
+        + f"({len(stale)} files re-dated/hashed)."
+        + Style.RESET_ALL
     )
+    if args.dry_run:
+        print(Fore.CYAN + "[Dry Run] No logs/index actually written." + Style.RESET_ALL)
+    else:
+        print(Fore.CYAN + "Media archive is now fully indexed!" + Style.RESET_ALL)
 
-if errors:
-    with open(ERROR_LOG, "w", encoding="utf-8") as f:
-        for msg in errors:
-            f.write(msg + "\n")
-    print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
-
-if not args.dry_run:
-    with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"merged_files": [item["file"] for item in index]}, f, indent=2)
-    print(Fore.CYAN + f"Checkpoint written to {CHECKPOINT_FILE}" + Style.RESET_ALL)
 
-print(
-    Fore.GREEN + f"\n🎉 Done! Merged {img_count+vid_count} entries." + Style.RESET_ALL
-)
-if args.dry_run:
-    print(Fore.CYAN + "[Dry Run] No logs/index actually written." + Style.RESET_ALL)
-else:
-    print(Fore.CYAN + "Media archive is now fully indexed!" + Style.RESET_ALL)
+if __name__ == "__main__":
+    main()
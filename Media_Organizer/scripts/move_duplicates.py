@@ -7,11 +7,26 @@ if len(sys.argv) > 2 and not sys.argv[1].startswith("-"):
 
 import os
 import json
-import shutil
 import argparse
 from tqdm import tqdm
 from datetime import datetime
 from colorama import Fore, Style, init
+from helpers.manifest import open_manifest, record_moves
+from helpers.dedupe import (
+    ACTIONS,
+    format_bytes,
+    freed_bytes,
+    link_duplicate,
+    same_inode,
+)
+from helpers.move_engine import (
+    plan_moves,
+    execute,
+    resume,
+    undo,
+    read_journal,
+    latest_journal,
+)
 
 init(autoreset=True)
 BANNER = f"""
@@ -37,18 +52,23 @@ LOGS_DIR = os.path.join(BASE_DIR, "logs")
 DUPLICATES_DIR = os.path.join(BASE_DIR, "Duplicates")
 os.makedirs(DUPLICATES_DIR, exist_ok=True)
 CHECKPOINT_FILE = os.path.join(LOGS_DIR, "move_duplicates_checkpoint.json")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
+CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
+JOURNAL_PREFIX = "move_duplicates_journal_"
 
 
-def find_latest_duplicate_log():
+def find_latest_duplicate_log(prefix="duplicate_log_"):
     logs = [
-        f
-        for f in os.listdir(LOGS_DIR)
-        if f.startswith("duplicate_log_") and f.endswith(".csv")
+        f for f in os.listdir(LOGS_DIR) if f.startswith(prefix) and f.endswith(".csv")
     ]
     if not logs:
+        hint = {
+            "near_duplicate_log_": " --near-duplicates",
+            "video_match_log_": " --near-videos",
+        }.get(prefix, "")
         print(
             Fore.RED
-            + "❌ No duplicate_log_*.csv found! Please run find_duplicates.py first."
+            + f"❌ No {prefix}*.csv found! Please run find_duplicates.py{hint} first."
             + Style.RESET_ALL
         )
         sys.exit(1)
@@ -67,23 +87,210 @@ parser.add_argument(
 parser.add_argument(
     "--resume", action="store_true", help="Resume from last checkpoint if available"
 )
+parser.add_argument(
+    "--near",
+    action="store_true",
+    help="Use the latest near_duplicate_log_*.csv (perceptual matches) instead",
+)
+parser.add_argument(
+    "--videos",
+    action="store_true",
+    help="Use the latest video_match_log_*.csv (near-duplicate videos) instead",
+)
+parser.add_argument(
+    "--min-similarity",
+    type=float,
+    default=0.0,
+    help="With --near/--videos, only move members at least this similar "
+    "to the keeper (0-1)",
+)
+parser.add_argument(
+    "--undo",
+    action="store_true",
+    help="Move every file of the latest run back (from its journal)",
+)
+parser.add_argument(
+    "--action",
+    choices=("move",) + ACTIONS,
+    default="move",
+    help="move extra copies to Duplicates/, or replace them in place with a "
+    "hardlink/reflink to the kept file (exact duplicates only)",
+)
 args = parser.parse_args()
+if args.action != "move" and (args.near or args.videos):
+    print(
+        Fore.RED
+        + f"❌ --action {args.action} needs byte-identical files; "
+        + "it can't be used with --near/--videos."
+        + Style.RESET_ALL
+    )
+    sys.exit(1)
+
+# --- CONFIG LOAD ---
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    move_workers = config.get("move_workers", 4)
+else:
+    move_workers = 4
 
-DUPLICATE_LOG = find_latest_duplicate_log()
+
+def report_move(src, dst, method, error):
+    if error == "Not found":
+        print(f"{Fore.YELLOW}⚠️ Not found: {src}{Style.RESET_ALL}")
+    elif error:
+        print(Fore.RED + f"❌ Failed to move {src}: {error}" + Style.RESET_ALL)
+    else:
+        print(Fore.YELLOW + f"🟢 Moved duplicate: {src} → {dst}" + Style.RESET_ALL)
+    progress.update(1)
+
+
+if args.undo:
+    journal_path = latest_journal(LOGS_DIR, JOURNAL_PREFIX)
+    if not journal_path:
+        print(
+            Fore.RED + "❌ No move_duplicates journal found to undo." + Style.RESET_ALL
+        )
+        sys.exit(1)
+    print(Fore.CYAN + f"↩️ Undoing {journal_path}" + Style.RESET_ALL)
+    progress = tqdm(
+        total=len(read_journal(journal_path)["done"]),
+        desc="↩️ Restoring duplicates",
+        unit="file",
+        colour="green",
+    )
+    restored, undo_errors = undo(journal_path, move_workers, report_move)
+    progress.close()
+    record_moves(open_manifest(MANIFEST_FILE), restored)
+    for fpath, msg in undo_errors:
+        print(Fore.RED + f"❌ {fpath}: {msg}" + Style.RESET_ALL)
+    print(Fore.GREEN + f"\n🎉 Restored {len(restored)} files." + Style.RESET_ALL)
+    sys.exit(1 if undo_errors else 0)
+
+if args.videos:
+    DUPLICATE_LOG = find_latest_duplicate_log("video_match_log_")
+elif args.near:
+    DUPLICATE_LOG = find_latest_duplicate_log("near_duplicate_log_")
+else:
+    DUPLICATE_LOG = find_latest_duplicate_log()
+print(Fore.CYAN + f"Using: {DUPLICATE_LOG}" + Style.RESET_ALL)
 ERROR_LOG = os.path.join(
     LOGS_DIR, f"move_duplicates_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
 MOVES_LOG = os.path.join(
     LOGS_DIR, f"moved_duplicates_{datetime.now():%Y%m%d_%H%M%S}.csv"
 )
+JOURNAL_FILE = os.path.join(
+    LOGS_DIR, f"{JOURNAL_PREFIX}{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+)
 
 # --- LOAD DUPLICATE GROUPS ---
 duplicate_groups = {}
 with open(DUPLICATE_LOG, "r", encoding="utf-8") as f:
-    next(f)  # Skip header
+    # FilePath is always the last column and may itself contain commas.
+    columns = f.readline().strip().split(",")
     for line in f:
-        group_id, hashval, fpath = line.strip().split(",", 2)
-        duplicate_groups.setdefault(group_id, []).append(fpath)
+        if not line.strip():
+            continue
+        row = dict(zip(columns, line.rstrip("\n").split(",", len(columns) - 1)))
+        if (
+            "Similarity" in row
+            and duplicate_groups.get(row["GroupID"])
+            and float(row["Similarity"]) < args.min_similarity
+        ):
+            continue  # Keeper (first row) always stays; weak matches are left alone
+        duplicate_groups.setdefault(row["GroupID"], []).append(row["FilePath"])
+
+
+# --- LINK IN PLACE (hardlink / reflink) ---
+if args.action != "move":
+    LINKS_LOG = os.path.join(
+        LOGS_DIR, f"linked_duplicates_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    )
+    links, errors = [], []
+    shared = reclaimed = 0
+    progress = tqdm(
+        total=sum(
+            len(files) - 1 for files in duplicate_groups.values() if len(files) > 1
+        ),
+        desc=f"🔗 Linking duplicates ({args.action})",
+        unit="file",
+        colour="green",
+    )
+    for group_id, files in duplicate_groups.items():
+        if len(files) < 2:
+            continue
+        original = files[0]
+        try:
+            original_st = os.stat(original)
+        except OSError as e:
+            errors += [
+                (dup, f"Original unavailable ({original}): {e}") for dup in files[1:]
+            ]
+            progress.update(len(files) - 1)
+            continue
+        for dup in files[1:]:
+            progress.update(1)
+            try:
+                st = os.stat(dup)
+                if same_inode(st, original_st):
+                    shared += 1  # already one file on disk
+                    continue
+                if args.dry_run:
+                    freed = freed_bytes(st)
+                    print(
+                        Fore.CYAN
+                        + f"[DRY RUN] Would {args.action}: {dup} → {original}"
+                        + Style.RESET_ALL
+                    )
+                else:
+                    freed = link_duplicate(original, dup, args.action)
+                    print(
+                        Fore.YELLOW
+                        + f"🔗 {args.action.capitalize()}ed: {dup} → {original}"
+                        + Style.RESET_ALL
+                    )
+            except FileNotFoundError:
+                print(f"{Fore.YELLOW}⚠️ Not found: {dup}{Style.RESET_ALL}")
+                errors.append((dup, "Not found"))
+                continue
+            except (OSError, ValueError) as e:
+                print(
+                    Fore.RED
+                    + f"❌ Failed to {args.action} {dup}: {e}"
+                    + Style.RESET_ALL
+                )
+                errors.append((dup, str(e)))
+                continue
+            reclaimed += freed
+            links.append((group_id, original, dup, freed))
+    progress.close()
+
+    if not args.dry_run and links:
+        # Same paths, new inodes: refresh their manifest rows.
+        record_moves(
+            open_manifest(MANIFEST_FILE), [(dup, dup) for _, _, dup, _ in links]
+        )
+        with open(LINKS_LOG, "w", encoding="utf-8") as f:
+            f.write("GroupID,Original,Duplicate,Action,BytesReclaimed\n")
+            for group_id, original, dup, freed in links:
+                f.write(f"{group_id},{original},{dup},{args.action},{freed}\n")
+        print(Fore.GREEN + f"📝 Links log saved to {LINKS_LOG}" + Style.RESET_ALL)
+    if errors:
+        with open(ERROR_LOG, "w", encoding="utf-8") as f:
+            for fpath, msg in errors:
+                f.write(f"{fpath},{msg}\n")
+        print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
+
+    verb = "Would link" if args.dry_run else "Linked"
+    print(
+        Fore.GREEN
+        + f"\n🎉 Done! {verb} {len(links)} duplicate files, "
+        + f"{format_bytes(reclaimed)} reclaimed"
+        + f" ({shared} already shared an inode)."
+        + Style.RESET_ALL
+    )
+    sys.exit(1 if errors else 0)
 
 # --- CHECKPOINT RESUME (structure for future) ---
 already_moved = set()
@@ -92,55 +299,61 @@ if args.resume and os.path.exists(CHECKPOINT_FILE):
         checkpoint = json.load(f)
     already_moved = set(checkpoint.get("moved_files", []))
 
+group_of = {}
+for group_id, files in duplicate_groups.items():
+    for dup in files[1:]:
+        group_of[dup] = [group_id, files[0]]
+
 errors = []
 moves = []
-total_files = sum(
-    len(paths) - 1 for paths in duplicate_groups.values() if len(paths) > 1
-)
-progress = tqdm(
-    total=total_files, desc="🚚 Moving duplicates", unit="file", colour="green"
-)
+manifest = open_manifest(MANIFEST_FILE)
+if args.resume and not args.dry_run:
+    journal_path = latest_journal(LOGS_DIR, JOURNAL_PREFIX)
+    state = read_journal(journal_path) if journal_path else None
+    if state and not state["complete"]:
+        print(Fore.CYAN + f"⏯️ Resuming {journal_path}" + Style.RESET_ALL)
+        progress = tqdm(desc="⏯️ Finishing moves", unit="file", colour="green")
+        resumed, resume_errors = resume(journal_path, move_workers, report_move)
+        progress.close()
+        record_moves(manifest, resumed)
+        errors += resume_errors
+        already_moved.update(src for src, _ in resumed)
+        # Group and original come from the journal's plan records (older
+        # journals lack them; fall back to the duplicate log).
+        for src, dst in resumed:
+            group_id, original = state["info"].get(src) or group_of.get(src, ("", ""))
+            moves.append((group_id, original, src, dst))
 
+# --- PLAN ---
+items = []
 for group_id, files in duplicate_groups.items():
     if len(files) < 2:
         continue  # Only 1 file: skip
-    original = files[0]
     for dup in files[1:]:
         if dup in already_moved:
-            progress.update(1)
             continue  # Already handled in resume mode
-        try:
-            if not os.path.exists(dup):
-                msg = f"{Fore.YELLOW}⚠️ Not found: {dup}{Style.RESET_ALL}"
-                print(msg)
-                errors.append((dup, "Not found"))
-                progress.update(1)
-                continue
-            dest = os.path.join(DUPLICATES_DIR, os.path.basename(dup))
-            dest_base, dest_ext = os.path.splitext(dest)
-            counter = 1
-            while os.path.exists(dest):
-                dest = f"{dest_base}_dup{counter}{dest_ext}"
-                counter += 1
-            if args.dry_run:
-                print(
-                    Fore.CYAN
-                    + f"[DRY RUN] Would move: {dup} → {dest}"
-                    + Style.RESET_ALL
-                )
-            else:
-                shutil.move(dup, dest)
-                print(
-                    Fore.YELLOW
-                    + f"🟢 Moved duplicate: {dup} → {dest}"
-                    + Style.RESET_ALL
-                )
-            moves.append((group_id, original, dup, dest))
-        except Exception as e:
-            print(Fore.RED + f"❌ Failed to move {dup}: {e}" + Style.RESET_ALL)
-            errors.append((dup, str(e)))
-        progress.update(1)
-progress.close()
+        items.append((dup, DUPLICATES_DIR))
+plan = plan_moves(items)
+
+# --- MOVE ---
+if args.dry_run:
+    for dup, dest in plan:
+        print(Fore.CYAN + f"[DRY RUN] Would move: {dup} → {dest}" + Style.RESET_ALL)
+    moved = plan
+elif plan:
+    print(Fore.CYAN + f"📒 Journal: {JOURNAL_FILE}" + Style.RESET_ALL)
+    progress = tqdm(
+        total=len(plan), desc="🚚 Moving duplicates", unit="file", colour="green"
+    )
+    moved, move_errors = execute(
+        plan, JOURNAL_FILE, move_workers, report_move, info=group_of
+    )
+    progress.close()
+    record_moves(manifest, moved)
+    errors += move_errors
+else:
+    moved = []
+moves += [(*group_of[dup], dup, dest) for dup, dest in moved]
 
 # --- LOG MOVES & ERRORS ---
 if not args.dry_run and moves:
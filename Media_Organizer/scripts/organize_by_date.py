@@ -7,13 +7,21 @@ if len(sys.argv) > 2 and not sys.argv[1].startswith("-"):
 
 import os
 import json
-import shutil
+import time
 import argparse
 from datetime import datetime
-from PIL import Image, ExifTags
-from pymediainfo import MediaInfo
 from tqdm import tqdm
 from colorama import Fore, Style, init
+from helpers.manifest import stage_manifest, manifest_files, record_moves
+from helpers.media_dates import extract_dates
+from helpers.move_engine import (
+    plan_moves,
+    execute,
+    resume,
+    undo,
+    read_journal,
+    latest_journal,
+)
 
 init(autoreset=True)
 BANNER = f"""
@@ -26,186 +34,205 @@ BANNER = f"""
 {Style.RESET_ALL}
 """
 
-print(BANNER)
-print(Fore.MAGENTA + ">>> Organize Media by Date (Flagship Mode) <<<" + Style.RESET_ALL)
-
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
 ORGANIZED_DIR = os.path.join(BASE_DIR, "Organized")
-os.makedirs(ORGANIZED_DIR, exist_ok=True)
 CHECKPOINT_FILE = os.path.join(LOGS_DIR, "organize_by_date_checkpoint.json")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
 ERROR_LOG = os.path.join(
     LOGS_DIR, f"organize_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
 MOVES_LOG = os.path.join(
     LOGS_DIR, f"organized_moves_{datetime.now():%Y%m%d_%H%M%S}.csv"
 )
-
-# --- ARGS ---
-parser = argparse.ArgumentParser(
-    description="Organize media into YYYY/MM/DD folders (with attitude)."
-)
-parser.add_argument("input_dir", help="Media input directory")
-parser.add_argument(
-    "--dry-run", action="store_true", help="Preview all moves/copies, make no changes"
-)
-parser.add_argument(
-    "--resume", action="store_true", help="Resume from last checkpoint if available"
-)
-args = parser.parse_args()
-
-# --- CONFIG LOAD ---
-if os.path.exists(CONFIG_FILE):
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    min_size_kb = config.get("min_file_size_kb", 1)
-else:
-    config = {}
-    min_size_kb = 1
-
-
-def get_image_date(path):
-    try:
-        img = Image.open(path)
-        exif = img.getexif()
-        if exif:
-            date = exif.get(36867)  # 36867 = DateTimeOriginal
-            if date:
-                return datetime.strptime(date, "%Y:%m:%d %H:%M:%S")
-    except Exception:
-        pass
-    return None
-
-
-def get_video_date(path):
-    try:
-        info = MediaInfo.parse(path)
-        if isinstance(info, str) or not hasattr(info, "tracks"):
-            return None
-        for track in info.tracks:
-            if getattr(track, "track_type", None) == "General":
-                for key in ["recorded_date", "encoded_date", "tagged_date"]:
-                    value = getattr(track, key, None)
-                    if value:
-                        try:
-                            return datetime.fromisoformat(value.split("T")[0])
-                        except Exception:
-                            try:
-                                return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
-                            except Exception:
-                                continue
-    except Exception:
-        pass
-    return None
-
-
-def get_fallback_date(path):
-    try:
-        return datetime.fromtimestamp(os.path.getmtime(path))
-    except Exception:
-        return None
-
-
-def get_media_date(path):
-    ext = os.path.splitext(path)[1].lower()
-    image_exts = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tiff", ".heic"}
-    video_exts = {".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv", ".m4v", ".webm"}
-    if ext in image_exts:
-        return get_image_date(path) or get_fallback_date(path)
-    elif ext in video_exts:
-        return get_video_date(path) or get_fallback_date(path)
-    else:
-        return get_fallback_date(path)
-
-
-# --- Gather Files ---
-media_files = []
-for root, _, files in os.walk(args.input_dir):
-    for filename in files:
-        file_path = os.path.join(root, filename)
-        try:
-            if os.path.getsize(file_path) >= min_size_kb * 1024:
-                media_files.append(file_path)
-        except Exception:
-            continue
-
-already_moved = set()
-if args.resume and os.path.exists(CHECKPOINT_FILE):
-    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-        checkpoint = json.load(f)
-    already_moved = set(checkpoint.get("organized_files", []))
-
-errors = []
-moves = []
-progress = tqdm(
-    total=len(media_files), desc="📁 Organizing files", unit="file", colour="blue"
+JOURNAL_PREFIX = "organize_journal_"
+JOURNAL_FILE = os.path.join(
+    LOGS_DIR, f"{JOURNAL_PREFIX}{datetime.now():%Y%m%d_%H%M%S}.jsonl"
 )
 
-for file_path in media_files:
-    if file_path in already_moved:
+
+def main():
+    print(BANNER)
+    print(
+        Fore.MAGENTA
+        + ">>> Organize Media by Date (Flagship Mode) <<<"
+        + Style.RESET_ALL
+    )
+
+    os.makedirs(ORGANIZED_DIR, exist_ok=True)
+
+    # --- ARGS ---
+    parser = argparse.ArgumentParser(
+        description="Organize media into YYYY/MM/DD folders (with attitude)."
+    )
+    parser.add_argument("input_dir", help="Media input directory")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Preview all moves/copies, make no changes",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Resume from last checkpoint if available"
+    )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="Rescan the tree even if the manifest is fresh",
+    )
+    parser.add_argument(
+        "--undo",
+        action="store_true",
+        help="Move every file of the latest run back (from its journal)",
+    )
+    args = parser.parse_args()
+
+    # --- CONFIG LOAD ---
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        min_size_kb = config.get("min_file_size_kb", 1)
+        probe_workers = config.get("probe_workers", "auto")
+        date_workers = config.get("date_workers", "auto")
+        move_workers = config.get("move_workers", 4)
+    else:
+        config = {}
+        min_size_kb = 1
+        probe_workers = "auto"
+        date_workers = "auto"
+        move_workers = 4
+
+    # --- Gather Files ---
+    manifest = stage_manifest(
+        MANIFEST_FILE, args.input_dir, config, args.rescan, ERROR_LOG
+    )
+
+    def report_move(src, dst, method, error):
+        if error:
+            print(Fore.RED + f"❌ Error moving {src}: {error}" + Style.RESET_ALL)
+        else:
+            print(Fore.YELLOW + f"🟢 Moved: {src} → {dst}" + Style.RESET_ALL)
         progress.update(1)
-        continue
-    try:
-        date = get_media_date(file_path)
+
+    if args.undo:
+        journal_path = latest_journal(LOGS_DIR, JOURNAL_PREFIX)
+        if not journal_path:
+            print(Fore.RED + "❌ No organize journal found to undo." + Style.RESET_ALL)
+            sys.exit(1)
+        state = read_journal(journal_path)
+        print(Fore.CYAN + f"↩️ Undoing {journal_path}" + Style.RESET_ALL)
+        progress = tqdm(
+            total=len(state["done"]),
+            desc="↩️ Restoring files",
+            unit="file",
+            colour="blue",
+        )
+        restored, undo_errors = undo(journal_path, move_workers, report_move)
+        progress.close()
+        record_moves(manifest, restored)
+        for fpath, msg in undo_errors:
+            print(Fore.RED + f"❌ {fpath}: {msg}" + Style.RESET_ALL)
+        print(Fore.GREEN + f"\n🎉 Restored {len(restored)} files." + Style.RESET_ALL)
+        sys.exit(1 if undo_errors else 0)
+
+    errors = []
+    moves = []
+    if args.resume and not args.dry_run:
+        journal_path = latest_journal(LOGS_DIR, JOURNAL_PREFIX)
+        if journal_path and not read_journal(journal_path)["complete"]:
+            print(Fore.CYAN + f"⏯️ Resuming {journal_path}" + Style.RESET_ALL)
+            progress = tqdm(desc="⏯️ Finishing moves", unit="file", colour="blue")
+            moves, resume_errors = resume(journal_path, move_workers, report_move)
+            progress.close()
+            errors += resume_errors
+            record_moves(manifest, moves)
+
+    media_rows = manifest_files(manifest, args.input_dir, min_size=min_size_kb * 1024)
+    media_files = [row[0] for row in media_rows]
+
+    already_moved = set()
+    if args.resume and os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        already_moved = set(checkpoint.get("organized_files", []))
+
+    # --- Extract Dates (whole batch, before any file moves) ---
+    pending = [path for path in media_files if path not in already_moved]
+    date_bar = tqdm(
+        total=len(pending), desc="📅 Reading dates", unit="file", colour="cyan"
+    )
+    start = time.perf_counter()
+    media_dates = extract_dates(
+        manifest, pending, date_workers, probe_workers, date_bar.update
+    )
+    elapsed = time.perf_counter() - start
+    date_bar.close()
+    sources = {}
+    for _, source in media_dates.values():
+        sources[source or "none"] = sources.get(source or "none", 0) + 1
+    print(
+        Fore.CYAN
+        + f"📅 Dates for {len(pending)} files in {elapsed:.1f}s "
+        + f"({len(pending) / elapsed if elapsed else 0:.0f} files/s): "
+        + ", ".join(f"{n} {source}" for source, n in sorted(sources.items()))
+        + Style.RESET_ALL
+    )
+
+    # --- Plan Moves ---
+    items = []
+    for file_path in pending:
+        date = media_dates[file_path][0]
         if date:
-            year, month, day = (
-                date.strftime("%Y"),
-                date.strftime("%m"),
-                date.strftime("%d"),
+            dest_dir = os.path.join(
+                ORGANIZED_DIR, f"{date:%Y}", f"{date:%m}", f"{date:%d}"
             )
-            dest_dir = os.path.join(ORGANIZED_DIR, year, month, day)
-            os.makedirs(dest_dir, exist_ok=True)
-            dest_path = os.path.join(dest_dir, os.path.basename(file_path))
-            counter = 1
-            while os.path.exists(dest_path):
-                base, ext = os.path.splitext(os.path.basename(file_path))
-                dest_path = os.path.join(dest_dir, f"{base}_dup{counter}{ext}")
-                counter += 1
-            if args.dry_run:
-                print(
-                    Fore.CYAN
-                    + f"[DRY RUN] Would move: {file_path} → {dest_path}"
-                    + Style.RESET_ALL
-                )
-            else:
-                shutil.move(file_path, dest_path)
-                print(
-                    Fore.YELLOW
-                    + f"🟢 Moved: {file_path} → {dest_path}"
-                    + Style.RESET_ALL
-                )
-            moves.append((file_path, dest_path))
+            items.append((file_path, dest_dir))
         else:
             errors.append((file_path, "No valid date"))
             print(Fore.YELLOW + f"⚠️ No date found: {file_path}" + Style.RESET_ALL)
-    except Exception as e:
-        errors.append((file_path, str(e)))
-        print(Fore.RED + f"❌ Error moving {file_path}: {e}" + Style.RESET_ALL)
-    progress.update(1)
-progress.close()
-
-if not args.dry_run and moves:
-    with open(MOVES_LOG, "w", encoding="utf-8") as f:
-        f.write("Source,Destination\n")
-        for src, dst in moves:
-            f.write(f"{src},{dst}\n")
-    print(Fore.GREEN + f"📝 Moves log saved to {MOVES_LOG}" + Style.RESET_ALL)
-
-if errors:
-    with open(ERROR_LOG, "w", encoding="utf-8") as f:
-        for fpath, msg in errors:
-            f.write(f"{fpath},{msg}\n")
-    print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
-
-if not args.dry_run:
-    with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"organized_files": [m[0] for m in moves]}, f, indent=2)
-    print(Fore.CYAN + f"Checkpoint written to {CHECKPOINT_FILE}" + Style.RESET_ALL)
-
-print(Fore.GREEN + f"\n🎉 Done! Organized {len(moves)} files." + Style.RESET_ALL)
-if args.dry_run:
-    print(Fore.CYAN + "[Dry Run] No files were actually moved." + Style.RESET_ALL)
-else:
-    print(Fore.CYAN + "Ready for next step: smart_tag_images.py" + Style.RESET_ALL)
+    plan = plan_moves(items)
+
+    # --- Move ---
+    if args.dry_run:
+        for src, dst in plan:
+            print(Fore.CYAN + f"[DRY RUN] Would move: {src} → {dst}" + Style.RESET_ALL)
+        moves += plan
+    elif plan:
+        print(Fore.CYAN + f"📒 Journal: {JOURNAL_FILE}" + Style.RESET_ALL)
+        progress = tqdm(
+            total=len(plan), desc="📁 Organizing files", unit="file", colour="blue"
+        )
+        moved, move_errors = execute(plan, JOURNAL_FILE, move_workers, report_move)
+        progress.close()
+        record_moves(manifest, moved)
+        moves += moved
+        errors += move_errors
+
+    if not args.dry_run and moves:
+        with open(MOVES_LOG, "w", encoding="utf-8") as f:
+            f.write("Source,Destination\n")
+            for src, dst in moves:
+                f.write(f"{src},{dst}\n")
+        print(Fore.GREEN + f"📝 Moves log saved to {MOVES_LOG}" + Style.RESET_ALL)
+
+    if errors:
+        with open(ERROR_LOG, "a", encoding="utf-8") as f:
+            for fpath, msg in errors:
+                f.write(f"{fpath},{msg}\n")
+        print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
+
+    if not args.dry_run:
+        with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
+            json.dump({"organized_files": [m[0] for m in moves]}, f, indent=2)
+        print(Fore.CYAN + f"Checkpoint written to {CHECKPOINT_FILE}" + Style.RESET_ALL)
+
+    print(Fore.GREEN + f"\n🎉 Done! Organized {len(moves)} files." + Style.RESET_ALL)
+    if args.dry_run:
+        print(Fore.CYAN + "[Dry Run] No files were actually moved." + Style.RESET_ALL)
+    else:
+        print(Fore.CYAN + "Ready for next step: smart_tag_images.py" + Style.RESET_ALL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from colorama import Fore, Style, init
+from helpers.media_index import (
+    open_index,
+    parse_period,
+    pending_logs,
+    query,
+    row_entry,
+)
+
+init(autoreset=True)
+BANNER = f"""
+{Fore.BLUE}
+ ██████  ██    ██ ███████ ██████  ██    ██
+██    ██ ██    ██ ██      ██   ██  ██  ██
+██    ██ ██    ██ █████   ██████    ████
+██ ▄▄ ██ ██    ██ ██      ██   ██    ██
+ ██████   ██████  ███████ ██   ██    ██
+    ▀▀
+{Style.RESET_ALL}
+"""
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS_DIR = os.path.join(BASE_DIR, "logs")
+INDEX_FILE = os.path.join(LOGS_DIR, "media_index.db")
+CSV_FIELDS = (
+    "file",
+    "media_type",
+    "tags",
+    "classification",
+    "unsafe_score",
+    "capture_date",
+    "date_source",
+    "content_hash",
+)
+
+
+# --- ARGS ---
+def period(value):
+    try:
+        return parse_period(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+parser = argparse.ArgumentParser(
+    description="Query the media index (built by merge_tag_logs.py). "
+    "Results go to stdout.",
+    epilog="e.g. query.py --tag beach --unsafe --type image --from 2019 --to 2019",
+)
+parser.add_argument(
+    "--tag", action="append", default=[], help="Must have this tag (repeatable)"
+)
+parser.add_argument(
+    "--any-tag",
+    action="append",
+    default=[],
+    help="Must have at least one of these tags (repeatable)",
+)
+parser.add_argument(
+    "--not-tag", action="append", default=[], help="Must not have this tag (repeatable)"
+)
+parser.add_argument(
+    "--from", dest="date_from", type=period, help="Captured on/after YYYY[-MM[-DD]]"
+)
+parser.add_argument(
+    "--to",
+    dest="date_to",
+    type=period,
+    help="Captured on/before YYYY[-MM[-DD]] (inclusive)",
+)
+parser.add_argument(
+    "--unsafe", action="store_true", help="Only files classified unsafe"
+)
+parser.add_argument("--safe", action="store_true", help="Only files classified safe")
+parser.add_argument("--min-score", type=float, help="Minimum NSFW unsafe score")
+parser.add_argument("--max-score", type=float, help="Maximum NSFW unsafe score")
+parser.add_argument(
+    "--type", choices=("image", "video"), help="Only images or only videos"
+)
+parser.add_argument("--limit", type=int, help="Stop after this many results")
+parser.add_argument(
+    "--format",
+    choices=("paths", "jsonl", "csv"),
+    default="paths",
+    help="Output format (default: paths)",
+)
+parser.add_argument(
+    "--count", action="store_true", help="Only print the number of matches"
+)
+parser.add_argument(
+    "-o", "--output", help="Write results to this file instead of stdout"
+)
+args = parser.parse_args()
+
+# Banner and status go to stderr so stdout stays pipeable.
+print(BANNER, file=sys.stderr)
+if args.safe and args.unsafe:
+    print(
+        Fore.RED + "❌ --safe and --unsafe are mutually exclusive." + Style.RESET_ALL,
+        file=sys.stderr,
+    )
+    sys.exit(1)
+if not os.path.exists(INDEX_FILE):
+    print(
+        Fore.RED
+        + f"❌ No media index at {INDEX_FILE}! Please run merge_tag_logs.py first."
+        + Style.RESET_ALL,
+        file=sys.stderr,
+    )
+    sys.exit(1)
+
+index = open_index(INDEX_FILE)
+unmerged = pending_logs(index, LOGS_DIR)
+if unmerged:
+    print(
+        Fore.YELLOW
+        + f"⚠️ {len(unmerged)} tag/NSFW logs not merged yet; "
+        + "run merge_tag_logs.py to include them."
+        + Style.RESET_ALL,
+        file=sys.stderr,
+    )
+
+start = time.perf_counter()
+rows = query(
+    index,
+    tags=args.tag,
+    any_tags=args.any_tag,
+    exclude_tags=args.not_tag,
+    date_from=args.date_from,
+    date_to=args.date_to,
+    classification="unsafe" if args.unsafe else "safe" if args.safe else None,
+    min_score=args.min_score,
+    max_score=args.max_score,
+    kind=args.type,
+    limit=args.limit,
+    count=args.count,
+)
+
+# --- STREAM RESULTS ---
+out = (
+    open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+)
+matches = 0
+try:
+    if args.count:
+        matches = rows.fetchone()[0]
+        out.write(f"{matches}\n")
+    elif args.format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(CSV_FIELDS)
+        for row in rows:
+            entry = row_entry(row)
+            entry["tags"] = ";".join(entry["tags"])
+            writer.writerow([entry[field] for field in CSV_FIELDS])
+            matches += 1
+    else:
+        for row in rows:
+            line = json.dumps(row_entry(row)) if args.format == "jsonl" else row[0]
+            out.write(line + "\n")
+            matches += 1
+    out.flush()
+except BrokenPipeError:  # e.g. piped into head
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    sys.exit(0)
+finally:
+    if args.output:
+        out.close()
+
+print(
+    Fore.GREEN
+    + f"🔎 {matches} matches in {(time.perf_counter() - start) * 1000:.1f} ms"
+    + Style.RESET_ALL,
+    file=sys.stderr,
+)
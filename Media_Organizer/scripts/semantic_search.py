@@ -0,0 +1,203 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import torch  # type: ignore
+from colorama import Fore, Style, init
+from helpers.clip_inference import (
+    CPU_BACKENDS,
+    embedding_key,
+    load_clip,
+    query_features,
+)
+from helpers.embedding_store import model_slug, open_store, load_matrix, row_paths
+from helpers.vector_index import search, DEFAULT_NPROBE, BRUTE_FORCE_MAX
+
+init(autoreset=True)
+BANNER = f"""
+{Fore.MAGENTA}
+███████ ███████  █████  ██████   ██████ ██   ██
+██      ██      ██   ██ ██   ██ ██      ██   ██
+███████ █████   ███████ ██████  ██      ███████
+     ██ ██      ██   ██ ██   ██ ██      ██   ██
+███████ ███████ ██   ██ ██   ██  ██████ ██   ██
+{Style.RESET_ALL}
+"""
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
+LOGS_DIR = os.path.join(BASE_DIR, "logs")
+EMBEDDINGS_DIR = os.path.join(LOGS_DIR, "embeddings")
+STORES = {"image": "", "video": "_video"}  # kind -> store file suffix
+
+# --- ARGS ---
+parser = argparse.ArgumentParser(
+    description="Search the library by text with the CLIP embeddings stored by "
+    "the tagging scripts. Results go to stdout.",
+    epilog='e.g. semantic_search.py "dog running on a beach at sunset" -k 10',
+)
+parser.add_argument("query", nargs="+", help="Free-text description")
+parser.add_argument(
+    "-k",
+    "--top-k",
+    type=int,
+    help="Number of results (default: config search_top_k, else 20)",
+)
+parser.add_argument(
+    "--type", choices=("image", "video"), help="Only images or only videos"
+)
+parser.add_argument(
+    "--index",
+    choices=("auto", "brute", "ivfpq"),
+    help="brute-force matmul or IVF-PQ "
+    "(default: config search_index, else auto by library size)",
+)
+parser.add_argument(
+    "--nprobe",
+    type=int,
+    help="IVF lists to visit (default: config search_nprobe, else 64)",
+)
+parser.add_argument(
+    "--cpu-backend",
+    choices=CPU_BACKENDS,
+    help="Search the embeddings tagged with this CPU backend "
+    "(default: config cpu_backend, else int8)",
+)
+parser.add_argument(
+    "--rebuild-index", action="store_true", help="Retrain the IVF-PQ index from scratch"
+)
+parser.add_argument(
+    "--min-score", type=float, help="Drop results below this cosine similarity"
+)
+parser.add_argument(
+    "--format",
+    choices=("paths", "jsonl", "csv"),
+    default="paths",
+    help="Output format (default: paths)",
+)
+args = parser.parse_args()
+
+# --- CONFIG LOAD ---
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    top_k = config.get("search_top_k", 20)
+    index_method = config.get("search_index", "auto")
+    nprobe = config.get("search_nprobe", DEFAULT_NPROBE)
+    brute_max = config.get("search_brute_force_max", BRUTE_FORCE_MAX)
+    cpu_backend = config.get("cpu_backend", "int8")
+else:
+    top_k = 20
+    index_method = "auto"
+    nprobe = DEFAULT_NPROBE
+    brute_max = BRUTE_FORCE_MAX
+    cpu_backend = "int8"
+top_k = args.top_k or top_k
+index_method = args.index or index_method
+nprobe = args.nprobe or nprobe
+cpu_backend = args.cpu_backend or cpu_backend
+device = "cuda" if torch.cuda.is_available() else "cpu"
+# int8 and fp32 vectors live in separate stores; the query must come from
+# the same model variant as the vectors it is scored against.
+store_name = embedding_key(device, cpu_backend)
+
+# Banner and status go to stderr so stdout stays pipeable.
+print(BANNER, file=sys.stderr)
+kinds = [
+    kind
+    for kind, suffix in STORES.items()
+    if (not args.type or kind == args.type)
+    and os.path.exists(
+        os.path.join(EMBEDDINGS_DIR, model_slug(store_name) + suffix + ".sqlite")
+    )
+]
+if not kinds:
+    print(
+        Fore.RED
+        + f"❌ No {cpu_backend if device == 'cpu' else device} embeddings "
+        + f"in {EMBEDDINGS_DIR}! Please run smart_tag_images.py / "
+        + "smart_tag_videos.py with the same backend first."
+        + Style.RESET_ALL,
+        file=sys.stderr,
+    )
+    sys.exit(1)
+
+model, processor = load_clip(device, quantize=device == "cpu" and cpu_backend == "int8")
+text = " ".join(args.query)
+start = time.perf_counter()
+query = query_features(model, processor, text, device)
+encoded = time.perf_counter() - start
+
+# --- SEARCH ---
+results = []
+for kind in kinds:
+    store = open_store(
+        EMBEDDINGS_DIR, store_name, model.config.projection_dim, kind=kind
+    )
+    matrix = load_matrix(store)
+    if not len(matrix):
+        continue
+    start = time.perf_counter()
+    # Ask for extra rows: orphaned rows and moved/deleted files are dropped below.
+    rows, scores, how = search(
+        matrix,
+        query,
+        top_k * 2,
+        index_method,
+        store["index_path"],
+        nprobe,
+        brute_max,
+        args.rebuild_index,
+    )
+    paths = row_paths(store, rows)
+    found = 0
+    for row, score in zip(rows, scores):
+        for path in paths.get(int(row), []):
+            if found < top_k and os.path.exists(path):
+                results.append((float(score), kind, path))
+                found += 1
+    elapsed = time.perf_counter() - start
+    print(
+        Fore.CYAN
+        + f"🔎 {len(matrix)} {kind} embeddings searched with {how} "
+        + f"in {elapsed * 1000:.1f} ms"
+        + Style.RESET_ALL,
+        file=sys.stderr,
+    )
+results.sort(key=lambda r: -r[0])
+results = [
+    r for r in results[:top_k] if args.min_score is None or r[0] >= args.min_score
+]
+
+# --- STREAM RESULTS ---
+try:
+    if args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["score", "media_type", "file"])
+        writer.writerows((f"{score:.4f}", kind, path) for score, kind, path in results)
+    else:
+        for score, kind, path in results:
+            if args.format == "jsonl":
+                sys.stdout.write(
+                    json.dumps(
+                        {"file": path, "media_type": kind, "score": round(score, 4)}
+                    )
+                    + "\n"
+                )
+            else:
+                sys.stdout.write(path + "\n")
+    sys.stdout.flush()
+except BrokenPipeError:  # e.g. piped into head
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    sys.exit(0)
+
+print(
+    Fore.GREEN
+    + f"🎯 {len(results)} results for {text!r} "
+    + f"(query encoded in {encoded * 1000:.0f} ms)"
+    + Style.RESET_ALL,
+    file=sys.stderr,
+)
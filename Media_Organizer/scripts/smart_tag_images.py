@@ -7,14 +7,34 @@ if len(sys.argv) > 2 and not sys.argv[1].startswith("-"):
 
 import os
 import json
+import time
+import numpy as np
 import torch  # type: ignore
-from PIL import Image
-from transformers import CLIPProcessor, CLIPModel  # type: ignore
 import csv
 import argparse
 from tqdm import tqdm
 from datetime import datetime
 from colorama import Fore, Style, init
+from helpers.manifest import stage_manifest, manifest_files
+from helpers.clip_inference import (
+    setup_backend,
+    embedding_key,
+    text_features,
+    tags_from_features,
+)
+from helpers.decode_pipeline import (
+    default_workers,
+    clip_preprocess_config,
+    make_preprocess,
+    prefetch_batches,
+)
+from helpers.embedding_store import (
+    open_store,
+    content_keys,
+    load_matrix,
+    lookup as lookup_embeddings,
+    append as append_embeddings,
+)
 
 init(autoreset=True)
 BANNER = f"""
@@ -43,6 +63,9 @@ ERROR_LOG = os.path.join(
     LOGS_DIR, f"image_tag_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
 CHECKPOINT_FILE = os.path.join(LOGS_DIR, "smart_tag_images_checkpoint.json")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
+EMBEDDINGS_DIR = os.path.join(LOGS_DIR, "embeddings")
+ONNX_VISION_FILE = os.path.join(EMBEDDINGS_DIR, "clip_vision.onnx")
 
 # --- ARGS ---
 parser = argparse.ArgumentParser(
@@ -57,20 +80,52 @@ parser.add_argument(
 parser.add_argument(
     "--resume", action="store_true", help="Resume from last checkpoint if available"
 )
+parser.add_argument(
+    "--retag",
+    action="store_true",
+    help="Retag every image against the current tag list "
+    "(stored embeddings, no re-inference)",
+)
+parser.add_argument(
+    "--cpu-backend",
+    choices=("fp32", "int8", "onnx"),
+    help="CPU inference backend (default: config cpu_backend, else int8)",
+)
+parser.add_argument(
+    "--rescan",
+    action="store_true",
+    help="Rescan the tree even if the manifest is fresh",
+)
 args = parser.parse_args()
 
 # --- CONFIG LOAD ---
 if os.path.exists(CONFIG_FILE):
     with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         config = json.load(f)
-    batch_size = config.get("batch_size", 48 if torch.cuda.is_available() else 6)
+    batch_size = config.get("batch_size")
     confidence_threshold = config.get("confidence_threshold", 0.3)
+    decode_workers = config.get("decode_workers", "auto")
+    prefetch_batches_ahead = config.get("prefetch_batches", 4)
+    cpu_backend = config.get("cpu_backend", "int8")
+    cpu_threads = config.get("cpu_threads", "auto")
+    cpu_batch_size = config.get("cpu_batch_size", 32)
 else:
     config = {}
-    batch_size = 48 if torch.cuda.is_available() else 6
+    batch_size = None
     confidence_threshold = 0.3
+    decode_workers = "auto"
+    prefetch_batches_ahead = 4
+    cpu_backend = "int8"
+    cpu_threads = "auto"
+    cpu_batch_size = 32
+if decode_workers in (None, "auto", 0):
+    decode_workers = default_workers()
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
+cpu_backend = args.cpu_backend or cpu_backend
+# A configured batch_size always wins; cpu_batch_size is only the CPU default.
+if batch_size is None:
+    batch_size = 48 if device == "cuda" else cpu_batch_size
 
 
 # --- TAG VOCAB ---
@@ -87,13 +142,12 @@ def load_or_init_tags(path, default=[]):
 sfw_tags = load_or_init_tags(SFW_TAG_FILE)
 
 
-def gather_image_files(organized_dir):
-    img_files = []
-    for root, _, files in os.walk(organized_dir):
-        for file in files:
-            if file.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".bmp")):
-                img_files.append(os.path.join(root, file))
-    return img_files
+def gather_image_files(manifest, organized_dir):
+    return [
+        row[0]
+        for row in manifest_files(manifest, organized_dir, ("image",))
+        if row[0].lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".bmp"))
+    ]
 
 
 already_tagged = set()
@@ -103,65 +157,69 @@ if args.resume and os.path.exists(CHECKPOINT_FILE):
     already_tagged = set(checkpoint.get("tagged_files", []))
 
 
-def batch_tag_images(filepaths, tag_list, batch_size, device, confidence_threshold):
-    tags_per_file = []
-    all_new_tags = set(tag_list)
+def embed_images(filepaths, keys, encode, processor, store, batch_size, persist=True):
+    """Run the vision tower over filepaths; returns ({content_hash: vector}, errors).
+
+    Images are decoded ahead of inference by decode_workers threads. With
+    persist, each batch is appended to the store as it finishes (and not
+    kept in memory), so an interrupted run keeps what it computed.
+    """
+    new_vectors = {}
     errors = []
-    model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32").to(device)
-    processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+    preprocess = make_preprocess(*clip_preprocess_config(processor))
     pbar = tqdm(
-        total=len(filepaths), desc="🏷️ Tagging images", unit="img", colour="magenta"
+        total=len(filepaths), desc="🧠 Embedding images", unit="img", colour="magenta"
     )
-    for i in range(0, len(filepaths), batch_size):
-        batch_files = filepaths[i : i + batch_size]
-        images = []
-        valid_files = []
-        for f in batch_files:
+    start = time.perf_counter()
+    embedded = 0
+    for valid_files, pixels, decode_errors in prefetch_batches(
+        filepaths, preprocess, batch_size, decode_workers, prefetch_batches_ahead
+    ):
+        for f, err in decode_errors:
+            pbar.write(
+                f"{Fore.YELLOW}⚠️ Skipping unreadable image: {f} ({err})"
+                + Style.RESET_ALL
+            )
+            errors.append((f, err))
+        if pixels is not None:
             try:
-                img = Image.open(f).convert("RGB")
-                images.append(img)
-                valid_files.append(f)
+                feats = encode(pixels)
+                hashes = [keys[f] for f in valid_files]
+                if persist:
+                    append_embeddings(store, hashes, feats)
+                else:
+                    new_vectors.update(zip(hashes, feats))
+                embedded += len(valid_files)
             except Exception as e:
-                print(
-                    f"{Fore.YELLOW}⚠️ Skipping unreadable image: {f} ({e}){Style.RESET_ALL}"
-                )
-                errors.append((f, str(e)))
-        if not images:
-            pbar.update(len(batch_files))
-            continue
-        try:
-            inputs = processor(
-                text=tag_list, images=images, return_tensors="pt", padding=True
-            )
-            inputs = {
-                k: v.to(device) if torch.is_tensor(v) else v for k, v in inputs.items()
-            }
-            outputs = model(**inputs)
-            probs = outputs.logits_per_image.softmax(dim=1).detach().cpu().numpy()
-            for idx, probs_per_img in enumerate(probs):
-                tags = [
-                    tag
-                    for tag, prob in zip(tag_list, probs_per_img)
-                    if prob >= confidence_threshold
-                ]
-                tags_per_file.append((valid_files[idx], tags))
-                all_new_tags.update(tags)
-            pbar.update(len(images))
-        except Exception as e:
-            for f in valid_files:
-                print(
-                    f"{Fore.RED}❌ Tagging failed for image: {f} ({e}){Style.RESET_ALL}"
-                )
-                errors.append((f, f"Tagging failed: {e}"))
-            pbar.update(len(valid_files))
+                for f in valid_files:
+                    pbar.write(
+                        f"{Fore.RED}❌ Embedding failed for image: {f} ({e})"
+                        + Style.RESET_ALL
+                    )
+                    errors.append((f, f"Embedding failed: {e}"))
+        pbar.update(len(valid_files) + len(decode_errors))
     pbar.close()
-    return tags_per_file, all_new_tags, errors
+    elapsed = time.perf_counter() - start
+    if embedded:
+        print(
+            Fore.CYAN + f"⚡ Embedded {embedded} images in {elapsed:.1f}s "
+            f"({embedded / elapsed:.1f} images/sec, {decode_workers} decode workers)"
+            + Style.RESET_ALL
+        )
+    return new_vectors, errors
 
 
-img_files = [f for f in gather_image_files(ORGANIZED_DIR) if f not in already_tagged]
+manifest = stage_manifest(MANIFEST_FILE, ORGANIZED_DIR, config, args.rescan, ERROR_LOG)
+img_files = [
+    f
+    for f in gather_image_files(manifest, ORGANIZED_DIR)
+    if args.retag or f not in already_tagged
+]
 print(
     Fore.CYAN
-    + f"🖼️ Found {len(img_files)} new images to tag. Batch size: {batch_size}, Device: {device}"
+    + f"🖼️ Found {len(img_files)} "
+    + ("images to retag" if args.retag else "new images to tag")
+    + f". Batch size: {batch_size}, Device: {device}"
     + Style.RESET_ALL
 )
 
@@ -178,9 +236,84 @@ if args.dry_run:
         Fore.YELLOW + "[DRY RUN] Previewing tags, not saving changes." + Style.RESET_ALL
     )
 
-tags_per_file, all_new_tags, errors = batch_tag_images(
-    img_files, sfw_tags, batch_size, device, confidence_threshold
+model, processor, encode, threads = setup_backend(
+    device, cpu_backend, cpu_threads, ONNX_VISION_FILE
 )
+if device == "cpu":
+    print(
+        Fore.CYAN
+        + f"🧮 CPU backend: {cpu_backend}, {threads} threads, batch {batch_size}"
+        + Style.RESET_ALL
+    )
+store_name = embedding_key(device, cpu_backend)
+store = open_store(EMBEDDINGS_DIR, store_name, model.config.projection_dim)
+keys, errors = content_keys(store, img_files)
+stored = lookup_embeddings(store, set(keys.values()))
+to_embed = {}
+for f, key in keys.items():
+    if key not in stored:
+        to_embed.setdefault(key, f)  # identical content is embedded once
+print(
+    Fore.CYAN
+    + f"🧠 {len(keys) - len(to_embed)} embeddings reused from store, "
+    + f"{len(to_embed)} to compute."
+    + Style.RESET_ALL
+)
+new_vectors, embed_errors = embed_images(
+    list(to_embed.values()),
+    keys,
+    encode,
+    processor,
+    store,
+    batch_size,
+    persist=not args.dry_run,
+)
+errors += embed_errors
+
+tags_per_file = []
+all_new_tags = set(sfw_tags)
+if sfw_tags:
+    text_feats, logit_scale = text_features(
+        model,
+        processor,
+        sfw_tags,
+        device,
+        cache_dir=EMBEDDINGS_DIR,
+        model_name=store_name,
+    )
+    stored = lookup_embeddings(store, set(keys.values()))
+    matrix = load_matrix(store)
+    ready = [
+        f
+        for f in img_files
+        if f in keys and (keys[f] in stored or keys[f] in new_vectors)
+    ]
+    for i in range(0, len(ready), 4096):
+        chunk = ready[i : i + 4096]
+        feats = np.stack(
+            [
+                (
+                    new_vectors[keys[f]]
+                    if keys[f] in new_vectors
+                    else matrix[stored[keys[f]]]
+                )
+                for f in chunk
+            ]
+        ).astype(np.float32)
+        for f, tags in zip(
+            chunk,
+            tags_from_features(
+                feats, text_feats, logit_scale, sfw_tags, confidence_threshold
+            ),
+        ):
+            tags_per_file.append((f, tags))
+            all_new_tags.update(tags)
+else:
+    print(
+        Fore.YELLOW
+        + f"⚠️ No tags in {SFW_TAG_FILE}; embeddings stored only."
+        + Style.RESET_ALL
+    )
 
 # --- LOGGING ---
 if not args.dry_run and tags_per_file:
@@ -196,7 +329,7 @@ if not args.dry_run and tags_per_file:
     print(Fore.CYAN + f"🧠 SFW tag list updated: {SFW_TAG_FILE}" + Style.RESET_ALL)
 
 if errors:
-    with open(ERROR_LOG, "w", encoding="utf-8") as f:
+    with open(ERROR_LOG, "a", encoding="utf-8") as f:
         for fpath, msg in errors:
             f.write(f"{fpath}\t{msg}\n")
     print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
@@ -8,14 +8,36 @@ if len(sys.argv) > 2 and not sys.argv[1].startswith("-"):
 import os
 import json
 import torch  # type: ignore
-import cv2  # type: ignore
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel  # type: ignore
 import csv
 import argparse
 from tqdm import tqdm
 from datetime import datetime
+from statistics import NormalDist
 from colorama import Fore, Style, init
+from helpers.manifest import stage_manifest, manifest_files
+from helpers.clip_inference import (
+    setup_backend,
+    embedding_key,
+    text_features,
+    image_features,
+    tags_from_features,
+    normalise,
+)
+from helpers.embedding_store import (
+    open_store,
+    content_keys,
+    video_key,
+    lookup as lookup_embeddings,
+    append as append_embeddings,
+)
+from helpers.frame_sampler import (
+    MODES as SAMPLING_MODES,
+    av,
+    iter_frames,
+    uniform_count,
+)
+from helpers.video_probe import probe_videos
 
 init(autoreset=True)
 BANNER = f"""
@@ -28,14 +50,10 @@ BANNER = f"""
 {Style.RESET_ALL}
 """
 
-print(BANNER)
-print(Fore.YELLOW + ">>> Smart Tag Videos (Flagship Mode) <<<" + Style.RESET_ALL)
-
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(BASE_DIR, "config", "config.json")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
-os.makedirs(LOGS_DIR, exist_ok=True)
 ORGANIZED_DIR = os.path.join(BASE_DIR, "Organized")
 SFW_TAG_FILE = os.path.join(BASE_DIR, "config", "tags_sfw.json")
 LOG_FILE = os.path.join(LOGS_DIR, f"video_tags_{datetime.now():%Y%m%d_%H%M%S}.tsv")
@@ -43,38 +61,10 @@ ERROR_LOG = os.path.join(
     LOGS_DIR, f"video_tag_errors_{datetime.now():%Y%m%d_%H%M%S}.log"
 )
 CHECKPOINT_FILE = os.path.join(LOGS_DIR, "smart_tag_videos_checkpoint.json")
-
-# --- ARGS ---
-parser = argparse.ArgumentParser(
-    description="Auto-tag videos with CLIP (flagship mode, with attitude)."
-)
-parser.add_argument(
-    "input_dir", help="Media input directory (ignored, tags Organized/ only)"
-)
-parser.add_argument(
-    "--dry-run", action="store_true", help="Preview all tagging, make no changes"
-)
-parser.add_argument(
-    "--resume", action="store_true", help="Resume from last checkpoint if available"
-)
-args = parser.parse_args()
-
-# --- CONFIG LOAD ---
-if os.path.exists(CONFIG_FILE):
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    batch_size = config.get("video_batch_size", 24 if torch.cuda.is_available() else 4)
-    confidence_threshold = config.get("confidence_threshold", 0.3)
-    frame_interval = config.get("video_frame_interval", 1)
-    min_duration = config.get("video_min_duration", 1)  # in seconds
-else:
-    config = {}
-    batch_size = 24 if torch.cuda.is_available() else 4
-    confidence_threshold = 0.3
-    frame_interval = 1
-    min_duration = 1
-
-device = "cuda" if torch.cuda.is_available() else "cpu"
+MANIFEST_FILE = os.path.join(LOGS_DIR, "media_manifest.db")
+EMBEDDINGS_DIR = os.path.join(LOGS_DIR, "embeddings")
+ONNX_VISION_FILE = os.path.join(EMBEDDINGS_DIR, "clip_vision.onnx")
+MIN_TAG_RATIO = 0.2  # keep tags seen in at least this share of sampled frames
 
 
 def load_or_init_tags(path, default=[]):
@@ -87,184 +77,373 @@ def load_or_init_tags(path, default=[]):
         return default
 
 
-sfw_tags = load_or_init_tags(SFW_TAG_FILE)
+def gather_video_files(manifest, organized_dir, min_duration=1, probe_workers="auto"):
+    """(paths long enough to tag, {path: probe}); probes come from the shared cache."""
+    paths = [row[0] for row in manifest_files(manifest, organized_dir, ("video",))]
+    probe_bar = tqdm(
+        total=len(paths), desc="🔎 Probing videos", unit="video", colour="cyan"
+    )
+    probes = probe_videos(manifest, paths, probe_workers, probe_bar.update)
+    probe_bar.close()
+    vid_files = [
+        path
+        for path in paths
+        if path in probes
+        and probes[path]["duration"] is not None
+        and probes[path]["duration"] >= min_duration
+    ]
+    return vid_files, probes
+
+
+def frame_batches(video_path, interval_sec=1, batch_size=4, errors=None, **sampling):
+    """Yield lists of at most batch_size sampled frames (PIL, model-sized).
 
+    sampling is passed through to iter_frames (max_frames, size, mode,
+    scene_threshold).
 
-def gather_video_files(organized_dir, min_duration=1):
-    video_exts = (".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv", ".m4v", ".webm")
-    vid_files = []
-    for root, _, files in os.walk(organized_dir):
-        for file in files:
-            if file.lower().endswith(video_exts):
-                path = os.path.join(root, file)
-                try:
-                    cap = cv2.VideoCapture(path)
-                    fps = cap.get(cv2.CAP_PROP_FPS) or 25
-                    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    duration = frame_count / fps
-                    cap.release()
-                    if duration >= min_duration:
-                        vid_files.append(path)
-                except Exception:
-                    continue
-    return vid_files
+    Only one batch is held at a time, so memory does not grow with video
+    length. An open or decode error ends the stream after the frames
+    already read and is appended to errors as (path, message).
+    """
+    batch = []
+    try:
+        for _, frame in iter_frames(
+            video_path,
+            interval_sec,
+            **sampling,
+        ):
+            batch.append(Image.fromarray(frame))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    except Exception as e:
+        if errors is not None:
+            errors.append((video_path, f"Decode failed: {e}"))
+    if batch:
+        yield batch
 
 
-already_tagged = set()
-if args.resume and os.path.exists(CHECKPOINT_FILE):
-    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-        checkpoint = json.load(f)
-    already_tagged = set(checkpoint.get("tagged_videos", []))
+def wilson_bounds(count, n, z):
+    p = count / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * ((p * (1 - p) + z * z / (4 * n)) / n) ** 0.5 / (1 + z * z / n)
+    return centre - half, centre + half
 
 
-def sample_frames(video_path, interval_sec=1):
-    frames = []
-    try:
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            return frames
-        fps = cap.get(cv2.CAP_PROP_FPS) or 25
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        step = int(fps * interval_sec)
-        for frame_no in range(0, frame_count, step):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
-            ret, frame = cap.read()
-            if not ret:
-                continue
-            img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frames.append(Image.fromarray(img))
-        cap.release()
-    except Exception:
-        pass
-    return frames
-
-
-def batch_tag_images(images, tag_list, batch_size, device, confidence_threshold):
-    tags_per_img = []
-    model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32").to(device)
-    processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-    for i in range(0, len(images), batch_size):
-        batch_imgs = images[i : i + batch_size]
-        if not batch_imgs:
-            continue
-        try:
-            inputs = processor(
-                text=tag_list, images=batch_imgs, return_tensors="pt", padding=True
-            )
-            inputs = {
-                k: v.to(device) if torch.is_tensor(v) else v for k, v in inputs.items()
-            }
-            outputs = model(**inputs)
-            probs = outputs.logits_per_image.softmax(dim=1).detach().cpu().numpy()
-            for probs_img in probs:
-                tags = [
-                    tag
-                    for tag, prob in zip(tag_list, probs_img)
-                    if prob >= confidence_threshold
-                ]
-                tags_per_img.append(tags)
-        except Exception as e:
-            for img_idx in range(len(batch_imgs)):
-                tags_per_img.append([])
-    return tags_per_img
-
-
-vid_files = [
-    f
-    for f in gather_video_files(ORGANIZED_DIR, min_duration)
-    if f not in already_tagged
-]
-print(
-    Fore.CYAN
-    + f"📹 Found {len(vid_files)} new videos to tag. Batch size: {batch_size}, Device: {device}"
-    + Style.RESET_ALL
-)
+def tags_settled(tag_counts, n, z):
+    """True once every tag is confidently above or below MIN_TAG_RATIO.
+
+    Unseen tags are covered by the 0-count bound, so the vocabulary size
+    does not matter.
+    """
+    if wilson_bounds(0, n, z)[1] >= MIN_TAG_RATIO:
+        return False
+    for count in tag_counts.values():
+        low, high = wilson_bounds(count, n, z)
+        if low < MIN_TAG_RATIO <= high:
+            return False
+    return True
 
-if not vid_files:
+
+def main():
+    print(BANNER)
+    print(Fore.YELLOW + ">>> Smart Tag Videos (Flagship Mode) <<<" + Style.RESET_ALL)
+
+    os.makedirs(LOGS_DIR, exist_ok=True)
+
+    # --- ARGS ---
+    parser = argparse.ArgumentParser(
+        description="Auto-tag videos with CLIP (flagship mode, with attitude)."
+    )
+    parser.add_argument(
+        "input_dir", help="Media input directory (ignored, tags Organized/ only)"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Preview all tagging, make no changes"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Resume from last checkpoint if available"
+    )
+    parser.add_argument(
+        "--sampling",
+        choices=SAMPLING_MODES,
+        help="Frame sampling (default: config video_sampling, else sequential)",
+    )
+    parser.add_argument(
+        "--cpu-backend",
+        choices=("fp32", "int8", "onnx"),
+        help="CPU inference backend (default: config cpu_backend, else int8)",
+    )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="Rescan the tree even if the manifest is fresh",
+    )
+    args = parser.parse_args()
+
+    # --- CONFIG LOAD ---
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        batch_size = config.get("video_batch_size")
+        confidence_threshold = config.get("confidence_threshold", 0.3)
+        frame_interval = config.get("video_frame_interval", 1)
+        min_duration = config.get("video_min_duration", 1)  # in seconds
+        probe_workers = config.get("probe_workers", "auto")
+        sampling_mode = config.get("video_sampling", "sequential")
+        stop_confidence = config.get("video_stop_confidence", 0.95)
+        min_frames = config.get("video_min_frames", 8)
+        scene_threshold = config.get("video_scene_threshold", 0.25)
+        max_frames = config.get("video_max_frames")
+        frame_size = config.get("video_frame_size", 224)
+        cpu_backend = config.get("cpu_backend", "int8")
+        cpu_threads = config.get("cpu_threads", "auto")
+        cpu_batch_size = config.get("cpu_batch_size", 32)
+    else:
+        config = {}
+        batch_size = None
+        confidence_threshold = 0.3
+        frame_interval = 1
+        min_duration = 1
+        probe_workers = "auto"
+        sampling_mode = "sequential"
+        stop_confidence = 0.95
+        min_frames = 8
+        scene_threshold = 0.25
+        max_frames = None
+        frame_size = 224
+        cpu_backend = "int8"
+        cpu_threads = "auto"
+        cpu_batch_size = 32
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    sampling_mode = args.sampling or sampling_mode
+    if sampling_mode == "keyframes" and av is None:
+        print(
+            Fore.YELLOW
+            + "⚠️ Keyframe sampling needs PyAV (pip install av); using sequential."
+            + Style.RESET_ALL
+        )
+        sampling_mode = "sequential"
+    cpu_backend = args.cpu_backend or cpu_backend
+    # A configured video_batch_size always wins; cpu_batch_size is only the
+    # CPU default.
+    if batch_size is None:
+        batch_size = 24 if device == "cuda" else cpu_batch_size
+
+    sfw_tags = load_or_init_tags(SFW_TAG_FILE)
+
+    already_tagged = set()
+    if args.resume and os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        already_tagged = set(checkpoint.get("tagged_videos", []))
+
+    manifest = stage_manifest(
+        MANIFEST_FILE, ORGANIZED_DIR, config, args.rescan, ERROR_LOG
+    )
+    vid_files, probes = gather_video_files(
+        manifest, ORGANIZED_DIR, min_duration, probe_workers
+    )
+    vid_files = [f for f in vid_files if f not in already_tagged]
     print(
-        Fore.GREEN
-        + "All videos already tagged (resume mode). Exiting."
+        Fore.CYAN
+        + f"📹 Found {len(vid_files)} new videos to tag. "
+        + f"Batch size: {batch_size}, Device: {device}"
         + Style.RESET_ALL
     )
-    sys.exit(0)
 
-if args.dry_run:
-    print(
-        Fore.YELLOW + "[DRY RUN] Previewing tags, not saving changes." + Style.RESET_ALL
+    if not vid_files:
+        print(
+            Fore.GREEN
+            + "All videos already tagged (resume mode). Exiting."
+            + Style.RESET_ALL
+        )
+        sys.exit(0)
+
+    if args.dry_run:
+        print(
+            Fore.YELLOW
+            + "[DRY RUN] Previewing tags, not saving changes."
+            + Style.RESET_ALL
+        )
+
+    model, processor, encode, threads = setup_backend(
+        device, cpu_backend, cpu_threads, ONNX_VISION_FILE
     )
+    if device == "cpu":
+        print(
+            Fore.CYAN
+            + f"🧮 CPU backend: {cpu_backend}, {threads} threads, batch {batch_size}"
+            + Style.RESET_ALL
+        )
+    store_name = embedding_key(device, cpu_backend)
+    text = (
+        text_features(
+            model,
+            processor,
+            sfw_tags,
+            device,
+            cache_dir=EMBEDDINGS_DIR,
+            model_name=store_name,
+        )
+        if sfw_tags
+        else None
+    )
+    # One mean-pooled frame embedding per video, for semantic_search.py.
+    video_store = open_store(
+        EMBEDDINGS_DIR, store_name, model.config.projection_dim, kind="video"
+    )
+    video_keys, key_errors = content_keys(video_store, vid_files, video_key)
+    stored = lookup_embeddings(video_store, set(video_keys.values()))
+    all_new_tags = set(sfw_tags)
+    log_rows = []
+    errors = list(key_errors)
+    pooled_count = 0
+    early_stop = sampling_mode == "adaptive"
+    stop_z = NormalDist().inv_cdf((1 + stop_confidence) / 2)
+    frames_done = frames_uniform = 0
+    failed = 0
 
-model = None
-processor = None
-all_new_tags = set(sfw_tags)
-log_rows = []
-errors = []
+    pbar = tqdm(
+        total=len(vid_files), desc="🎬 Tagging videos", unit="video", colour="yellow"
+    )
+    for vfile in vid_files:
+        try:
+            tag_counts = {}
+            frame_count = 0
+            pooled = None
+            decode_errors = []
+            # Only the adaptive order covers the whole timeline early enough to
+            # stop on; batches stay small so the check runs often.
+            step = min(batch_size, min_frames) if early_stop else batch_size
+            for frames in frame_batches(
+                vfile,
+                frame_interval,
+                step,
+                errors=decode_errors,
+                max_frames=max_frames,
+                size=frame_size,
+                mode=sampling_mode,
+                scene_threshold=scene_threshold,
+            ):
+                frame_count += len(frames)
+                if not text:
+                    break  # nothing to tag against; one batch proves it decodes
+                feats = image_features(frames, processor, encode)
+                pooled = (
+                    feats.sum(axis=0) if pooled is None else pooled + feats.sum(axis=0)
+                )
+                tags_per_frame = tags_from_features(
+                    feats, text[0], text[1], sfw_tags, confidence_threshold
+                )
+                for taglist in tags_per_frame:
+                    for tag in taglist:
+                        tag_counts[tag] = tag_counts.get(tag, 0) + 1
+                if (
+                    early_stop
+                    and frame_count >= min_frames
+                    and tags_settled(tag_counts, frame_count, stop_z)
+                ):
+                    break
+            if decode_errors:
+                errors += decode_errors
+                failed += 1
+                print(
+                    Fore.RED
+                    + f"❌ Error decoding {vfile}: {decode_errors[0][1]}"
+                    + Style.RESET_ALL
+                )
+            if not frame_count:
+                if not decode_errors:
+                    errors.append((vfile, "No frames found"))
+                pbar.update(1)
+                continue
+            uniform = uniform_count(
+                probes[vfile]["duration"], frame_interval, max_frames
+            )
+            frames_done += frame_count
+            frames_uniform += max(uniform, frame_count)
+            if tag_counts:
+                min_count = max(1, int(frame_count * MIN_TAG_RATIO))
+                final_tags = [
+                    tag for tag, count in tag_counts.items() if count >= min_count
+                ]
+            else:
+                final_tags = []
+            all_new_tags.update(final_tags)
+            log_rows.append([vfile] + final_tags)
+            key = video_keys.get(vfile)
+            if pooled is not None and key and key not in stored and not args.dry_run:
+                append_embeddings(video_store, [key], normalise(pooled[None]))
+                stored[key] = None
+                pooled_count += 1
+            print(
+                Fore.YELLOW
+                + f"✅ Tagged {os.path.basename(vfile)} "
+                + f"({frame_count}/{uniform} frames): "
+                + f"{', '.join(final_tags) if final_tags else '(none)'}"
+                + Style.RESET_ALL
+            )
+        except Exception as e:
+            failed += 1
+            errors.append((vfile, f"Tagging failed: {e}"))
+            print(Fore.RED + f"❌ Error tagging {vfile}: {e}" + Style.RESET_ALL)
+        pbar.update(1)
+    pbar.close()
+    if frames_uniform:
+        print(
+            Fore.CYAN
+            + f"🎞️ Processed {frames_done} frames vs {frames_uniform} "
+            + "with uniform sampling "
+            + f"({1 - frames_done / frames_uniform:.0%} fewer)"
+            + Style.RESET_ALL
+        )
 
-pbar = tqdm(
-    total=len(vid_files), desc="🎬 Tagging videos", unit="video", colour="yellow"
-)
-for vfile in vid_files:
-    try:
-        frames = sample_frames(vfile, interval_sec=frame_interval)
-        if not frames:
-            errors.append((vfile, "No frames found"))
-            pbar.update(1)
-            continue
-        if not model or not processor:
-            model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32").to(device)
-            processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-        tags_per_frame = batch_tag_images(
-            frames, sfw_tags, batch_size, device, confidence_threshold
+    if not args.dry_run and log_rows:
+        with open(LOG_FILE, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerow(["FilePath", "Tags..."])
+            writer.writerows(log_rows)
+        print(Fore.GREEN + f"📝 Video tag log: {LOG_FILE}" + Style.RESET_ALL)
+        print(
+            Fore.CYAN
+            + f"🧠 Stored {pooled_count} pooled video embeddings "
+            + f"in {video_store['vectors_path']}"
+            + Style.RESET_ALL
         )
-        tag_counts = {}
-        for taglist in tags_per_frame:
-            for tag in taglist:
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        if tag_counts:
-            min_count = max(1, int(len(frames) * 0.2))
-            final_tags = [
-                tag for tag, count in tag_counts.items() if count >= min_count
-            ]
-        else:
-            final_tags = []
-        all_new_tags.update(final_tags)
-        log_rows.append([vfile] + final_tags)
+        os.makedirs(os.path.dirname(SFW_TAG_FILE), exist_ok=True)
+        with open(SFW_TAG_FILE, "w", encoding="utf-8") as f:
+            json.dump(sorted(all_new_tags), f, indent=2)
+        print(Fore.CYAN + f"🧠 SFW tag list updated: {SFW_TAG_FILE}" + Style.RESET_ALL)
+
+    if errors:
+        with open(ERROR_LOG, "a", encoding="utf-8") as f:
+            for fpath, msg in errors:
+                f.write(f"{fpath}\t{msg}\n")
+        print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
+
+    if not args.dry_run:
+        with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
+            json.dump({"tagged_videos": [row[0] for row in log_rows]}, f, indent=2)
+        print(Fore.CYAN + f"Checkpoint written to {CHECKPOINT_FILE}" + Style.RESET_ALL)
+
+    print(Fore.GREEN + f"\n🎉 Done! Tagged {len(log_rows)} videos." + Style.RESET_ALL)
+    if failed:
         print(
             Fore.YELLOW
-            + f"✅ Tagged {os.path.basename(vfile)}: {', '.join(final_tags) if final_tags else '(none)'}"
+            + f"⚠️ {failed} videos failed to decode or tag (see {ERROR_LOG})"
             + Style.RESET_ALL
         )
-    except Exception as e:
-        errors.append((vfile, f"Tagging failed: {e}"))
-        print(Fore.RED + f"❌ Error tagging {vfile}: {e}" + Style.RESET_ALL)
-    pbar.update(1)
-pbar.close()
-
-if not args.dry_run and log_rows:
-    with open(LOG_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f, delimiter="\t")
-        writer.writerow(["FilePath", "Tags..."])
-        writer.writerows(log_rows)
-    print(Fore.GREEN + f"📝 Video tag log: {LOG_FILE}" + Style.RESET_ALL)
-    os.makedirs(os.path.dirname(SFW_TAG_FILE), exist_ok=True)
-    with open(SFW_TAG_FILE, "w", encoding="utf-8") as f:
-        json.dump(sorted(all_new_tags), f, indent=2)
-    print(Fore.CYAN + f"🧠 SFW tag list updated: {SFW_TAG_FILE}" + Style.RESET_ALL)
-
-if errors:
-    with open(ERROR_LOG, "w", encoding="utf-8") as f:
-        for fpath, msg in errors:
-            f.write(f"{fpath}\t{msg}\n")
-    print(Fore.YELLOW + f"⚠️ Errors logged to: {ERROR_LOG}" + Style.RESET_ALL)
-
-if not args.dry_run:
-    with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"tagged_videos": [row[0] for row in log_rows]}, f, indent=2)
-    print(Fore.CYAN + f"Checkpoint written to {CHECKPOINT_FILE}" + Style.RESET_ALL)
-
-print(Fore.GREEN + f"\n🎉 Done! Tagged {len(log_rows)} videos." + Style.RESET_ALL)
-if args.dry_run:
-    print(
-        Fore.CYAN + "[Dry Run] No tags or logs were actually saved." + Style.RESET_ALL
-    )
-else:
-    print(Fore.CYAN + "Ready for next step: merge_tag_logs.py" + Style.RESET_ALL)
+    if args.dry_run:
+        print(
+            Fore.CYAN
+            + "[Dry Run] No tags or logs were actually saved."
+            + Style.RESET_ALL
+        )
+    else:
+        print(Fore.CYAN + "Ready for next step: merge_tag_logs.py" + Style.RESET_ALL)
+
+
+if __name__ == "__main__":
+    main()